@@ -0,0 +1,326 @@
+"""
+End-to-end scaling benchmarks on synthetic repositories.
+
+Every size runs in its own process so the peak RSS of one size does not leak
+into the next. Results are compared against benchmarks/baseline.json and the
+run fails when a timing or the peak RSS regresses beyond the threshold.
+
+    python -m benchmarks.bench_scaling --sizes small --sizes medium
+    python -m benchmarks.bench_scaling --sizes large --update-baseline
+"""
+
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import click
+
+from benchmarks.synthetic_repository import SyntheticRepository
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+# Slowdowns below this many seconds are noise, whatever the threshold.
+MIN_SLOWDOWN_SECONDS = 0.05
+
+SIZES = {
+    "small": {"databases": 1, "schemas": 2, "template_files": 20, "columns": 20},
+    "medium": {"databases": 2, "schemas": 5, "template_files": 100, "columns": 40},
+    "large": {"databases": 4, "schemas": 10, "template_files": 250, "columns": 60},
+    # Roughly the 100k object repository the suite was written for.
+    "xlarge": {"databases": 10, "schemas": 20, "template_files": 250, "columns": 60},
+}
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Timings:
+    def __init__(self):
+        self.seconds = {}
+        self.objects = {}
+
+    def measure(self, name, function, objects=None):
+        start = time.perf_counter()
+        result = function()
+        self.seconds[name] = time.perf_counter() - start
+        if objects is not None:
+            self.objects[name] = objects
+        return result
+
+    def as_dict(self):
+        return {
+            name: {
+                "seconds": round(seconds, 4),
+                "objects_per_second": (
+                    round(self.objects[name] / seconds, 1)
+                    if name in self.objects and seconds
+                    else None
+                ),
+            }
+            for name, seconds in self.seconds.items()
+        }
+
+
+def _prompt_answers(answers):
+    def prompt(questions):
+        return {question.name: answers[question.name] for question in questions}
+
+    return prompt
+
+
+def run_size(size):
+    """Build the synthetic repository of a size and time the snowgen stages."""
+    repository = SyntheticRepository(
+        tempfile.mkdtemp(prefix="snowgen-bench-"), **SIZES[size]
+    )
+    timings = Timings()
+    timings.measure("build_repository", repository.build)
+
+    cwd = os.getcwd()
+    os.chdir(repository.path)
+    try:
+        time_stages(repository, timings)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(repository.path, ignore_errors=True)
+
+    return {
+        "size": size,
+        "objects": repository.object_count,
+        "stages": timings.as_dict(),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def time_stages(repository, timings):
+    """Time the snowgen stages in the working directory of a built repository."""
+    from click.testing import CliRunner
+    from snowgen.cli import cli
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.main import create_schema_in
+
+    # snowgen imports these lazily. Import them up front so their one-off
+    # import time is not attributed to whichever stage happens to run first.
+    import inquirer  # noqa: F401
+    import yaml  # noqa: F401
+
+    database_repository = DatabaseRepository()
+    raw_entries = repository.raw_entries
+    curated_entries = repository.curated_entries
+    tables = repository.databases * repository.schemas * repository.template_files
+
+    def create_all():
+        for entry in raw_entries + curated_entries:
+            create_schema_in(
+                database_repository,
+                entry["schema"],
+                entry["template"],
+                source_database=entry.get("source_database"),
+                source_schema=entry.get("source_schema"),
+            )
+
+    timings.measure(
+        "read_template_files",
+        lambda: [
+            database_repository.get_table_columns_from_template_files(entry["schema"])
+            for entry in raw_entries
+        ],
+        objects=tables,
+    )
+    timings.measure("create_schemas", create_all, objects=repository.object_count)
+    timings.measure(
+        "create_schemas_incremental", create_all, objects=repository.object_count
+    )
+    timings.measure(
+        "read_dynamic_table_sources",
+        lambda: [
+            database_repository.get_dynamic_table_transformations_from_table(
+                entry["source_database"], entry["source_schema"]
+            )
+            for entry in curated_entries
+        ],
+        objects=tables,
+    )
+
+    runner = CliRunner()
+    answers = {
+        "schema_name": raw_entries[0]["schema"],
+        "schema_template": raw_entries[0]["template"],
+        "choice": "Regenerate",
+    }
+    with patch("inquirer.prompt", side_effect=_prompt_answers(answers)):
+        result = timings.measure(
+            "cli_regenerate_schema",
+            lambda: runner.invoke(cli, ["generate-schema"]),
+            objects=3 + repository.template_files,
+        )
+    if result.exit_code != 0:
+        raise RuntimeError(f"generate-schema failed: {result.output}")
+
+    with open("batch.yaml", "w") as file:
+        json.dump({"schemas": raw_entries + curated_entries}, file)
+    result = timings.measure(
+        "cli_generate_batch",
+        lambda: runner.invoke(cli, ["generate-batch", "batch.yaml", "--replace"]),
+        objects=repository.object_count,
+    )
+    if result.exit_code != 0:
+        raise RuntimeError(f"generate-batch failed: {result.output}")
+
+    # Four environments render once, so this should cost little more than
+    # generating one.
+    result = timings.measure(
+        "cli_generate_batch_envs",
+        lambda: runner.invoke(
+            cli,
+            ["generate-batch", "batch.yaml", "--replace"]
+            + ["--env", "dev", "--env", "test", "--env", "preprod", "--env", "prod"],
+        ),
+        objects=repository.object_count,
+    )
+    if result.exit_code != 0:
+        raise RuntimeError(f"generate-batch --env failed: {result.output}")
+
+    # Statements are recorded by the fake driver after 1 ms of latency each,
+    # so this measures planning and the executor overhead.
+    result = timings.measure(
+        "cli_apply_fake",
+        lambda: runner.invoke(
+            cli,
+            [
+                "apply",
+                "--env",
+                "dev",
+                "--driver",
+                "fake",
+                "--driver-option",
+                "latency=0.001",
+                "-c",
+                "16",
+            ],
+        ),
+        objects=repository.object_count,
+    )
+    if result.exit_code != 0:
+        raise RuntimeError(f"apply failed: {result.output}")
+
+
+def run_size_in_subprocess(size):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_scaling", "--run-size", size],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Compare results with the baseline. Returns a message per stage that got
+    slower, or a size whose peak RSS grew, by more than the threshold.
+    """
+    regressions = []
+    for size, result in results.items():
+        expected = baseline.get(size)
+        if not expected:
+            continue
+        for stage, timing in result["stages"].items():
+            baseline_stage = expected["stages"].get(stage)
+            if not baseline_stage or stage == "build_repository":
+                continue
+            limit = max(
+                baseline_stage["seconds"] * (1 + threshold),
+                baseline_stage["seconds"] + MIN_SLOWDOWN_SECONDS,
+            )
+            if timing["seconds"] > limit:
+                regressions.append(
+                    f"{size}/{stage}: {timing['seconds']:.3f}s, "
+                    f"baseline {baseline_stage['seconds']:.3f}s"
+                )
+        if result["peak_rss_mb"] > expected["peak_rss_mb"] * (1 + threshold):
+            regressions.append(
+                f"{size}/peak_rss: {result['peak_rss_mb']:.1f} MB, "
+                f"baseline {expected['peak_rss_mb']:.1f} MB"
+            )
+    return regressions
+
+
+def format_result(result):
+    lines = [
+        f"{result['size']}: {result['objects']} objects, "
+        f"peak RSS {result['peak_rss_mb']:.1f} MB"
+    ]
+    for stage, timing in result["stages"].items():
+        throughput = (
+            f"{timing['objects_per_second']:>10.1f} objects/s"
+            if timing["objects_per_second"]
+            else ""
+        )
+        lines.append(f"  {stage:<28}{timing['seconds']:>9.3f}s {throughput}")
+    return "\n".join(lines)
+
+
+@click.command()
+@click.option(
+    "--sizes",
+    "-s",
+    multiple=True,
+    type=click.Choice(list(SIZES)),
+    help="Sizes to run. Defaults to small and medium.",
+)
+@click.option(
+    "--threshold",
+    type=float,
+    default=DEFAULT_THRESHOLD,
+    show_default=True,
+    help="Allowed slowdown relative to the baseline, as a fraction.",
+)
+@click.option(
+    "--update-baseline", is_flag=True, help="Store the results as the new baseline."
+)
+@click.option("--run-size", "single_size", type=click.Choice(list(SIZES)), hidden=True)
+def main(sizes, threshold, update_baseline, single_size):
+    """Benchmark snowgen on synthetic repositories of growing size."""
+
+    if single_size:
+        click.echo(json.dumps(run_size(single_size)))
+        return
+
+    results = {}
+    for size in sizes or ("small", "medium"):
+        results[size] = run_size_in_subprocess(size)
+        click.echo(format_result(results[size]))
+
+    baseline = {}
+    if BASELINE_FILE.exists():
+        baseline = json.loads(BASELINE_FILE.read_text())
+
+    if update_baseline:
+        baseline.update(results)
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=2) + "\n")
+        click.echo(f"Baseline written to {BASELINE_FILE}.")
+        return
+
+    regressions = find_regressions(results, baseline, threshold)
+    if regressions:
+        click.echo("Regressions against the baseline:", err=True)
+        for regression in regressions:
+            click.echo(f"  {regression}", err=True)
+        raise SystemExit(1)
+    click.echo("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
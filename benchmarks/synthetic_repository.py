@@ -0,0 +1,119 @@
+from pathlib import Path
+
+SQL_TEMPLATES = {
+    "schema.sql": "USE ROLE {role};\nCREATE SCHEMA IF NOT EXISTS {database}_{env}.{schema};\n",
+    "file_format.sql": (
+        "USE DATABASE {database}_{env};\nUSE SCHEMA {schema};\n"
+        "CREATE FILE FORMAT IF NOT EXISTS {name} TYPE = CSV;\n"
+    ),
+    "stage.sql": (
+        "USE DATABASE {database}_{env};\nUSE SCHEMA {schema};\n"
+        "CREATE STAGE IF NOT EXISTS {name} FILE_FORMAT = (FORMAT_NAME = csv_format);\n"
+    ),
+    "table.sql": (
+        "USE DATABASE {database}_{env};\nUSE SCHEMA {schema};\n-- {comment}\n"
+        "CREATE OR REPLACE TABLE {name} (\n    {table_columns}\n);\n"
+    ),
+    "dynamic_table.sql": (
+        "USE DATABASE {database}_{env};\nUSE SCHEMA {schema};\n"
+        "CREATE OR REPLACE DYNAMIC TABLE {name}\nTARGET_LAG = '1 hour'\n"
+        "WAREHOUSE = transform_wh\nAS SELECT\n    {formatted_transformations}\n"
+        "FROM {source_database}.{source_schema}.{source_object};\n"
+    ),
+}
+
+
+class SyntheticRepository:
+    """
+    A generated snowgen working directory with `databases` x `schemas` raw
+    schemas, each fed by `template_files` landing files of `columns` columns,
+    and a curated schema of dynamic tables derived from every raw schema.
+    """
+
+    def __init__(
+        self, path, databases=1, schemas=2, template_files=20, columns=20, rows=10
+    ):
+        self.path = Path(path)
+        self.databases = databases
+        self.schemas = schemas
+        self.template_files = template_files
+        self.columns = columns
+        self.rows = rows
+
+    @property
+    def raw_entries(self):
+        return [
+            {"schema": f"src_{d}_{s}", "template": f"raw_{d}"}
+            for d in range(self.databases)
+            for s in range(self.schemas)
+        ]
+
+    @property
+    def curated_entries(self):
+        return [
+            {
+                "schema": f"cur_{d}_{s}",
+                "template": f"curated_{d}",
+                "source_database": f"raw_db_{d}",
+                "source_schema": f"src_{d}_{s}",
+            }
+            for d in range(self.databases)
+            for s in range(self.schemas)
+        ]
+
+    @property
+    def object_count(self):
+        per_schema = 3 + 2 * self.template_files
+        return self.databases * self.schemas * per_schema
+
+    def build(self):
+        templates_path = self.path / "templates"
+        (templates_path / "schema_templates").mkdir(parents=True, exist_ok=True)
+        (templates_path / "sql_templates").mkdir(parents=True, exist_ok=True)
+
+        for name, text in SQL_TEMPLATES.items():
+            (templates_path / "sql_templates" / name).write_text(text)
+
+        (templates_path / "schema_templates" / "schemas.yaml").write_text(
+            self._schemas_yaml()
+        )
+
+        header = ",".join(f"column_{c}" for c in range(self.columns))
+        row = ",".join(str(c) for c in range(self.columns))
+        content = header + "\n" + "\n".join([row] * self.rows) + "\n"
+        for entry in self.raw_entries:
+            folder = templates_path / "template_files" / entry["schema"]
+            folder.mkdir(parents=True, exist_ok=True)
+            for t in range(self.template_files):
+                (folder / f"table_{t}_20240101.csv").write_text(content)
+
+        return self
+
+    def _schemas_yaml(self):
+        lines = ["schemas:"]
+        for d in range(self.databases):
+            lines += [
+                f"  - name: raw_{d}",
+                f"    database: raw_db_{d}",
+                "    role: loader",
+                "    schema_definition:",
+                "      - object_name: schema",
+                "        template_name: schema.sql",
+                "    file_formats:",
+                "      - object_name: csv_format",
+                "        template_name: file_format.sql",
+                "    stages:",
+                "      - object_name: landing",
+                "        template_name: stage.sql",
+                "    tables:",
+                "      - template_name: table.sql",
+                "        generate_columns_from_template: true",
+                f"  - name: curated_{d}",
+                f"    database: cur_db_{d}",
+                "    role: transformer",
+                "    dynamic_tables:",
+                "      - template_name: dynamic_table.sql",
+                "        generate_columns_from_table: true",
+                '        pattern: "TRIM({column_name}) AS {column_name}"',
+            ]
+        return "\n".join(lines) + "\n"
@@ -15,6 +15,9 @@ setup(
         "inquirer",
         "pathlib",
     ],
+    extras_require={
+        "snowflake": ["snowflake-connector-python"],
+    },
     entry_points={
         "console_scripts": [
             "snowgen=snowgen.cli:cli",  # Adjust this to your CLI entry point
@@ -1,12 +1,44 @@
 import click
-import inquirer
-from .main import create_schema_in, init  # Import the function you want to trigger
-from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen import __version__
+from snowgen.profiler import profiler
+
+# The generation modules and the prompt stack are imported inside the commands
+# that use them, so --help, --version and scripted commands start quickly.
+
+OUTPUT_FORMATS = ("files", "ndjson", "tar", "zip")
 
 
 @click.group()
-def cli():
-    pass
+@click.version_option(__version__, prog_name="snowgen")
+@click.option(
+    "--profile",
+    "profile_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write a JSON report of the time per phase and I/O counters to a file.",
+)
+@click.option(
+    "--profile-stats",
+    "profile_stats_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Dump cProfile statistics of the main thread to a file for pstats.",
+)
+@click.pass_context
+def cli(ctx, profile_path, profile_stats_path):
+    if profile_path:
+        profiler.enable()
+        ctx.call_on_close(lambda: profiler.write_report(profile_path))
+
+    if profile_stats_path:
+        import cProfile
+
+        stats = cProfile.Profile()
+        stats.enable()
+
+        def dump_stats():
+            stats.disable()
+            stats.dump_stats(profile_stats_path)
+
+        ctx.call_on_close(dump_stats)
 
 
 @cli.command(name="new-database")
@@ -15,11 +47,86 @@ def new_database():
     click.echo("New database created successfully.")
 
 
+def output_options(command):
+    command = click.option(
+        "--output-path",
+        "-o",
+        default="-",
+        help="File to write ndjson, tar or zip output to. Defaults to stdout for ndjson.",
+    )(command)
+    command = click.option(
+        "--output",
+        "output_format",
+        type=click.Choice(OUTPUT_FORMATS),
+        default="files",
+        help="Write objects as files, or stream them as ndjson or into an archive.",
+    )(command)
+    return command
+
+
+def open_output_writer(output_format, output_path):
+    from snowgen.object_writers.stream_writer import open_object_writer
+
+    if output_format == "files":
+        return None
+    return open_object_writer(output_format, output_path)
+
+
+def open_environment_writer(
+    database_repository, environments, output_format, output_path, replace
+):
+    """
+    Open a writer per environment. Files are written to an object tree per
+    environment next to the snowflake objects folder, which keeps the objects
+    with their environment slots. Streams and archives are written to the
+    output path with {env} replaced by the environment.
+    """
+    from snowgen.object_writers.environment_writer import EnvironmentObjectWriter
+    from snowgen.object_writers.object_writer import ObjectWriter
+
+    if output_format == "files":
+        return EnvironmentObjectWriter(
+            {
+                environment: ObjectWriter(
+                    database_repository,
+                    root=database_repository.get_environment_objects_path(
+                        environment
+                    ),
+                )
+                for environment in environments
+            },
+            primary=ObjectWriter(database_repository),
+            replace=replace,
+        )
+    if "{env}" not in output_path:
+        raise click.UsageError(
+            "Writing environments as ndjson, tar or zip needs an --output-path "
+            "with an {env} placeholder."
+        )
+    writers = {}
+    try:
+        for environment in environments:
+            writers[environment] = open_output_writer(
+                output_format, output_path.replace("{env}", environment)
+            )
+    except BaseException:
+        for writer in writers.values():
+            writer.close()
+        raise
+    return EnvironmentObjectWriter(writers, replace=replace)
+
+
 @cli.command(name="generate-schema")
-def create_schema_command():
+@output_options
+def create_schema_command(output_format, output_path):
     """Create a new schema."""
+    import inquirer
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.main import create_schema_in, regenerate_schema_in
 
     database_repository = DatabaseRepository()
+    # Keep stdout clean when objects are streamed to it.
+    err = output_format == "ndjson" and output_path == "-"
 
     schema = inquirer.prompt(
         [
@@ -42,8 +149,11 @@ def create_schema_command():
     ]
 
     action = "created"
+    regenerate = False
 
-    if schema["schema_name"] in database_repository.get_all_schemas(database):
+    if output_format == "files" and schema[
+        "schema_name"
+    ] in database_repository.get_all_schemas(database):
 
         click.echo("Schema already exists.")
 
@@ -58,24 +168,629 @@ def create_schema_command():
         )
 
         if schema_exists_decision["choice"] == "Regenerate":
-            database_repository.delete_schema(database, schema["schema_name"])
+            regenerate = True
             action = "regenerated"
         else:
             action = "updated"
 
-    create_schema_in(
+    if regenerate:
+        report = regenerate_schema_in(
+            database_repository, schema["schema_name"], template["schema_template"]
+        )
+    else:
+        writer = open_output_writer(output_format, output_path)
+        try:
+            report = create_schema_in(
+                database_repository,
+                schema["schema_name"],
+                template["schema_template"],
+                replace=False,
+                writer=writer,
+            )
+        finally:
+            if writer is not None:
+                writer.close()
+
+    for diagnostic in report.column_diagnostics:
+        click.echo(f"{diagnostic.severity}: {diagnostic}", err=True)
+    click.echo(f"Schema {action} successfully: {report}.", err=err)
+
+
+@cli.command(name="generate-batch")
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of schemas to generate in parallel. Defaults to the CPU count.",
+)
+@click.option(
+    "--replace", is_flag=True, help="Overwrite objects that already exist."
+)
+@click.option(
+    "--env",
+    "environments",
+    multiple=True,
+    help="Also write the objects of this environment, with the overrides of the "
+    "schema template. Repeat for more environments.",
+)
+@output_options
+def generate_batch_command(
+    manifest, jobs, replace, environments, output_format, output_path
+):
+    """Create all schemas listed in a manifest without prompting."""
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.main import create_schemas_in, read_batch_manifest
+
+    database_repository = DatabaseRepository()
+    entries = read_batch_manifest(database_repository, manifest)
+    err = output_format == "ndjson" and output_path == "-"
+
+    if environments:
+        writer = open_environment_writer(
+            database_repository, environments, output_format, output_path, replace
+        )
+    else:
+        writer = open_output_writer(output_format, output_path)
+    try:
+        results = create_schemas_in(
+            database_repository, entries, replace=replace, jobs=jobs, writer=writer
+        )
+    finally:
+        if writer is not None:
+            writer.close()
+
+    failed = 0
+    for result in results:
+        if result["error"]:
+            failed += 1
+            click.echo(f"{result['schema']}: failed: {result['error']}", err=True)
+        else:
+            click.echo(
+                f"{result['schema']}: generated from {result['template']}: "
+                f"{result['report']}",
+                err=err,
+            )
+
+    click.echo(f"{len(results) - failed} of {len(results)} schemas generated.", err=err)
+    if failed:
+        raise SystemExit(1)
+
+
+@cli.command(name="materialize")
+@click.argument("source", default="-")
+@click.option(
+    "--replace", is_flag=True, help="Overwrite objects that already exist."
+)
+def materialize_command(source, replace):
+    """Write objects from an ndjson stream, tar or zip archive to the object tree."""
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.main import materialize_objects
+
+    database_repository = DatabaseRepository()
+    report = materialize_objects(database_repository, source, replace=replace)
+    click.echo(f"Objects materialized: {report}.")
+
+
+@cli.command(name="watch")
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--poll",
+    "poll_interval",
+    type=click.FloatRange(min=0.01),
+    default=None,
+    help="Poll for changes every this many seconds instead of using inotify.",
+)
+def watch_command(manifest, poll_interval):
+    """Regenerate the objects affected by each template change in a manifest."""
+    import time
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.file_watcher import open_file_watcher
+    from snowgen.main import SchemaWatch, read_batch_manifest
+
+    database_repository = DatabaseRepository()
+    watch = SchemaWatch(
+        database_repository, read_batch_manifest(database_repository, manifest)
+    )
+    report, _ = watch.generate_all()
+    click.echo(f"Schemas generated: {report}.")
+
+    watcher = open_file_watcher(watch.watched_paths(), poll_interval)
+    click.echo(f"Watching for changes with {type(watcher).__name__}. Ctrl+C stops.")
+    try:
+        while True:
+            changes = watcher.wait()
+            start = time.perf_counter()
+            try:
+                report, touched = watch.generate(watch.scopes_for(changes))
+            except Exception as e:
+                click.echo(f"Generation failed: {e}", err=True)
+                continue
+            if touched:
+                elapsed = (time.perf_counter() - start) * 1000
+                click.echo(
+                    f"{len(changes)} changed file(s): {touched} schema(s) "
+                    f"regenerated in {elapsed:.0f} ms: {report}."
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def parse_update_selector(selector):
+    """
+    Parse `all [object_type <type>]` or `database <database> [schema <schema>]
+    [object_type <type>]` into a dict of the given keys.
+    """
+    words = list(selector)
+    if words[:1] == ["all"]:
+        words = words[1:]
+        allowed = ("object_type",)
+    else:
+        allowed = ("database", "schema", "object_type")
+        if words[:1] != ["database"]:
+            raise click.UsageError(
+                "Select objects with `all` or `database <database_name>`."
+            )
+
+    selection = {}
+    if len(words) % 2:
+        raise click.UsageError(f"Missing a value after `{words[-1]}`.")
+    for key, value in zip(words[::2], words[1::2]):
+        if key not in allowed or key in selection:
+            raise click.UsageError(f"Unexpected `{key}`.")
+        selection[key] = value
+    if "schema" in selection and "database" not in selection:
+        raise click.UsageError("A schema needs a database.")
+    return selection
+
+
+@cli.command(name="update")
+@click.argument("selector", nargs=-1, required=True)
+@click.option(
+    "--dry-run", is_flag=True, help="Only print the objects that would be updated."
+)
+def update_command(selector, dry_run):
+    """
+    Update the objects affected by template changes.
+
+    SELECTOR is `all [object_type <type>]` or `database <database_name>
+    [schema <schema_name>] [object_type <type>]`.
+    """
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.dependency_graph import DependencyGraph
+    from snowgen.main import SCHEMA_TEMPLATE_SECTIONS, update_objects
+
+    selection = parse_update_selector(selector)
+    object_types = None
+    if "object_type" in selection:
+        if selection["object_type"] not in SCHEMA_TEMPLATE_SECTIONS.values():
+            raise click.UsageError(
+                f"Unknown object type {selection['object_type']}, choose from "
+                + ", ".join(SCHEMA_TEMPLATE_SECTIONS.values())
+                + "."
+            )
+        object_types = {selection["object_type"]}
+
+    database_repository = DatabaseRepository()
+    graph = DependencyGraph.build(database_repository)
+    for error in graph.errors:
+        click.echo(f"Skipped {error}.", err=True)
+
+    changes = graph.changes()
+    impacted = graph.impact(
+        changes,
+        database=selection.get("database"),
+        schema=selection.get("schema"),
+        object_types=object_types,
+    )
+    outside = len(graph.impact(changes)) - len(impacted)
+
+    if not impacted:
+        click.echo("All selected objects are up to date.")
+    else:
+        click.echo(f"{len(impacted)} object(s) affected:")
+        for key in sorted(impacted):
+            node = impacted[key]
+            if node[0] == "object":
+                cause = f"source {node[1]} is affected"
+            else:
+                cause = changes[node]
+            click.echo(f"  {key}: {cause}")
+    if outside > 0:
+        click.echo(f"{outside} more affected object(s) are outside the selection.")
+    if not impacted or dry_run:
+        return
+
+    report = update_objects(
+        database_repository, graph, impacted, object_types=object_types
+    )
+    click.echo(f"Objects updated: {report}.")
+
+
+@cli.command(name="plan")
+@click.option("--database", help="Only plan the objects of this database.")
+@click.option("--schema", help="Only plan the objects of this schema.")
+@click.option(
+    "--format",
+    "plan_format",
+    type=click.Choice(("json", "scripts")),
+    default="json",
+    help="Print the plan as JSON or write one bundled script per level.",
+)
+@click.option(
+    "--output-path",
+    "-o",
+    default="-",
+    help="File to write the JSON plan to, or folder for the scripts. "
+    "Defaults to stdout for JSON.",
+)
+def plan_command(database, schema, plan_format, output_path):
+    """Plan the deployment of the objects in levels that can run in parallel."""
+    import sys
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.deployment_plan import DependencyCycleError, DeploymentPlan
+
+    if plan_format == "scripts" and output_path == "-":
+        raise click.UsageError("Scripts need a folder, pass it with --output-path.")
+
+    database_repository = DatabaseRepository()
+    try:
+        plan = DeploymentPlan.build(database_repository, database=database, schema=schema)
+    except DependencyCycleError as e:
+        raise click.ClickException(str(e))
+
+    if plan_format == "scripts":
+        paths = plan.write_scripts(output_path)
+    elif output_path == "-":
+        plan.write_json(sys.stdout)
+        return
+    else:
+        with open(output_path, "w", encoding="utf-8") as file:
+            plan.write_json(file)
+        paths = [output_path]
+
+    click.echo(
+        f"Planned {len(plan.objects)} objects in {len(plan.levels)} levels, "
+        f"written to {len(paths)} file(s)."
+    )
+
+
+def driver_options(command):
+    command = click.option(
+        "--driver-option",
+        "driver_options",
+        multiple=True,
+        metavar="KEY=VALUE",
+        help="Option passed to the driver, such as account=xy12345 or latency=0.05.",
+    )(command)
+    command = click.option(
+        "--driver",
+        default="snowflake",
+        show_default=True,
+        help="Driver to run statements with: snowflake, fake or module:attribute.",
+    )(command)
+    return command
+
+
+def open_driver(driver, driver_options):
+    from snowgen.drivers import load_driver
+
+    options = {}
+    for option in driver_options:
+        key, separator, value = option.partition("=")
+        if not separator:
+            raise click.UsageError(f"Driver options look like KEY=VALUE, not {option}.")
+        options[key] = value
+    try:
+        return load_driver(driver, options)
+    except (ValueError, ImportError, AttributeError) as e:
+        raise click.UsageError(str(e))
+
+
+@cli.command(name="apply")
+@click.option("--database", help="Only apply the objects of this database.")
+@click.option("--schema", help="Only apply the objects of this schema.")
+@click.option(
+    "--env",
+    "environment",
+    help="Environment to apply, filling in the {env} slots of the DDL. The "
+    "tree of the environment is used when it was generated.",
+)
+@driver_options
+@click.option(
+    "--concurrency",
+    "-c",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of connections, and of objects applied at once.",
+)
+@click.option(
+    "--retries",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="Times an object is retried after a transient error.",
+)
+@click.option(
+    "--backoff",
+    type=click.FloatRange(min=0),
+    default=0.5,
+    show_default=True,
+    help="Seconds before the first retry, doubling with every retry.",
+)
+@click.option(
+    "--log",
+    "log_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="NDJSON file for the result of every object. "
+    "Defaults to apply_log.ndjson in the cache folder.",
+)
+def apply_command(
+    database,
+    schema,
+    environment,
+    driver,
+    driver_options,
+    concurrency,
+    retries,
+    backoff,
+    log_path,
+):
+    """Execute the DDL of the objects, level by level, on a connection pool."""
+    import time
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.ddl_executor import DdlExecutor
+    from snowgen.deployment_plan import DependencyCycleError, DeploymentPlan
+
+    driver = open_driver(driver, driver_options)
+    database_repository = DatabaseRepository()
+    try:
+        plan = DeploymentPlan.build(
+            database_repository,
+            database=database,
+            schema=schema,
+            environment=environment,
+        )
+    except DependencyCycleError as e:
+        raise click.ClickException(str(e))
+
+    if log_path is None:
+        database_repository.cache_path.mkdir(parents=True, exist_ok=True)
+        log_path = database_repository.cache_path / "apply_log.ndjson"
+
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        results = DdlExecutor(
+            driver,
+            concurrency=concurrency,
+            retries=retries,
+            backoff=backoff,
+            log=log,
+        ).apply(plan)
+    elapsed = time.perf_counter() - start
+
+    counts = {"applied": 0, "failed": 0, "skipped": 0}
+    for result in results.values():
+        counts[result["status"]] += 1
+        if result["status"] == "failed":
+            click.echo(f"{result['path']}: failed: {result['error']}", err=True)
+
+    click.echo(
+        f"Applied {len(results)} objects in {len(plan.levels)} levels in "
+        f"{elapsed:.2f} s: "
+        + ", ".join(f"{count} {status}" for status, count in counts.items())
+        + f". Results logged to {log_path}."
+    )
+    if counts["failed"] or counts["skipped"]:
+        raise SystemExit(1)
+
+
+@cli.command(name="introspect")
+@click.argument("database")
+@click.argument("schema")
+@click.option(
+    "--schema-template",
+    help="Schema template to render the tables with. "
+    "Defaults to the template the schema was generated with.",
+)
+@click.option(
+    "--remote-database", help="Name of the database in the warehouse, if it differs."
+)
+@click.option(
+    "--remote-schema", help="Name of the schema in the warehouse, if it differs."
+)
+@click.option(
+    "--full", is_flag=True, help="Query all columns, not only those of altered tables."
+)
+@click.option(
+    "--snapshot-only", is_flag=True, help="Update the snapshot without writing files."
+)
+@driver_options
+def introspect_command(
+    database,
+    schema,
+    schema_template,
+    remote_database,
+    remote_schema,
+    full,
+    snapshot_only,
+    driver,
+    driver_options,
+):
+    """
+    Snapshot the metadata of a schema from the warehouse and rewrite its
+    tables with the columns and data types found there.
+    """
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.drivers import DriverError
+    from snowgen.introspection import MetadataSnapshot, SchemaIntrospector
+    from snowgen.main import regenerate_tables_from_snapshot
+    from snowgen.object_writers.generation_manifest import GenerationManifest
+
+    driver = open_driver(driver, driver_options)
+    database_repository = DatabaseRepository()
+
+    schema_config = None
+    if not snapshot_only:
+        if schema_template is None:
+            manifest = GenerationManifest.for_schema(
+                database_repository, database, schema
+            )
+            schema_template = manifest.generation.get("schema_template")
+        if schema_template is None:
+            raise click.UsageError(
+                f"{database}.{schema} was not generated by snowgen, "
+                "pass --schema-template or --snapshot-only."
+            )
+        schema_config = database_repository.get_schema_template(schema_template)
+        if schema_config is None:
+            raise click.UsageError(f"Unknown schema template {schema_template}.")
+        if schema_config["database"] != database:
+            raise click.UsageError(
+                f"Schema template {schema_template} generates objects in "
+                f"{schema_config['database']}, not {database}."
+            )
+
+    snapshot = MetadataSnapshot.for_schema(database_repository, database, schema)
+    try:
+        altered = SchemaIntrospector(driver).refresh(
+            snapshot, remote_database, remote_schema, full=full
+        )
+    except DriverError as e:
+        raise click.ClickException(str(e))
+    snapshot.save()
+    click.echo(
+        f"Found {len(snapshot.tables)} tables and {len(snapshot.stages)} stages, "
+        f"read the columns of {len(altered)} altered tables. "
+        f"Snapshot saved to {snapshot.snapshot_file}."
+    )
+
+    if schema_config is not None:
+        try:
+            report = regenerate_tables_from_snapshot(
+                database_repository, schema_config, snapshot, altered
+            )
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Tables written: {report}")
+
+
+@cli.command(name="migrate")
+@click.argument("database")
+@click.argument("schema")
+@click.option(
+    "--schema-template",
+    help="Schema template to render the tables with. "
+    "Defaults to the template the schema was generated with.",
+)
+@click.option("--delimiter", help="Delimiter of the template files, if not detected.")
+def migrate_command(database, schema, schema_template, delimiter):
+    """
+    Write ALTER TABLE migrations for the tables of a schema whose template
+    files gained, lost or renamed columns, instead of replacing the tables.
+    """
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.main import migrate_schema_in
+    from snowgen.object_writers.generation_manifest import GenerationManifest
+
+    database_repository = DatabaseRepository()
+    generation = GenerationManifest.for_schema(
+        database_repository, database, schema
+    ).generation
+    schema_template = schema_template or generation.get("schema_template")
+    if schema_template is None:
+        raise click.UsageError(
+            f"{database}.{schema} was not generated by snowgen, "
+            "pass --schema-template."
+        )
+    schema_config = database_repository.get_schema_template(schema_template)
+    if schema_config is None:
+        raise click.UsageError(f"Unknown schema template {schema_template}.")
+    if schema_config["database"] != database:
+        raise click.UsageError(
+            f"Schema template {schema_template} generates objects in "
+            f"{schema_config['database']}, not {database}."
+        )
+
+    report, migrations = migrate_schema_in(
         database_repository,
-        schema["schema_name"],
-        template["schema_template"],
-        replace=False,
+        schema,
+        schema_template,
+        delimiter=delimiter or generation.get("delimiter"),
+    )
+    for diagnostic in report.column_diagnostics:
+        click.echo(f"{diagnostic.severity}: {diagnostic}", err=True)
+    for migration in migrations:
+        click.echo(f"  {migration}")
+    click.echo(f"{len(migrations)} migration(s) written, tables: {report}.")
+
+
+@cli.command(name="query")
+@click.option("--database", help="Only objects in this database.")
+@click.option("--schema", help="Only objects in this schema.")
+@click.option(
+    "--object-type", help="Only objects of this type, such as tables or dynamic_tables."
+)
+@click.option("--name", help="Only objects whose name matches this glob pattern.")
+@click.option("--column", help="Only objects with this column.")
+@click.option(
+    "--source",
+    help="Only objects derived from this source, as [database.][schema.]object.",
+)
+@click.option("--json", "as_json", is_flag=True, help="Print the objects as JSON.")
+def query_command(database, schema, object_type, name, column, source, as_json):
+    """Find objects in the object catalog."""
+    import json
+    from snowgen.database_repository.database_repository import DatabaseRepository
+
+    database_repository = DatabaseRepository()
+    entries = database_repository.get_catalog().find(
+        database=database,
+        schema=schema,
+        object_type=object_type,
+        name=name,
+        column=column,
+        source=source,
     )
 
-    click.echo(f"Schema {action} successfully.")
+    if as_json:
+        click.echo(json.dumps(entries, indent=2))
+        return
+    for entry in entries:
+        click.echo(entry["path"])
+
+
+@cli.command(name="reindex")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes parsing changed files. Defaults to the CPU count.",
+)
+def reindex_command(jobs):
+    """Rebuild the object catalog from the object files."""
+    from snowgen.database_repository.database_repository import DatabaseRepository
+
+    database_repository = DatabaseRepository()
+    counts = database_repository.reindex_catalog(jobs=jobs)
+    click.echo(
+        "Catalog reindexed: "
+        + ", ".join(f"{count} {status}" for status, count in counts.items())
+        + "."
+    )
 
 
 @cli.command(name="init")
 def init_repository():
     """Create a new database."""
+    from snowgen.database_repository.database_repository import DatabaseRepository
+    from snowgen.main import init
+
     database_repository = DatabaseRepository()
     init(database_repository)
     click.echo("New project set up and completed.")
@@ -0,0 +1,300 @@
+import re
+
+RESERVED_KEYWORDS = frozenset(
+    [
+        "ACCOUNT",
+        "ALL",
+        "ALTER",
+        "AND",
+        "ANY",
+        "AS",
+        "BETWEEN",
+        "BY",
+        "CASE",
+        "CAST",
+        "CHECK",
+        "COLUMN",
+        "CONNECT",
+        "CONNECTION",
+        "CONSTRAINT",
+        "CREATE",
+        "CROSS",
+        "CURRENT",
+        "CURRENT_DATE",
+        "CURRENT_TIME",
+        "CURRENT_TIMESTAMP",
+        "CURRENT_USER",
+        "DATABASE",
+        "DELETE",
+        "DISTINCT",
+        "DROP",
+        "ELSE",
+        "EXISTS",
+        "FALSE",
+        "FOLLOWING",
+        "FOR",
+        "FROM",
+        "FULL",
+        "GRANT",
+        "GROUP",
+        "GSCLUSTER",
+        "HAVING",
+        "ILIKE",
+        "IN",
+        "INCREMENT",
+        "INNER",
+        "INSERT",
+        "INTERSECT",
+        "INTO",
+        "IS",
+        "ISSUE",
+        "JOIN",
+        "LATERAL",
+        "LEFT",
+        "LIKE",
+        "LOCALTIME",
+        "LOCALTIMESTAMP",
+        "MINUS",
+        "NATURAL",
+        "NOT",
+        "NULL",
+        "OF",
+        "ON",
+        "OR",
+        "ORDER",
+        "ORGANIZATION",
+        "QUALIFY",
+        "REGEXP",
+        "REVOKE",
+        "RIGHT",
+        "RLIKE",
+        "ROW",
+        "ROWS",
+        "SAMPLE",
+        "SCHEMA",
+        "SELECT",
+        "SET",
+        "SOME",
+        "START",
+        "TABLE",
+        "TABLESAMPLE",
+        "THEN",
+        "TO",
+        "TRIGGER",
+        "TRUE",
+        "TRY_CAST",
+        "UNION",
+        "UNIQUE",
+        "UPDATE",
+        "USING",
+        "VALUES",
+        "VIEW",
+        "WHEN",
+        "WHENEVER",
+        "WHERE",
+        "WITH",
+    ]
+)
+
+MAX_COLUMN_NAME_LENGTH = 128
+
+UNQUOTED_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+NOT_IDENTIFIER_CHARACTERS = re.compile(r"[^A-Za-z0-9_$]+")
+
+# Code, severity and message of every check, in the order they are reported.
+CHECKS = {
+    "empty": ("error", "Column name is empty"),
+    "duplicate": ("error", "Column name is used more than once"),
+    "too_long": ("error", f"Column name exceeds {MAX_COLUMN_NAME_LENGTH} characters"),
+    "duplicate_ignoring_case": (
+        "warning",
+        "Column name differs from another one only in case",
+    ),
+    "reserved_keyword": ("warning", "Column name is a reserved keyword"),
+    "starts_with_digit": ("warning", "Column name starts with a digit"),
+    "needs_quoting": ("warning", "Column name has characters that need quoting"),
+}
+
+CHECK_ORDER = {code: i for i, code in enumerate(CHECKS)}
+
+
+def column_problems(column):
+    """
+    Return the codes of the checks a single column name fails, leaving out
+    the duplicate checks that need the other columns of its table.
+    """
+    if not column:
+        return ["empty"]
+    problems = []
+    if len(column) > MAX_COLUMN_NAME_LENGTH:
+        problems.append("too_long")
+    if UNQUOTED_IDENTIFIER.fullmatch(column) is None:
+        if column[0].isdigit():
+            problems.append("starts_with_digit")
+        else:
+            problems.append("needs_quoting")
+    elif column.upper() in RESERVED_KEYWORDS:
+        problems.append("reserved_keyword")
+    return problems
+
+
+def normalize_column_name(column, position):
+    """
+    Turn a column name into one that needs no quoting: characters outside
+    letters, digits, _ and $ become _, a leading digit or a reserved keyword
+    gets a _ added and the name is cut to the maximum length.
+    """
+    name = NOT_IDENTIFIER_CHARACTERS.sub("_", column.strip()).strip("_")
+    if not name:
+        name = f"column_{position}"
+    if name[0].isdigit():
+        name = "_" + name
+    if name.upper() in RESERVED_KEYWORDS:
+        name += "_"
+    return name[:MAX_COLUMN_NAME_LENGTH]
+
+
+def deduplicate_columns(columns):
+    """
+    Return a list of column names with every repeated name given a _2, _3, ...
+    suffix, as a renamed column colliding with another one gets, so that the
+    names can key a dict without losing columns.
+    """
+    taken = set(columns)
+    seen = set()
+    names = []
+    for column in columns:
+        if column in seen:
+            candidate, suffix = column, 2
+            while candidate in taken:
+                ending = f"_{suffix}"
+                candidate = column[: MAX_COLUMN_NAME_LENGTH - len(ending)] + ending
+                suffix += 1
+            taken.add(candidate)
+            column = candidate
+        seen.add(column)
+        names.append(column)
+    return names
+
+
+class ColumnDiagnostic:
+    """A problem with a column of a table, found by a ColumnValidator."""
+
+    __slots__ = ("table", "position", "column", "code", "renamed_to")
+
+    def __init__(self, table, position, column, code, renamed_to=None):
+        self.table = table
+        self.position = position
+        self.column = column
+        self.code = code
+        self.renamed_to = renamed_to
+
+    @property
+    def severity(self):
+        return CHECKS[self.code][0]
+
+    @property
+    def message(self):
+        return CHECKS[self.code][1]
+
+    def to_dict(self):
+        return {
+            "table": self.table,
+            "position": self.position,
+            "column": self.column,
+            "code": self.code,
+            "severity": self.severity,
+            "message": self.message,
+            "renamed_to": self.renamed_to,
+        }
+
+    def __str__(self):
+        text = f"{self.table}: column {self.position} {self.column!r}: {self.message}"
+        if self.renamed_to is not None:
+            text += f", renamed to {self.renamed_to!r}"
+        return text
+
+
+def validate_columns(table, columns, rename=False):
+    """
+    Check the columns of a table, a list of names or a dict of names to data
+    types. Returns the columns, with the failing ones renamed when rename is
+    set, and a list of ColumnDiagnostic.
+    """
+    names = list(columns)
+    diagnostics = []
+    renamed = {}
+    seen = set()
+    folded = {}
+
+    for position, column in enumerate(names, start=1):
+        problems = column_problems(column)
+        key = column.upper()
+        if column in seen:
+            problems.append("duplicate")
+        elif key in folded:
+            problems.append("duplicate_ignoring_case")
+        seen.add(column)
+        folded.setdefault(key, position)
+        if not problems:
+            continue
+
+        new_name = None
+        if rename:
+            new_name = normalize_column_name(column, position)
+            renamed[position] = new_name
+        for code in sorted(problems, key=CHECK_ORDER.__getitem__):
+            diagnostics.append(
+                ColumnDiagnostic(table, position, column, code, new_name)
+            )
+
+    if not renamed:
+        return columns, diagnostics
+
+    # Renamed columns may collide with each other or with the other columns.
+    taken = {
+        column.upper()
+        for position, column in enumerate(names, start=1)
+        if position not in renamed
+    }
+    for position, new_name in renamed.items():
+        candidate, suffix = new_name, 2
+        while candidate.upper() in taken:
+            ending = f"_{suffix}"
+            candidate = new_name[: MAX_COLUMN_NAME_LENGTH - len(ending)] + ending
+            suffix += 1
+        taken.add(candidate.upper())
+        renamed[position] = candidate
+        names[position - 1] = candidate
+    for diagnostic in diagnostics:
+        diagnostic.renamed_to = renamed[diagnostic.position]
+
+    if isinstance(columns, dict):
+        return dict(zip(names, columns.values())), diagnostics
+    return names, diagnostics
+
+
+class ColumnValidator:
+    """
+    Validate the columns of every table of a schema in one pass.
+
+    validate() wraps a stream of table objects and yields them with their
+    columns checked, and renamed when rename is set, while the diagnostics
+    of all tables are collected.
+    """
+
+    def __init__(self, rename=False):
+        self.rename = rename
+        self.diagnostics = []
+
+    def validate(self, tables):
+        for table in tables:
+            table["columns"], diagnostics = validate_columns(
+                table["object_name"], table["columns"], self.rename
+            )
+            self.diagnostics.extend(diagnostics)
+            yield table
+
+    @property
+    def errors(self):
+        return [d for d in self.diagnostics if d.severity == "error"]
@@ -0,0 +1,39 @@
+import re
+
+SLOT_PATTERN = re.compile(r"\{env(?::(\w+))?\}")
+
+
+def environment_slot(key):
+    """Return the slot a placeholder overridden per environment renders as."""
+    return f"{{env:{key}}}"
+
+
+class EnvironmentTemplate:
+    """
+    A rendered object with slots for the values that differ between
+    environments: `{env}` for the environment and `{env:<key>}` for the
+    placeholders a schema template overrides per environment.
+
+    The DDL is split at its slots once, so filling them in for every
+    environment is a join rather than a render.
+    """
+
+    def __init__(self, ddl):
+        self._parts = SLOT_PATTERN.split(ddl)
+
+    @property
+    def slots(self):
+        return {part or "env" for part in self._parts[1::2]}
+
+    def render(self, values):
+        if len(self._parts) == 1:
+            return self._parts[0]
+        parts = list(self._parts)
+        for i in range(1, len(parts), 2):
+            key = parts[i] or "env"
+            if key not in values:
+                raise ValueError(
+                    f"Environment {values.get('env')} has no value for {key}"
+                )
+            parts[i] = str(values[key])
+        return "".join(parts)
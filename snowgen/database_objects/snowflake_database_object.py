@@ -1,7 +1,27 @@
 from pathlib import Path
+from snowgen.database_objects.sql_template import SqlTemplate
 
 
 class SnowflakeDatabaseObject:
+    """
+    A database object to render. Objects are short-lived and many are
+    created per schema, so they use slots and read their columns, pattern
+    and source from the kwargs they were created with rather than copying
+    them.
+    """
+
+    __slots__ = (
+        "role",
+        "database",
+        "schema",
+        "object_name",
+        "object_type",
+        "kwargs",
+        "table_columns",
+        "formatted_transformations",
+    )
+
+    env = "{env}"
 
     def __init__(
         self,
@@ -18,26 +38,69 @@ class SnowflakeDatabaseObject:
         self.object_name = object_name.lower()
         self.object_type = object_type
         self.kwargs = kwargs
-        self.pattern = []
-        self.env = "{env}"
 
         if "columns" in kwargs and object_type == "tables":
-            self.columns = kwargs["columns"]
             self.table_columns = self.format_table_columns(kwargs["columns"])
         elif object_type == "dynamic_tables":
-            if "pattern" in kwargs:
-                self.pattern = kwargs["pattern"]
-            self.columns = kwargs["columns"]
+            for key in ("columns", "source_database", "source_schema", "source_object"):
+                if key not in kwargs:
+                    raise KeyError(key)
             self.formatted_transformations = self.format_transformations()
-            self.source_database = kwargs["source_database"]
-            self.source_schema = kwargs["source_schema"]
-            self.source_object = kwargs["source_object"]
 
     def __str__(self):
         return f"{self.role}.{self.database}.{self.schema}.{self.object_name}"
 
+    @property
+    def columns(self):
+        if self.object_type in ("tables", "dynamic_tables"):
+            return self.kwargs.get("columns")
+        return None
+
+    @property
+    def pattern(self):
+        if self.object_type == "dynamic_tables":
+            return self.kwargs.get("pattern", [])
+        return []
+
+    @property
+    def source_database(self):
+        return self.kwargs.get("source_database")
+
+    @property
+    def source_schema(self):
+        return self.kwargs.get("source_schema")
+
+    @property
+    def source_object(self):
+        return self.kwargs.get("source_object")
+
+    @property
+    def name(self):
+        """The name of the object, with the prefix and suffix of its definition."""
+        prefix = self.kwargs.get("prefix", "")
+        suffix = self.kwargs.get("suffix", "")
+        return "_".join([part for part in [prefix, self.object_name, suffix] if part])
+
     def to_dict(self):
-        return self.__dict__
+        """Return the values the object provides to its template."""
+        values = {
+            "role": self.role,
+            "database": self.database,
+            "schema": self.schema,
+            "object_name": self.object_name,
+            "object_type": self.object_type,
+            "kwargs": self.kwargs,
+            "pattern": self.pattern,
+            "env": self.env,
+        }
+        if self.object_type == "tables" and "columns" in self.kwargs:
+            values["columns"] = self.kwargs["columns"]
+            values["table_columns"] = self.table_columns
+        elif self.object_type == "dynamic_tables":
+            for key in ("columns", "source_database", "source_schema", "source_object"):
+                values[key] = self.kwargs[key]
+            values["formatted_transformations"] = self.formatted_transformations
+        return values
 
     def generate_object_path(self, snowflake_objects_path):
         if isinstance(snowflake_objects_path, dict):
@@ -56,159 +119,52 @@ class SnowflakeDatabaseObject:
         )
 
     def generate_filename(self):
+        return self.name.lower() + ".sql"
 
-        prefix = self.kwargs.get("prefix", "")
-        suffix = self.kwargs.get("suffix", "")
-        return (
-            "_".join(
-                [part for part in [prefix, self.object_name, suffix] if part]
-            ).lower()
-            + ".sql"
-        )
+    @staticmethod
+    def get_replacement_keys(object_type, object_keys):
+        """
+        Return the placeholder names get_ddl provides for an object of the given
+        type built from a definition with the given keys.
+        """
+        keys = {
+            "role",
+            "database",
+            "schema",
+            "object_name",
+            "object_type",
+            "kwargs",
+            "pattern",
+            "env",
+            "name",
+            *object_keys,
+        }
+        if "columns" in keys and object_type == "tables":
+            keys.add("table_columns")
+        elif object_type == "dynamic_tables":
+            keys.add("formatted_transformations")
+        return keys
 
     def get_ddl(self, sql_template, **kwargs):
 
-        replacements = {**self.__dict__, **kwargs}
-        prefix = self.kwargs.get("prefix", "")
-        suffix = self.kwargs.get("suffix", "")
-        replacements["name"] = "_".join(
-            [part for part in [prefix, self.object_name, suffix] if part]
-        )
+        replacements = {**self.to_dict(), **kwargs}
+        replacements["name"] = self.name
+
+        if isinstance(sql_template, SqlTemplate):
+            return sql_template.render(replacements)
 
         ddl = sql_template.format(**replacements)
 
         return ddl
 
-    def get_reserved_keywords(self):
-        return [
-            "ACCOUNT",
-            "ALL",
-            "ALTER",
-            "AND",
-            "ANY",
-            "AS",
-            "BETWEEN",
-            "BY",
-            "CASE",
-            "CAST",
-            "CHECK",
-            "COLUMN",
-            "CONNECT",
-            "CONNECTION",
-            "CONSTRAINT",
-            "CREATE",
-            "CROSS",
-            "CURRENT",
-            "CURRENT_DATE",
-            "CURRENT_TIME",
-            "CURRENT_TIMESTAMP",
-            "CURRENT_USER",
-            "DATABASE",
-            "DELETE",
-            "DISTINCT",
-            "DROP",
-            "ELSE",
-            "EXISTS",
-            "FALSE",
-            "FOLLOWING",
-            "FOR",
-            "FROM",
-            "FULL",
-            "GRANT",
-            "GROUP",
-            "GSCLUSTER",
-            "HAVING",
-            "ILIKE",
-            "IN",
-            "INCREMENT",
-            "INNER",
-            "INSERT",
-            "INTERSECT",
-            "INTO",
-            "IS",
-            "ISSUE",
-            "JOIN",
-            "LATERAL",
-            "LEFT",
-            "LIKE",
-            "LOCALTIME",
-            "LOCALTIMESTAMP",
-            "MINUS",
-            "NATURAL",
-            "NOT",
-            "NULL",
-            "OF",
-            "ON",
-            "OR",
-            "ORDER",
-            "ORGANIZATION",
-            "QUALIFY",
-            "REGEXP",
-            "REVOKE",
-            "RIGHT",
-            "RLIKE",
-            "ROW",
-            "ROWS",
-            "SAMPLE",
-            "SCHEMA",
-            "SELECT",
-            "SET",
-            "SOME",
-            "START",
-            "TABLE",
-            "TABLESAMPLE",
-            "THEN",
-            "TO",
-            "TRIGGER",
-            "TRUE",
-            "TRY_CAST",
-            "UNION",
-            "UNIQUE",
-            "UPDATE",
-            "USING",
-            "VALUES",
-            "VIEW",
-            "WHEN",
-            "WHENEVER",
-            "WHERE",
-            "WITH",
-        ]
-
-    def check_column_validity(self, column, reserved_keywords):
-        comment = ""
-        if column in reserved_keywords:
-            comment += " -- This column name is not allowed"
-        if isinstance(column[0], int):
-            comment += " -- Column name cannot start with a number"
-        if len(column) > 128:
-            comment += " -- Column name should not exceed 128 characters"
-        return comment
-
     def format_table_columns(self, columns):
-        reserved_keywords = self.get_reserved_keywords()
+        # Column names are quoted, and problems with them are reported by the
+        # ColumnValidator of the generation, so no comments are added here.
         if isinstance(columns, list):
-            formatted_columns = ",\n    ".join(
-                [
-                    (
-                        f'"{col}" VARCHAR'
-                        + self.check_column_validity(
-                            column=col, reserved_keywords=reserved_keywords
-                        )
-                    )
-                    for col in columns
-                ]
-            )
+            formatted_columns = ",\n    ".join([f'"{col}" VARCHAR' for col in columns])
         elif isinstance(columns, dict):
             formatted_columns = ",\n    ".join(
-                [
-                    (
-                        f'"{col}" {dtype}'
-                        + self.check_column_validity(
-                            column=col, reserved_keywords=reserved_keywords
-                        )
-                    )
-                    for col, dtype in columns.items()
-                ]
+                [f'"{col}" {dtype}' for col, dtype in columns.items()]
             )
         else:
             raise ValueError("Columns should be either a list or a dictionary")
@@ -224,7 +180,6 @@ class SnowflakeDatabaseObject:
         Returns:
             list: A list of formatted transformation strings.
         """
-        reserved_keywords = self.get_reserved_keywords()
         all_transformations = []
 
         if (
@@ -233,13 +188,7 @@ class SnowflakeDatabaseObject:
             and all(isinstance(t, str) for t in self.columns)
         ):
             for column in self.columns:
-                all_transformations.append(
-                    self.pattern.format(column_name=column)
-                    + self.check_column_validity(
-                        column=column,
-                        reserved_keywords=reserved_keywords,
-                    )
-                )
+                all_transformations.append(self.pattern.format(column_name=column))
 
         else:
             raise ValueError(
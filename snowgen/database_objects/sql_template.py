@@ -0,0 +1,118 @@
+import hashlib
+import re
+from string import Formatter
+
+INCLUDE_PATTERN = re.compile(r"^[ \t]*--[ \t]*@include[ \t]+(\S+)[ \t]*$", re.MULTILINE)
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class SqlTemplate:
+    """
+    A SQL template compiled once into literal text and placeholders.
+
+    Templates use the `str.format` placeholder syntax. A line of the form
+    `-- @include <template_name>` is replaced with the compiled snippet of that
+    name, which is resolved through `loader`.
+    """
+
+    def __init__(self, text, name=None, loader=None):
+        self.name = name
+        self.text = text
+        self.includes = []
+        self.required_keys = set()
+        self._segments = []
+
+        self._compile(text, loader)
+
+        source_hash = hashlib.sha256(text.encode("utf-8"))
+        for include in self.includes:
+            source_hash.update(loader(include).source_hash.encode("utf-8"))
+        self.source_hash = source_hash.hexdigest()
+
+    def _compile(self, text, loader):
+        position = 0
+        for match in INCLUDE_PATTERN.finditer(text):
+            self._parse(text[position : match.start()])
+            if loader is None:
+                raise TemplateError(
+                    f"Template {self.name} includes {match.group(1)} without a loader"
+                )
+            self._include(loader(match.group(1)))
+            position = match.end()
+        self._parse(text[position:])
+
+    def _include(self, snippet):
+        segments = list(snippet._segments)
+        if segments and isinstance(segments[-1], str) and segments[-1].endswith("\n"):
+            segments[-1] = segments[-1][:-1]
+        for segment in segments:
+            self._append(segment)
+        self.required_keys |= snippet.required_keys
+        self.includes.append(snippet.name)
+        self.includes.extend(snippet.includes)
+
+    def _parse(self, text):
+        try:
+            parsed = list(Formatter().parse(text))
+        except ValueError as e:
+            raise TemplateError(f"Template {self.name} is not valid: {e}") from e
+
+        for literal, field_name, format_spec, conversion in parsed:
+            self._append(literal)
+            if field_name is None:
+                continue
+
+            key = re.split(r"[.\[]", field_name, maxsplit=1)[0]
+            if not key or key.isdigit():
+                raise TemplateError(
+                    f"Template {self.name} uses a positional placeholder "
+                    f"{{{field_name}}}, only named placeholders are supported"
+                )
+            self.required_keys.add(key)
+            if key == field_name and not format_spec and not conversion:
+                self._append((key,))
+            else:
+                self._append((key, field_name, format_spec, conversion))
+
+    def _append(self, segment):
+        if not segment:
+            return
+        if (
+            isinstance(segment, str)
+            and self._segments
+            and isinstance(self._segments[-1], str)
+        ):
+            self._segments[-1] += segment
+        else:
+            self._segments.append(segment)
+
+    def missing_keys(self, keys):
+        """Return the placeholders of this template that are not in keys."""
+        return self.required_keys.difference(keys)
+
+    def render(self, replacements):
+        missing = self.missing_keys(replacements)
+        if missing:
+            raise KeyError(", ".join(sorted(missing)))
+
+        parts = []
+        for segment in self._segments:
+            if segment.__class__ is str:
+                parts.append(segment)
+            elif len(segment) == 1:
+                parts.append(format(replacements[segment[0]]))
+            else:
+                parts.append(self._format_field(segment, replacements))
+        return "".join(parts)
+
+    def _format_field(self, segment, replacements):
+        formatter = Formatter()
+        _, field_name, format_spec, conversion = segment
+        value, _ = formatter.get_field(field_name, (), replacements)
+        value = formatter.convert_field(value, conversion)
+        if "{" in format_spec:
+            format_spec = format_spec.format(**replacements)
+        return format(value, format_spec)
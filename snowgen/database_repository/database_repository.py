@@ -1,13 +1,45 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import os
 from pathlib import Path
 import shutil
 import re
-import yaml
-import inquirer
+import threading
+from snowgen.database_objects.sql_template import SqlTemplate, TemplateError
+from snowgen.database_repository.ddl_parser import DdlParseCache, parse_table_definition
+from snowgen.database_repository.file_metadata import metadata_reader
+from snowgen.database_repository.object_catalog import ObjectCatalog, describe_object
+from snowgen.database_repository.template_file_reader import read_header
+from snowgen.database_repository.template_index import get_template_index
+from snowgen.database_repository.type_inference import (
+    DEFAULT_SAMPLE_BYTES,
+    DEFAULT_SAMPLE_ROWS,
+    infer_column_types,
+)
+from snowgen.database_repository.yaml_cache import load_yaml, yaml_cache
+from snowgen.profiler import profiler
+
+
+def _map_bounded(executor, function, items, window):
+    """
+    Like executor.map, but with at most window items in flight, so results
+    are produced as they are consumed instead of being held for all items.
+    """
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(function, item))
+    while pending:
+        yield pending.popleft().result()
 
 
 class DatabaseRepository:
 
     SQL_TEMPLATES_FOLDER_NAME = "sql_templates"
+    CACHE_FOLDER_NAME = ".snowgen"
+    HEADER_READER_WORKERS = 8
 
     _template_setup = [
         {
@@ -32,12 +64,18 @@ class DatabaseRepository:
         },
     ]
 
+    _catalog_lock = threading.Lock()
+
     def __init__(self, snowflake_path="snowflake"):
         self.snowflake_path = snowflake_path
         self.base_path = Path("./")
         self.snowflake_objects_path = (
             self.base_path / snowflake_path / "snowflake_objects"
         )
+        self.cache_path = self.base_path / self.CACHE_FOLDER_NAME
+        self._compiled_templates = {}
+        self._compiling_templates = set()
+        self._catalog = None
 
     def setup(self):
         """
@@ -68,8 +106,11 @@ class DatabaseRepository:
         )
         if delete_path.exists() and delete_path.is_dir():
             shutil.rmtree(delete_path)
+        self.get_catalog().remove_schema(database, schema)
 
     def prompt_user_for_source(self):
+        import inquirer
+
         database = inquirer.prompt(
             [
                 inquirer.List(
@@ -92,45 +133,52 @@ class DatabaseRepository:
 
         return database, schema
 
-    def prompt_user_for_delimiter(self, schema):
-        return inquirer.prompt(
-            [
-                inquirer.Text(
-                    "field_delimiter",
-                    message=f"Enter the field delimiter used in the data files for {schema}",
-                    default=",",
-                )
-            ]
-        )["field_delimiter"]
-
     """ Methods for finding and reading YAML templates """
 
     def load_yaml_file(self, yaml_file):
-        with open(yaml_file, "r") as file:
-            config = yaml.safe_load(file)
-        return config
+        return load_yaml(yaml_file)
 
-    def get_schema_templates_yaml(self):
-        return self.load_yaml_file(
-            self.base_path / "templates" / "schema_templates" / "schemas.yaml"
+    def _load_schema_templates(self):
+        """
+        Return the parsed schema templates file. The file is parsed once per
+        process and cached on disk until its mtime or size changes.
+        """
+        return yaml_cache.load(
+            self.base_path / "templates" / "schema_templates" / "schemas.yaml",
+            cache_path=self.cache_path,
         )
 
+    def get_schema_templates_yaml(self):
+        return self._load_schema_templates().config
+
     def get_available_schema_templates(self):
         schema_config = self.get_schema_templates_yaml()
         return [schema_config["name"] for schema_config in schema_config["schemas"]]
 
     def get_schema_template(self, template_name):
-        schema_config = self.get_schema_templates_yaml()
-        for schema_template in schema_config["schemas"]:
-            if schema_template["name"] == template_name:
-                return schema_template
+        return self._load_schema_templates().schema_templates.get(template_name)
 
     """ Methods for finding and reading SQL templates """
 
+    def get_template_index(self):
+        """
+        Return the index of template folders, built once per process and
+        persisted in the cache folder between runs.
+        """
+        return get_template_index(
+            self.base_path,
+            index_file=self.cache_path / "template_index.json",
+            exclude=[self.snowflake_objects_path],
+        )
+
     def _find_folder_path(self, folder_name=SQL_TEMPLATES_FOLDER_NAME):
         """
         Search for the path to the specified folder starting from the given path.
         """
+        template_index = self.get_template_index()
+        if folder_name in template_index.INDEXED_FOLDERS:
+            return template_index.get_folder(folder_name)
+
         for path in self.base_path.rglob("*"):
             if path.is_dir() and path.name == folder_name:
                 return str(path)
@@ -140,27 +188,159 @@ class DatabaseRepository:
         """
         Get the path to the specified folder and return the path to the SQL templates folder.
         """
-        folder_path = self._find_folder_path()
+        template_path = self.get_template_index().get_template_path(template_name)
 
-        if folder_path:
-            with Path(folder_path) / template_name as file:
-                return file.read_text()
+        if template_path:
+            return template_path.read_text()
         return None
 
-    def save_database_object(self, ddl: str, object_path: str, replace=False):
+    def get_compiled_sql_template(self, template_name):
         """
-        Save the database object to the specified path.
+        Return the SQL template compiled into a reusable renderer. Compiled
+        templates and their included snippets are cached until one of their
+        files changes.
         """
+        template_index = self.get_template_index()
+        cached = self._compiled_templates.get(template_name)
+        if cached is not None:
+            compiled, mtimes = cached
+            try:
+                if all(
+                    template_index.get_template_path(name).stat().st_mtime_ns == mtime
+                    for name, mtime in mtimes.items()
+                ):
+                    profiler.count("cache_hits.sql_template")
+                    return compiled
+            except OSError:
+                pass
+
+        if template_name in self._compiling_templates:
+            raise TemplateError(f"Template {template_name} includes itself")
+
+        template_path = template_index.get_template_path(template_name)
+        if template_path is None:
+            raise FileNotFoundError(f"SQL template {template_name} not found")
+
+        self._compiling_templates.add(template_name)
+        try:
+            mtime = template_path.stat().st_mtime_ns
+            text = template_path.read_text()
+            profiler.count("files_scanned")
+            profiler.count("bytes_read", len(text))
+            compiled = SqlTemplate(
+                text, name=template_name, loader=self.get_compiled_sql_template
+            )
+        finally:
+            self._compiling_templates.discard(template_name)
 
-        object_path.parent.mkdir(parents=True, exist_ok=True)
+        mtimes = {template_name: mtime}
+        for include in compiled.includes:
+            mtimes.update(self._compiled_templates[include][1])
+        self._compiled_templates[template_name] = (compiled, mtimes)
+        return compiled
 
-        if replace:
-            with open(object_path, "w") as file:
-                file.write(ddl)
+    """ Methods for the object catalog """
+
+    def get_catalog(self):
+        """
+        Return the object catalog, opened on first use. A catalog that was never
+        built from the object files is indexed first, so repositories generated
+        before the catalog existed are picked up.
+        """
+        if self._catalog is None:
+            # Writer threads may all ask for the catalog on their first object.
+            with self._catalog_lock:
+                if self._catalog is None:
+                    catalog = ObjectCatalog(self.cache_path / "catalog.sqlite")
+                    if not catalog.is_indexed():
+                        catalog.reindex(self.snowflake_objects_path)
+                    self._catalog = catalog
+        return self._catalog
+
+    def _get_listing_catalog(self):
+        """
+        Return the catalog for listing databases and schemas, reindexed first
+        when database or schema folders were added or removed outside of it.
+        """
+        catalog = self.get_catalog()
+        if not catalog.lists_folders_of(self.snowflake_objects_path):
+            catalog.reindex(self.snowflake_objects_path)
+        return catalog
+
+    def reindex_catalog(self, jobs=None):
+        return self.get_catalog().reindex(self.snowflake_objects_path, jobs=jobs)
+
+    def commit_catalog(self):
+        if self._catalog is not None:
+            self._catalog.commit()
+
+    def catalog_object(self, ddl, object_path, snowflake_object=None):
+        """
+        Record a written object in the catalog. Objects are keyed by their path
+        relative to the snowflake objects folder, so objects written below a
+        staging folder are only recorded when their snowflake object is known.
+        """
+        if snowflake_object is not None:
+            key = snowflake_object.generate_object_path("").as_posix()
         else:
-            if not Path(object_path).exists():
-                with open(object_path, "w") as file:
-                    file.write(ddl)
+            key = Path(
+                os.path.relpath(object_path, self.snowflake_objects_path)
+            ).as_posix()
+        entry = describe_object(key, ddl, snowflake_object)
+        if entry is not None:
+            # Without its stat signature, reindex would read the file again.
+            stat = os.stat(object_path)
+            entry["mtime_ns"] = stat.st_mtime_ns
+            entry["size"] = stat.st_size
+            self.get_catalog().record(entry)
+
+    def save_database_object(
+        self,
+        ddl: str,
+        object_path: str,
+        replace=False,
+        create_parent=True,
+        check_existing=True,
+        snowflake_object=None,
+    ):
+        """
+        Save the database object to the specified path. Existing files are only
+        overwritten when replace is set and their content differs. Writers
+        that know the path is new, such as staged regeneration, can skip the
+        existence check. Saved objects are recorded in the object catalog.
+
+        Returns one of "created", "updated", "unchanged" or "skipped".
+        """
+        status = self._write_database_object(
+            ddl, object_path, replace, create_parent, check_existing
+        )
+        if status != "skipped":
+            self.catalog_object(ddl, object_path, snowflake_object)
+        return status
+
+    def _write_database_object(
+        self, ddl, object_path, replace, create_parent, check_existing
+    ):
+        with profiler.phase("write"):
+            if create_parent:
+                object_path.parent.mkdir(parents=True, exist_ok=True)
+
+            if check_existing and Path(object_path).exists():
+                if not replace:
+                    return "skipped"
+                with open(object_path, "r") as file:
+                    existing = file.read()
+                profiler.count("bytes_read", len(existing))
+                if existing == ddl:
+                    return "unchanged"
+                status = "updated"
+            else:
+                status = "created"
+
+            with open(object_path, "w") as file:
+                profiler.count("bytes_written", file.write(ddl))
+            profiler.count("files_written")
+            return status
 
     def extract_filename_parts(self, filename):
         """
@@ -175,43 +355,119 @@ class DatabaseRepository:
         return None
 
     def get_all_databases(self):
-        return [p.name for p in (self.snowflake_objects_path / "databases").iterdir()]
+        return self._get_listing_catalog().databases()
 
     def get_all_schemas(self, database):
-        try:
-            return [
-                p.name
-                for p in (
-                    self.snowflake_objects_path / "databases" / database / "schemas"
-                )
-                .resolve()
-                .iterdir()
-            ]
-        except FileNotFoundError:
-            return []
+        return self._get_listing_catalog().schemas(database)
+
+    def get_table_columns_from_template_files(
+        self,
+        template_files_name,
+        delimiter=None,
+        encoding=None,
+        infer_types=None,
+        file_names=None,
+    ):
+        """
+        Read the columns of every template file of a schema from the file
+        headers. Only a bounded prefix of each file is read, compressed files
+        are decompressed on the fly and the delimiter is detected unless given.
+
+        With infer_types, the column data types are inferred from a sample of
+        rows. infer_types is either True or a dict with the sample_rows and
+        sample_bytes budgets, and the columns are returned as {column: dtype}.
+        file_names restricts the result to the template files with those names.
+
+        Parquet, Avro and JSON Lines files are read by extension from their
+        metadata: the Parquet footer, the Avro header schema or the first
+        lines of a JSON Lines file. Their columns always come with data types.
+        """
+        return list(
+            self.iter_table_columns_from_template_files(
+                template_files_name,
+                delimiter=delimiter,
+                encoding=encoding,
+                infer_types=infer_types,
+                file_names=file_names,
+            )
+        )
 
-    def get_table_columns_from_template_files(self, template_files_name):
-        folder_path = self._find_folder_path(folder_name="template_files")
-        data_path = (Path(folder_path) / template_files_name).resolve()
-        files_in_data_path = [f for f in data_path.glob("*.*")]
+    def iter_table_columns_from_template_files(
+        self,
+        template_files_name,
+        delimiter=None,
+        encoding=None,
+        infer_types=None,
+        file_names=None,
+    ):
+        """
+        Yield the tables of get_table_columns_from_template_files one by one.
+        Headers are read a few files ahead of the consumer, so only those are
+        held in memory however many template files a schema has.
+        """
+        settings = infer_types if isinstance(infer_types, dict) else {}
+        if infer_types:
+            read_columns = partial(
+                infer_column_types,
+                sample_rows_budget=settings.get("sample_rows", DEFAULT_SAMPLE_ROWS),
+                sample_bytes_budget=settings.get("sample_bytes", DEFAULT_SAMPLE_BYTES),
+            )
+        else:
+            read_columns = read_header
 
-        tables = []
+        read_columns = partial(read_columns, delimiter=delimiter, encoding=encoding)
 
-        delimiter = self.prompt_user_for_delimiter(template_files_name)
+        def read_file(file):
+            # Timed on the reader threads, so the phase adds up their time.
+            with profiler.phase("header_reading"):
+                read_metadata = metadata_reader(file)
+                if read_metadata is not None:
+                    return file, read_metadata(file, **settings)
+                return file, read_columns(file)
 
-        for file in files_in_data_path:
-            with open(file, "r") as f:
-                header_row = f.readline().strip()
+        folder_path = self._find_folder_path(folder_name="template_files")
+        data_path = (Path(folder_path) / template_files_name).resolve()
 
-            tables.append(
-                {
-                    "columns": header_row.split(delimiter),
+        files_in_data_path = sorted(
+            f
+            for f in data_path.glob("*.*")
+            if f.is_file() and (file_names is None or f.name in file_names)
+        )
+        profiler.count("directory_walks")
+        profiler.count("files_scanned", len(files_in_data_path))
+
+        with ThreadPoolExecutor(max_workers=self.HEADER_READER_WORKERS) as executor:
+            for file, header in _map_bounded(
+                executor,
+                read_file,
+                files_in_data_path,
+                window=self.HEADER_READER_WORKERS * 2,
+            ):
+                yield {
+                    "columns": header,
                     "object_name": self.extract_filename_parts(file.name)["filename"],
                     "comment": f"SQL generated using file {file.name}",
                 }
-            )
 
-        return tables
+    def get_template_file_signatures(self, template_files_name):
+        """
+        Return the mtime and size of every template file of a schema, keyed by
+        file name, without reading the files.
+        """
+        folder_path = self._find_folder_path(folder_name="template_files")
+        if folder_path is None:
+            return {}
+        data_path = Path(folder_path) / template_files_name
+        signatures = {}
+        try:
+            with os.scandir(data_path) as entries:
+                for entry in entries:
+                    if "." in entry.name and entry.is_file():
+                        stat = entry.stat()
+                        signatures[entry.name] = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            pass
+        return signatures
 
     def get_columns_from_table_definition(self, table_definition: str) -> list[str]:
         """Extract substring between double quotes and return as a list of columns."""
@@ -220,33 +476,28 @@ class DatabaseRepository:
         return columns
 
     def parse_dynamic_table_definition(self, table_definition):
-        columns = self.get_columns_from_table_definition(table_definition)
-        source_database = re.findall(r"USE DATABASE ([\w_{}]+)", table_definition)
-        source_schema = re.findall(r"USE SCHEMA (\w+)", table_definition)
-
-        table_name_patterns = [
-            r"CREATE OR REPLACE TABLE (\w+)",
-            r"CREATE TABLE (\w+)",
-            r"CREATE OR ALTER TABLE (\w+)",
-        ]
-
-        source_object = None
-        for pattern in table_name_patterns:
-            match = re.findall(pattern, table_definition)
-            if match:
-                source_object = match[0]
-                break
-
-        return {
-            "columns": columns,
-            "source_database": source_database[0] if source_database else None,
-            "source_schema": source_schema[0] if source_schema else None,
-            "source_object": source_object,
-        }
-
-    def get_dynamic_table_transformations_from_table(self):
-
-        database, schema = self.prompt_user_for_source()
+        return parse_table_definition(table_definition)
+
+    def get_dynamic_table_transformations_from_table(
+        self, source_database=None, source_schema=None
+    ):
+        return list(
+            self.iter_dynamic_table_transformations_from_table(
+                source_database, source_schema
+            )
+        )
+
+    def iter_dynamic_table_transformations_from_table(
+        self, source_database=None, source_schema=None
+    ):
+        """
+        Yield the columns and source of every table of a schema, one by one,
+        for the dynamic tables derived from them.
+        """
+        if source_database and source_schema:
+            database, schema = source_database, source_schema
+        else:
+            database, schema = self.prompt_user_for_source()
 
         tables_path = (
             self.snowflake_objects_path
@@ -257,23 +508,34 @@ class DatabaseRepository:
             / "tables"
         ).resolve()
 
-        files_in_tables_path = [f for f in tables_path.glob("*.sql")]
+        with profiler.phase("ddl_parsing"):
+            files_in_tables_path = sorted(tables_path.glob("*.sql"))
+            profiler.count("directory_walks")
+            profiler.count("files_scanned", len(files_in_tables_path))
 
-        dynamic_tables = []
+            parse_cache = DdlParseCache(self.cache_path / "ddl_parse_cache.json")
+            table_definitions = parse_cache.parse_files(files_in_tables_path)
+            parse_cache.save()
 
-        for file in files_in_tables_path:
-            with open(file, "r") as f:
-                table_definition = f.read().strip()
-
-            table_info = self.parse_dynamic_table_definition(table_definition)
+        for file, table_definition in zip(files_in_tables_path, table_definitions):
+            table_info = dict(table_definition)
+            table_info["columns"] = list(table_definition["columns"])
             table_info["object_name"] = file.name.split(".")[0].lower()
-            dynamic_tables.append(table_info)
-
-        return dynamic_tables
+            yield table_info
 
     def get_snowflake_objects_path(self):
         return self.snowflake_objects_path
 
+    def get_environment_objects_path(self, environment):
+        """Return the folder the objects of an environment are written to."""
+        return (
+            self.base_path
+            / self.snowflake_path
+            / "environments"
+            / environment
+            / "snowflake_objects"
+        )
+
 
 # Example usage
 if __name__ == "__main__":
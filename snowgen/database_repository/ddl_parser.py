@@ -0,0 +1,520 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from snowgen.profiler import profiler
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<string>'(?:[^'\\]|\\.|'')*(?:'|\Z))
+    |(?P<quoted>"(?:[^"]|"")*(?:"|\Z))
+    |(?P<word>[\w${}]+)
+    |(?P<punctuation>[(),.;])
+    |(?P<space>\s+)
+    |(?P<other>.)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+
+STATEMENT_PATTERN = re.compile(
+    r"""
+    (?P<dollar>\$\$.*?(?:\$\$|\Z))
+    |(?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<string>'(?:[^'\\]|\\.|'')*(?:'|\Z))
+    |(?P<quoted>"(?:[^"]|"")*(?:"|\Z))
+    |(?P<end>;)
+    |(?P<other>[^;$'"/-]+|.)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+
+# Unquoted name parts may hold environment slots such as {env} or {env:key}.
+UNQUOTED_NAME_PART = r"(?:[\w$]|\{\w+(?::\w+)?\})+"
+NAME_PART = rf'(?:"(?:[^"]|"")*"|{UNQUOTED_NAME_PART})'
+QUALIFIED_NAME = rf"{NAME_PART}(?:\s*\.\s*{NAME_PART}){{0,2}}"
+NAME_PART_PATTERN = re.compile(rf'"((?:[^"]|"")*)"|({UNQUOTED_NAME_PART})')
+
+REFERENCE_KEYWORDS = re.compile(r"FORMAT_NAME|FROM|JOIN|NEXTVAL", re.IGNORECASE)
+REFERENCES = r"""
+    \bFORMAT_NAME\s*=\s*(?P<file_format>'[^']*'|{name})
+    |\b(?:FROM|JOIN)\s+(?P<object>{name})
+    |(?P<skip>--[^\n]*|/\*.*?(?:\*/|\Z)|'(?:[^'\\]|\\.|'')*(?:'|\Z)|{part})
+    """.format(name=QUALIFIED_NAME, part=NAME_PART)
+REFERENCE_PATTERN = re.compile(REFERENCES, re.DOTALL | re.IGNORECASE | re.VERBOSE)
+# Trying the sequence alternative at every position is slow, so it is only
+# used for definitions that mention NEXTVAL.
+SEQUENCE_REFERENCE_PATTERN = re.compile(
+    rf"(?P<sequence>{QUALIFIED_NAME})\s*\.\s*NEXTVAL\b|{REFERENCES}",
+    re.DOTALL | re.IGNORECASE | re.VERBOSE,
+)
+
+TABLE_MODIFIERS = {"TRANSIENT", "TEMPORARY", "TEMP", "LOCAL", "GLOBAL", "VOLATILE"}
+NOT_COLUMNS = {"CONSTRAINT", "PRIMARY", "UNIQUE", "FOREIGN", "CHECK", "LIKE"}
+
+PARALLEL_PARSE_THRESHOLD = 256
+
+
+def _identifier(kind, value):
+    if kind == "quoted":
+        return value[1:-1].replace('""', '"')
+    return value
+
+
+def parse_table_definition(table_definition):
+    """
+    Extract the columns, the source database and schema and the table name of
+    a table definition in a single scan. Comments and string literals are
+    skipped, and only identifiers that start a column definition of the
+    CREATE TABLE column list are returned as columns. Definitions without a
+    column list fall back to all quoted identifiers outside comments.
+    """
+    source_database = None
+    source_schema = None
+    source_object = None
+
+    columns = []
+    quoted_identifiers = []
+    column_list_found = False
+
+    # Words and punctuation since the last statement boundary.
+    statement = []
+    depth = 0
+    in_column_list = False
+    column_start = False
+    after_comment = False
+    expecting_table_name = False
+    name_parts = []
+
+    for match in TOKEN_PATTERN.finditer(table_definition):
+        kind = match.lastgroup
+        value = match.group()
+
+        if kind == "space" or kind == "string":
+            continue
+        if kind == "comment":
+            # Generated tables may have the separating comma inside a comment.
+            if in_column_list and depth == 1 and value.startswith("--"):
+                after_comment = True
+            continue
+
+        if kind == "quoted":
+            quoted_identifiers.append(_identifier(kind, value))
+
+        if expecting_table_name:
+            if kind in ("word", "quoted") and not (
+                kind == "word" and value.upper() in ("IF", "NOT", "EXISTS")
+            ):
+                if not name_parts or statement[-1] == ".":
+                    name_parts.append(_identifier(kind, value))
+                    statement.append(value)
+                    continue
+            if value == "." and name_parts:
+                statement.append(value)
+                continue
+            if name_parts:
+                expecting_table_name = False
+                if source_object is None:
+                    source_object = name_parts[-1]
+                if value == "(" and not column_list_found:
+                    column_list_found = True
+                    in_column_list = True
+                    column_start = True
+                    depth = 1
+                    statement.append(value)
+                    continue
+
+        if in_column_list:
+            if value == "(":
+                depth += 1
+            elif value == ")":
+                depth -= 1
+                if depth == 0:
+                    in_column_list = False
+            elif depth == 1 and value == ",":
+                column_start = True
+                continue
+            elif depth == 1 and (column_start or after_comment):
+                if kind == "quoted" or (
+                    column_start
+                    and kind == "word"
+                    and value.upper() not in NOT_COLUMNS
+                ):
+                    columns.append(_identifier(kind, value))
+            column_start = False
+            after_comment = False
+            continue
+
+        if value == ";":
+            statement = []
+            continue
+        if kind == "word" and value.upper() in ("USE", "CREATE"):
+            statement = []
+
+        statement.append(value)
+        upper = [part.upper() for part in statement[-2:]]
+
+        if len(statement) == 3 and statement[0].upper() == "USE":
+            if upper[0] == "DATABASE" and source_database is None:
+                source_database = _identifier(kind, value)
+            elif upper[0] == "SCHEMA" and source_schema is None:
+                source_schema = _identifier(kind, value)
+        elif upper[-1] == "TABLE" and statement[0].upper() == "CREATE":
+            modifiers = [part.upper() for part in statement[1:-1]]
+            if modifiers in ([], ["OR", "REPLACE"], ["OR", "ALTER"]) or (
+                modifiers[-1:] and modifiers[-1] in TABLE_MODIFIERS
+            ):
+                expecting_table_name = True
+                name_parts = []
+
+    if expecting_table_name and name_parts and source_object is None:
+        source_object = name_parts[-1]
+
+    return {
+        "columns": columns if column_list_found else quoted_identifiers,
+        "source_database": source_database,
+        "source_schema": source_schema,
+        "source_object": source_object,
+    }
+
+
+def parse_column_definitions(table_definition):
+    """
+    Return the columns of the CREATE TABLE column list of a table definition
+    with their data types, as {column: data_type}. The data type is the type
+    name with its parameters, so constraints and defaults after it are left
+    out.
+    """
+    definitions = {}
+    statement = None
+    create_table = False
+    in_column_list = False
+    depth = 0
+    column_start = False
+    column = None
+    data_type = None
+
+    for match in TOKEN_PATTERN.finditer(table_definition):
+        kind = match.lastgroup
+        value = match.group()
+        if kind in ("space", "string"):
+            continue
+
+        if not in_column_list:
+            if kind == "comment":
+                continue
+            upper = value.upper()
+            if value == ";":
+                statement = None
+                create_table = False
+            elif statement is None:
+                statement = upper
+            elif statement == "CREATE" and upper == "TABLE":
+                create_table = True
+            elif value == "(" and create_table:
+                in_column_list = True
+                depth = 1
+                column_start = True
+            continue
+
+        if kind == "comment":
+            # Generated tables may have the separating comma inside a comment.
+            if depth == 1 and value.startswith("--"):
+                column_start = True
+            continue
+
+        if depth == 1 and column_start and value not in "(),":
+            column_start = False
+            column = None
+            if kind == "quoted" or value.upper() not in NOT_COLUMNS:
+                column = _identifier(kind, value)
+                definitions[column] = ""
+                data_type = []
+            continue
+
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            depth -= 1
+            if depth == 0:
+                break
+        elif depth == 1 and value == ",":
+            column_start = True
+            column = None
+            continue
+
+        if column is None:
+            continue
+        if depth == 1 and value != ")" and data_type:
+            # The type ends at the first word after its name and parameters.
+            column = None
+            continue
+        data_type.append(value)
+        definitions[column] = re.sub(r"\s*([(),])\s*", r"\1", " ".join(data_type))
+
+    return definitions
+
+
+def parse_table_name(table_definition):
+    """
+    Return the database, schema and name of the table a table definition
+    creates, as written: the name parts of its CREATE TABLE statement, with
+    the database and schema of the USE DATABASE and USE SCHEMA statements
+    before it where the name leaves them out. Quoted parts keep their quotes,
+    so the parts name the same objects in other statements. Parts that are
+    not given are None.
+    """
+    database = None
+    schema = None
+    statement = []
+    name_parts = None
+
+    for match in TOKEN_PATTERN.finditer(table_definition):
+        kind = match.lastgroup
+        value = match.group()
+        if kind in ("space", "comment", "string"):
+            continue
+
+        if name_parts is not None:
+            if kind in ("word", "quoted") and (
+                not name_parts or name_parts[-1] == "."
+            ):
+                if name_parts or value.upper() not in ("IF", "NOT", "EXISTS"):
+                    name_parts.append(value)
+                continue
+            if value == "." and name_parts:
+                name_parts.append(value)
+                continue
+            break
+
+        if value == ";":
+            statement = []
+            continue
+        statement.append(value.upper())
+        if len(statement) == 3 and statement[0] == "USE":
+            if statement[1] == "DATABASE":
+                database = value
+            elif statement[1] == "SCHEMA":
+                schema = value
+        elif statement[0] == "CREATE" and statement[-1] == "TABLE":
+            name_parts = []
+
+    name = [part for part in name_parts or [] if part != "."][-3:]
+    name = [None] * (3 - len(name)) + name
+    return name[0] or database, name[1] or schema, name[2]
+
+def parse_dynamic_table_lineage(definition):
+    """
+    Extract the output columns and the source object of a dynamic table
+    definition. Columns are the last identifier of every item in the select
+    list of the AS SELECT query, so aliases win over the source columns, and
+    the source is the first object of its FROM clause.
+    """
+    columns = []
+    source = []
+    state = None
+    depth = 0
+    item = []
+    previous = None
+
+    for match in TOKEN_PATTERN.finditer(definition):
+        kind = match.lastgroup
+        value = match.group()
+        if kind in ("space", "comment"):
+            continue
+        upper = value.upper() if kind == "word" else value
+
+        if state is None:
+            if upper == "SELECT" and previous == "AS":
+                state = "select"
+        elif state == "select":
+            if value == "(":
+                depth += 1
+            elif value == ")":
+                depth -= 1
+            elif depth == 0 and (value == "," or upper == "FROM"):
+                if item:
+                    columns.append(item[-1])
+                item = []
+                if upper == "FROM":
+                    state = "from"
+            elif depth == 0 and kind in ("word", "quoted"):
+                item.append(_identifier(kind, value))
+        elif kind in ("word", "quoted") and (not source or previous == "."):
+            source.append(_identifier(kind, value))
+        elif value != ".":
+            break
+        previous = upper
+
+    source = [None] * (3 - len(source)) + source[-3:]
+    return {
+        "columns": columns,
+        "source_database": source[0],
+        "source_schema": source[1],
+        "source_object": source[2],
+    }
+
+
+def parse_object_references(definition):
+    """
+    Find the objects a DDL statement refers to: file formats named by
+    FORMAT_NAME, sequences whose NEXTVAL is used and objects read with FROM
+    or JOIN. Returns (kind, database, schema, name) tuples with None for the
+    parts a reference leaves out.
+    """
+    keywords = {match.upper() for match in REFERENCE_KEYWORDS.findall(definition)}
+    if not keywords:
+        return []
+    pattern = REFERENCE_PATTERN
+    if "NEXTVAL" in keywords:
+        pattern = SEQUENCE_REFERENCE_PATTERN
+
+    references = []
+    for match in pattern.finditer(definition):
+        kind = match.lastgroup
+        if kind == "skip":
+            continue
+        name = match.group(kind)
+        if name.startswith("'"):
+            parts = name[1:-1].split(".")
+        else:
+            parts = [
+                quoted.replace('""', '"') if quoted else word
+                for quoted, word in NAME_PART_PATTERN.findall(name)
+            ]
+        parts = [None] * (3 - len(parts[-3:])) + parts[-3:]
+        references.append((kind, *parts))
+    return references
+
+
+def split_statements(script):
+    """
+    Split a script into statements at the semicolons outside strings, quoted
+    identifiers, comments and $$ bodies. Statements holding nothing but
+    comments are dropped.
+    """
+    statements = []
+    start = 0
+    has_code = False
+    for match in STATEMENT_PATTERN.finditer(script):
+        kind = match.lastgroup
+        if kind == "end":
+            if has_code:
+                statements.append(script[start : match.start()].strip())
+            start = match.end()
+            has_code = False
+        elif kind != "comment" and not match.group().isspace():
+            has_code = True
+    if has_code:
+        statements.append(script[start:].strip())
+    return statements
+
+
+class DdlParseCache:
+    """
+    Cache of parsed table definitions keyed by the hash of the file content.
+
+    Files are looked up by path, mtime and size first so unchanged files are
+    not even read. The cache is persisted as JSON in the cache folder.
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_file=None):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.files = {}
+        self.definitions = {}
+        self._load()
+
+    def _load(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.CACHE_VERSION:
+            self.files = data["files"]
+            self.definitions = data["definitions"]
+
+    def save(self):
+        if not self.cache_file:
+            return
+        referenced = {entry[2] for entry in self.files.values()}
+        self.definitions = {
+            content_hash: definition
+            for content_hash, definition in self.definitions.items()
+            if content_hash in referenced
+        }
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(
+                f"{self.cache_file.name}.{os.getpid()}.tmp"
+            )
+            with open(tmp_file, "w") as file:
+                json.dump(
+                    {
+                        "version": self.CACHE_VERSION,
+                        "files": self.files,
+                        "definitions": self.definitions,
+                    },
+                    file,
+                )
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            pass
+
+    def parse_files(self, paths, jobs=None):
+        """
+        Parse the table definitions in paths and return the results in the same
+        order. Files that are not cached are parsed on a process pool when
+        there are many of them.
+        """
+        results = {}
+        misses = []
+
+        for path in paths:
+            key = os.path.abspath(path)
+            stat = os.stat(path)
+            entry = self.files.get(key)
+            if (
+                entry
+                and entry[0] == stat.st_mtime_ns
+                and entry[1] == stat.st_size
+                and entry[2] in self.definitions
+            ):
+                results[path] = self.definitions[entry[2]]
+                profiler.count("cache_hits.ddl_parse")
+            else:
+                misses.append((path, key, stat))
+
+        hashes = {}
+        to_parse = {}
+        for path, key, stat in misses:
+            with open(path, "rb") as file:
+                content = file.read()
+            profiler.count("bytes_read", len(content))
+            content_hash = hashlib.sha256(content).hexdigest()
+            self.files[key] = [stat.st_mtime_ns, stat.st_size, content_hash]
+            hashes[path] = content_hash
+            if content_hash not in self.definitions:
+                to_parse[content_hash] = content.decode("utf-8", "replace").strip()
+
+        if len(to_parse) > PARALLEL_PARSE_THRESHOLD and jobs != 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                parsed = list(
+                    executor.map(
+                        parse_table_definition, to_parse.values(), chunksize=64
+                    )
+                )
+        else:
+            parsed = [parse_table_definition(text) for text in to_parse.values()]
+        self.definitions.update(zip(to_parse, parsed))
+
+        for path, content_hash in hashes.items():
+            results[path] = self.definitions[content_hash]
+
+        return [results[path] for path in paths]
@@ -0,0 +1,349 @@
+import json
+import os
+import struct
+from pathlib import Path
+from snowgen.database_repository.template_file_reader import open_template_file
+from snowgen.database_repository.type_inference import (
+    DEFAULT_SAMPLE_BYTES,
+    DEFAULT_SAMPLE_ROWS,
+    infer_column_type,
+)
+from snowgen.profiler import profiler
+
+PARQUET_MAGIC = b"PAR1"
+AVRO_MAGIC = b"Obj\x01"
+COMPRESSION_SUFFIXES = {".gz", ".bz2", ".xz", ".zip"}
+# The formats whose files are read through a decompressing stream.
+COMPRESSIBLE_SUFFIXES = {".ndjson", ".jsonl"}
+
+# Parquet physical types, converted types and logical types by their Thrift
+# enum value or union field id.
+PARQUET_PHYSICAL_TYPES = {
+    0: "BOOLEAN",
+    1: "NUMBER(38,0)",
+    2: "NUMBER(38,0)",
+    3: "TIMESTAMP_NTZ",
+    4: "FLOAT",
+    5: "FLOAT",
+    6: "BINARY",
+    7: "BINARY",
+}
+PARQUET_CONVERTED_TYPES = {
+    0: "VARCHAR",
+    1: "VARIANT",
+    2: "VARIANT",
+    3: "VARIANT",
+    4: "VARCHAR",
+    6: "DATE",
+    7: "TIME",
+    8: "TIME",
+    9: "TIMESTAMP_NTZ",
+    10: "TIMESTAMP_NTZ",
+    19: "VARIANT",
+    20: "VARIANT",
+}
+PARQUET_LOGICAL_TYPES = {
+    1: "VARCHAR",
+    2: "VARIANT",
+    3: "VARIANT",
+    4: "VARCHAR",
+    6: "DATE",
+    7: "TIME",
+    10: "NUMBER(38,0)",
+    12: "VARIANT",
+    13: "VARIANT",
+    14: "VARCHAR",
+    15: "FLOAT",
+}
+
+AVRO_TYPES = {
+    "null": "VARCHAR",
+    "boolean": "BOOLEAN",
+    "int": "NUMBER(38,0)",
+    "long": "NUMBER(38,0)",
+    "float": "FLOAT",
+    "double": "FLOAT",
+    "bytes": "BINARY",
+    "string": "VARCHAR",
+    "enum": "VARCHAR",
+    "fixed": "BINARY",
+}
+AVRO_LOGICAL_TYPES = {
+    "date": "DATE",
+    "time-millis": "TIME",
+    "time-micros": "TIME",
+    "timestamp-millis": "TIMESTAMP_TZ",
+    "timestamp-micros": "TIMESTAMP_TZ",
+    "local-timestamp-millis": "TIMESTAMP_NTZ",
+    "local-timestamp-micros": "TIMESTAMP_NTZ",
+    "uuid": "VARCHAR",
+}
+
+
+class _CompactReader:
+    """Decoder of the Thrift compact protocol Parquet footers are written in."""
+
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def byte(self):
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def varint(self):
+        shift = 0
+        value = 0
+        while True:
+            byte = self.byte()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def zigzag(self):
+        value = self.varint()
+        return (value >> 1) ^ -(value & 1)
+
+    def value(self, kind):
+        if kind in (1, 2):
+            return kind == 1
+        if kind == 3:
+            return struct.unpack_from("b", self.data, self._advance(1))[0]
+        if kind in (4, 5, 6):
+            return self.zigzag()
+        if kind == 7:
+            return struct.unpack_from("<d", self.data, self._advance(8))[0]
+        if kind == 8:
+            size = self.varint()
+            return bytes(self.data[self._advance(size) : self.position])
+        if kind in (9, 10):
+            header = self.byte()
+            size = header >> 4
+            if size == 15:
+                size = self.varint()
+            element = header & 0x0F
+            if element in (1, 2):
+                return [self.byte() == 1 for _ in range(size)]
+            return [self.value(element) for _ in range(size)]
+        if kind == 11:
+            size = self.varint()
+            if not size:
+                return {}
+            types = self.byte()
+            return {
+                self.value(types >> 4): self.value(types & 0x0F) for _ in range(size)
+            }
+        if kind == 12:
+            return self.struct()
+        raise ValueError(f"Unknown Thrift compact type {kind}")
+
+    def _advance(self, size):
+        start = self.position
+        self.position += size
+        return start
+
+    def struct(self, last_field=None):
+        """
+        Decode a struct as {field_id: value}. With last_field, decoding stops
+        after that field, so the fields after it are never looked at.
+        """
+        fields = {}
+        field_id = 0
+        while True:
+            header = self.byte()
+            kind = header & 0x0F
+            if kind == 0:
+                return fields
+            delta = header >> 4
+            field_id = field_id + delta if delta else self.zigzag()
+            fields[field_id] = self.value(kind)
+            if last_field is not None and field_id >= last_field:
+                return fields
+
+
+def _parquet_type(element):
+    logical = element.get(10)
+    if logical:
+        kind, value = next(iter(logical.items()))
+        if kind == 5:
+            return f"NUMBER({value.get(2, 38)},{value.get(1, 0)})"
+        if kind == 8:
+            return "TIMESTAMP_TZ" if value.get(1) else "TIMESTAMP_NTZ"
+        if kind in PARQUET_LOGICAL_TYPES:
+            return PARQUET_LOGICAL_TYPES[kind]
+    converted = element.get(6)
+    if converted == 5:
+        return f"NUMBER({element.get(8, 38)},{element.get(7, 0)})"
+    if converted in PARQUET_CONVERTED_TYPES:
+        return PARQUET_CONVERTED_TYPES[converted]
+    if 11 <= (converted or 0) <= 18:
+        return "NUMBER(38,0)"
+    return PARQUET_PHYSICAL_TYPES.get(element.get(1), "VARCHAR")
+
+
+def read_parquet_columns(path, **_):
+    """
+    Read the columns and their data types of a Parquet file from its footer.
+    Only the last eight bytes and the footer are read, never a data page.
+    Nested groups become VARIANT columns.
+    """
+    with open(path, "rb") as file:
+        size = file.seek(0, os.SEEK_END)
+        if size < 12:
+            raise ValueError(f"{path} is not a Parquet file")
+        file.seek(size - 8)
+        tail = file.read(8)
+        if tail[4:] != PARQUET_MAGIC:
+            raise ValueError(f"{path} is not a Parquet file")
+        footer_size = struct.unpack("<I", tail[:4])[0]
+        if footer_size > size - 12:
+            raise ValueError(f"{path} has a corrupt Parquet footer")
+        file.seek(size - 8 - footer_size)
+        footer = file.read(footer_size)
+    profiler.count("bytes_read", len(tail) + len(footer))
+
+    # The schema is the second field of the file metadata, decoding stops
+    # before the row groups.
+    schema = _CompactReader(memoryview(footer)).struct(last_field=2).get(2) or []
+    columns = {}
+    elements = iter(schema[1:])
+    for element in elements:
+        name = element[4].decode("utf-8", "replace")
+        children = element.get(5)
+        if children:
+            columns[name] = "VARIANT"
+            # Skip the fields of the group, depth first.
+            remaining = children
+            while remaining:
+                remaining += (next(elements).get(5) or 0) - 1
+        else:
+            columns[name] = _parquet_type(element)
+    return columns
+
+
+def _read_avro_long(stream):
+    shift = 0
+    value = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            raise ValueError("Unexpected end of Avro header")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return (value >> 1) ^ -(value & 1)
+        shift += 7
+
+
+def _read_avro_bytes(stream):
+    size = _read_avro_long(stream)
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of Avro header")
+    return data
+
+
+def _avro_type(schema):
+    if isinstance(schema, list):
+        branches = [branch for branch in schema if branch != "null"]
+        if len(branches) == 1:
+            return _avro_type(branches[0])
+        return "VARIANT"
+    if isinstance(schema, dict):
+        logical = schema.get("logicalType")
+        if logical == "decimal":
+            return f"NUMBER({schema.get('precision', 38)},{schema.get('scale', 0)})"
+        if logical in AVRO_LOGICAL_TYPES:
+            return AVRO_LOGICAL_TYPES[logical]
+        schema = schema.get("type")
+        if isinstance(schema, (list, dict)):
+            return _avro_type(schema)
+    return AVRO_TYPES.get(schema, "VARIANT")
+
+
+def read_avro_columns(path, **_):
+    """
+    Read the columns and their data types of an Avro object container file
+    from the schema in its header. Only the header is read.
+    """
+    with open(path, "rb") as file:
+        if file.read(4) != AVRO_MAGIC:
+            raise ValueError(f"{path} is not an Avro file")
+        metadata = {}
+        while True:
+            count = _read_avro_long(file)
+            if count == 0:
+                break
+            if count < 0:
+                count = -count
+                _read_avro_long(file)
+            for _ in range(count):
+                key = _read_avro_bytes(file).decode("utf-8")
+                metadata[key] = _read_avro_bytes(file)
+        profiler.count("bytes_read", file.tell())
+
+    schema = json.loads(metadata["avro.schema"])
+    if not isinstance(schema, dict) or schema.get("type") != "record":
+        return {"value": _avro_type(schema)}
+    return {field["name"]: _avro_type(field["type"]) for field in schema["fields"]}
+
+
+def read_ndjson_columns(
+    path, sample_rows=DEFAULT_SAMPLE_ROWS, sample_bytes=DEFAULT_SAMPLE_BYTES, **_
+):
+    """
+    Read the columns and their data types of a JSON Lines file from its first
+    lines. Keys of all sampled objects are merged in the order they first
+    appear, and at most sample_rows lines and sample_bytes bytes are read.
+    """
+    values = {}
+    rows = 0
+    with open_template_file(path) as stream:
+        read = 0
+        for line in stream:
+            read += len(line)
+            line = line.strip()
+            if line:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if isinstance(record, dict):
+                    for key, value in record.items():
+                        column = values.setdefault(key, [])
+                        if value is not None:
+                            column.append(
+                                value if isinstance(value, str) else json.dumps(value)
+                            )
+                    rows += 1
+            if rows >= sample_rows or read >= sample_bytes:
+                break
+    profiler.count("bytes_read", read)
+
+    return {column: infer_column_type(sample) for column, sample in values.items()}
+
+
+METADATA_READERS = {
+    ".parquet": read_parquet_columns,
+    ".avro": read_avro_columns,
+    ".ndjson": read_ndjson_columns,
+    ".jsonl": read_ndjson_columns,
+}
+
+
+def metadata_reader(path):
+    """
+    Return the reader of the columns of a template file whose format keeps
+    them in its metadata, chosen by extension, or None for delimited text.
+    Only JSON Lines files may be compressed, as in orders_20240101.ndjson.gz.
+    The metadata of compressed Parquet or Avro files is not read.
+    """
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes[-2:]]
+    if not suffixes:
+        return None
+    if suffixes[-1] in COMPRESSION_SUFFIXES:
+        if len(suffixes) == 2 and suffixes[0] in COMPRESSIBLE_SUFFIXES:
+            return read_ndjson_columns
+        return None
+    return METADATA_READERS.get(suffixes[-1])
@@ -0,0 +1,437 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+from snowgen.database_repository.ddl_parser import (
+    parse_dynamic_table_lineage,
+    parse_table_definition,
+)
+from snowgen.object_writers.generation_manifest import hash_text
+
+PARALLEL_INDEX_THRESHOLD = 256
+COMMIT_BATCH_SIZE = 1024
+
+CATALOG_TABLES = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS objects (
+    path TEXT PRIMARY KEY,
+    database TEXT NOT NULL,
+    schema TEXT NOT NULL,
+    object_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    content_hash TEXT,
+    source_database TEXT,
+    source_schema TEXT,
+    source_object TEXT,
+    mtime_ns INTEGER,
+    size INTEGER,
+    columns TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_schema ON objects (database, schema);
+CREATE INDEX IF NOT EXISTS objects_source
+    ON objects (source_database, source_schema, source_object);
+"""
+
+# Columns are stored in a single field, each one enclosed in separators, so a
+# column lookup is one substring search per object instead of a row per column.
+COLUMN_SEPARATOR = "\x1f"
+
+OBJECT_FIELDS = (
+    "path",
+    "database",
+    "schema",
+    "object_type",
+    "name",
+    "content_hash",
+    "source_database",
+    "source_schema",
+    "source_object",
+    "mtime_ns",
+    "size",
+    "columns",
+)
+
+
+def join_columns(columns):
+    if not columns:
+        return ""
+    return COLUMN_SEPARATOR + COLUMN_SEPARATOR.join(columns) + COLUMN_SEPARATOR
+
+
+def split_columns(columns):
+    return columns.split(COLUMN_SEPARATOR)[1:-1] if columns else []
+
+
+def object_key_parts(key):
+    """
+    Split an object path relative to the snowflake objects folder into its
+    database, schema, object type and name. Returns None for paths outside the
+    databases/<database>/schemas/<schema>/<object_type>/<name>.sql layout.
+    """
+    parts = PurePosixPath(key).parts
+    if (
+        len(parts) != 6
+        or parts[0] != "databases"
+        or parts[2] != "schemas"
+        or not parts[5].endswith(".sql")
+    ):
+        return None
+    return parts[1], parts[3], parts[4], parts[5][: -len(".sql")]
+
+
+def describe_object(key, ddl, snowflake_object=None):
+    """
+    Build the catalog entry of an object. Columns and source lineage are taken
+    from the snowflake object it was rendered from when given, otherwise they
+    are parsed from the DDL.
+    """
+    key_parts = object_key_parts(key)
+    if key_parts is None:
+        return None
+    database, schema, object_type, name = key_parts
+
+    entry = {
+        "path": key,
+        "database": database,
+        "schema": schema,
+        "object_type": object_type,
+        "name": name,
+        "content_hash": hash_text(ddl),
+        "source_database": None,
+        "source_schema": None,
+        "source_object": None,
+        "mtime_ns": None,
+        "size": None,
+        "columns": [],
+    }
+
+    if snowflake_object is not None:
+        entry["columns"] = list(getattr(snowflake_object, "columns", None) or [])
+        if object_type == "dynamic_tables":
+            entry["source_database"] = snowflake_object.source_database
+            entry["source_schema"] = snowflake_object.source_schema
+            entry["source_object"] = snowflake_object.source_object
+    elif object_type == "tables":
+        entry["columns"] = parse_table_definition(ddl)["columns"]
+    elif object_type == "dynamic_tables":
+        lineage = parse_dynamic_table_lineage(ddl)
+        entry["columns"] = lineage.pop("columns")
+        entry.update(lineage)
+
+    return entry
+
+
+def describe_file(objects_path, key):
+    """Build the catalog entry of an object file, with its stat signature."""
+    path = os.path.join(objects_path, key)
+    stat = os.stat(path)
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        entry = describe_object(key, file.read())
+    entry["mtime_ns"] = stat.st_mtime_ns
+    entry["size"] = stat.st_size
+    return entry
+
+
+def folder_signature(objects_path):
+    """
+    Return the mtimes of the databases folder and of the schemas folder of
+    every database, which change when a database or a schema is added or
+    removed.
+    """
+    databases_path = os.path.join(objects_path, "databases")
+    try:
+        signature = {"": os.stat(databases_path).st_mtime_ns}
+    except FileNotFoundError:
+        return {}
+    with os.scandir(databases_path) as entries:
+        for entry in entries:
+            try:
+                schemas = os.stat(os.path.join(entry.path, "schemas"))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            signature[entry.name] = schemas.st_mtime_ns
+    return signature
+
+
+def _describe_files(objects_path, keys):
+    return [describe_file(objects_path, key) for key in keys]
+
+
+class ObjectCatalog:
+    """
+    SQLite catalog of the objects in the snowflake objects folder.
+
+    Every object is a row with its database, schema, object type, name, path,
+    content hash, columns and source lineage. Recorded objects are buffered
+    and written in one transaction per batch. The catalog can be rebuilt from
+    the files with reindex().
+    """
+
+    CATALOG_VERSION = 1
+
+    def __init__(self, catalog_file):
+        self.catalog_file = Path(catalog_file)
+        self.catalog_file.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            self.catalog_file, timeout=30, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._pending = {}
+        self._create_tables()
+        atexit.register(self.close)
+
+    def _create_tables(self):
+        with self._lock, self._connection:
+            self._connection.executescript(CATALOG_TABLES)
+            version = self._get_meta("version")
+            if version != str(self.CATALOG_VERSION):
+                self._connection.executescript(
+                    "DROP TABLE objects; DELETE FROM meta;" + CATALOG_TABLES
+                )
+                self._set_meta("version", self.CATALOG_VERSION)
+
+    def _get_meta(self, key):
+        row = self._connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    def is_indexed(self):
+        """Check whether the catalog was ever built from the object files."""
+        with self._lock:
+            return self._get_meta("indexed") is not None
+
+    def lists_folders_of(self, objects_path):
+        """
+        Check whether no database or schema folder was added or removed since
+        the catalog was last indexed, so its databases and schemas can be
+        listed without walking the object files.
+        """
+        with self._lock:
+            folders = self._get_meta("folders")
+        return folders == json.dumps(folder_signature(objects_path), sort_keys=True)
+
+    def record(self, entry):
+        """Buffer the catalog entry of a written object."""
+        with self._lock:
+            self._pending[entry["path"]] = entry
+            if len(self._pending) >= COMMIT_BATCH_SIZE:
+                self.commit()
+
+    def commit(self):
+        """Write all buffered entries in a single transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            entries = list(self._pending.values())
+            self._pending = {}
+            with self._connection:
+                self._write_entries(entries)
+
+    def _write_entries(self, entries):
+        self._connection.executemany(
+            f"INSERT OR REPLACE INTO objects ({', '.join(OBJECT_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(OBJECT_FIELDS))})",
+            [
+                tuple(entry[field] for field in OBJECT_FIELDS[:-1])
+                + (join_columns(entry["columns"]),)
+                for entry in entries
+            ],
+        )
+
+    def remove(self, paths):
+        with self._lock:
+            self.commit()
+            with self._connection:
+                self._connection.executemany(
+                    "DELETE FROM objects WHERE path = ?", [(path,) for path in paths]
+                )
+
+    def remove_schema(self, database, schema, keep=()):
+        """Remove the objects of a schema from the catalog, except those in keep."""
+        keep = set(keep)
+        with self._lock:
+            self.commit()
+            paths = [
+                path
+                for (path,) in self._connection.execute(
+                    "SELECT path FROM objects WHERE database = ? AND schema = ?",
+                    (database, schema),
+                )
+                if path not in keep
+            ]
+        self.remove(paths)
+
+    def databases(self):
+        with self._lock:
+            self.commit()
+            return [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT DISTINCT database FROM objects ORDER BY database"
+                )
+            ]
+
+    def schemas(self, database):
+        with self._lock:
+            self.commit()
+            return [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT DISTINCT schema FROM objects WHERE database = ? "
+                    "ORDER BY schema",
+                    (database,),
+                )
+            ]
+
+    def find(
+        self,
+        database=None,
+        schema=None,
+        object_type=None,
+        name=None,
+        column=None,
+        source=None,
+    ):
+        """
+        Return the catalog entries matching all given filters, with their
+        columns. name is a glob pattern, column and source match case
+        insensitively and source is an object name qualified by zero to two of
+        its schema and database.
+        """
+        conditions = []
+        parameters = []
+        for field, value in (
+            ("database", database),
+            ("schema", schema),
+            ("object_type", object_type),
+        ):
+            if value is not None:
+                conditions.append(f"o.{field} = ?")
+                parameters.append(value)
+        if name is not None:
+            conditions.append("o.name GLOB ?")
+            parameters.append(name.lower())
+        if column is not None:
+            conditions.append("instr(lower(o.columns), lower(?)) > 0")
+            parameters.append(join_columns([column]))
+        if source is not None:
+            parts = source.split(".")
+            fields = ["source_database", "source_schema", "source_object"]
+            for field, value in zip(fields[-len(parts) :], parts):
+                conditions.append(f"o.{field} = ? COLLATE NOCASE")
+                parameters.append(value)
+
+        query = f"SELECT {', '.join('o.' + f for f in OBJECT_FIELDS)} FROM objects o"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY o.path"
+
+        with self._lock:
+            self.commit()
+            entries = [
+                dict(zip(OBJECT_FIELDS, row))
+                for row in self._connection.execute(query, parameters)
+            ]
+        for entry in entries:
+            entry["columns"] = split_columns(entry["columns"])
+        return entries
+
+    def reindex(self, objects_path, jobs=None):
+        """
+        Bring the catalog in line with the object files. Files whose mtime and
+        size match the catalog are not read, files whose content hash matches
+        only get their stat signature updated, and changed files are parsed
+        again, on a process pool when there are many of them. Objects whose
+        file is gone are removed, and the database and schema folders are
+        recorded for lists_folders_of. Returns the counts of added, updated,
+        removed and unchanged objects.
+        """
+        objects_path = Path(objects_path)
+        # Taken before the walk, so folders changed during it are seen as
+        # changed the next time.
+        folders = folder_signature(objects_path)
+        stats = {}
+        databases_path = objects_path / "databases"
+        if databases_path.is_dir():
+            for dirpath, dirnames, filenames in os.walk(databases_path):
+                dirnames.sort()
+                for filename in filenames:
+                    if not filename.endswith(".sql"):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    key = Path(os.path.relpath(path, objects_path)).as_posix()
+                    if object_key_parts(key) is not None:
+                        stats[key] = os.stat(path)
+
+        with self._lock:
+            self.commit()
+            known = {
+                row[0]: row[1:]
+                for row in self._connection.execute(
+                    "SELECT path, mtime_ns, size, content_hash FROM objects"
+                )
+            }
+
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        changed = []
+        for key, stat in stats.items():
+            signature = known.get(key)
+            if signature and signature[:2] == (stat.st_mtime_ns, stat.st_size):
+                counts["unchanged"] += 1
+            else:
+                changed.append(key)
+
+        if len(changed) > PARALLEL_INDEX_THRESHOLD and jobs != 1:
+            chunks = [changed[i : i + 64] for i in range(0, len(changed), 64)]
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                entries = [
+                    entry
+                    for chunk in executor.map(
+                        _describe_files, [str(objects_path)] * len(chunks), chunks
+                    )
+                    for entry in chunk
+                ]
+        else:
+            entries = _describe_files(str(objects_path), changed)
+
+        for entry in entries:
+            signature = known.get(entry["path"])
+            if signature is None:
+                counts["added"] += 1
+            elif signature[2] == entry["content_hash"]:
+                counts["unchanged"] += 1
+            else:
+                counts["updated"] += 1
+
+        removed = [path for path in known if path not in stats]
+        counts["removed"] = len(removed)
+
+        with self._lock, self._connection:
+            self._write_entries(entries)
+            self._connection.executemany(
+                "DELETE FROM objects WHERE path = ?", [(path,) for path in removed]
+            )
+            self._set_meta("indexed", 1)
+            self._set_meta("folders", json.dumps(folders, sort_keys=True))
+
+        return counts
+
+    def close(self):
+        with self._lock:
+            if self._connection is None:
+                return
+            self.commit()
+            self._connection.close()
+            self._connection = None
+        atexit.unregister(self.close)
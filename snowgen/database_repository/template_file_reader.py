@@ -0,0 +1,145 @@
+import bz2
+import codecs
+import csv
+import gzip
+import io
+import lzma
+import zipfile
+from contextlib import contextmanager
+from snowgen.profiler import profiler
+
+HEADER_SAMPLE_BYTES = 64 * 1024
+MAX_HEADER_BYTES = 8 * 1024 * 1024
+SNIFF_LINES = 20
+DELIMITERS = ",;\t|"
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+@contextmanager
+def open_template_file(path):
+    """
+    Open a template file as a binary stream, decompressing gzip, bz2, xz and
+    zip files on the fly. Compression is detected from the file's magic bytes.
+    """
+    with open(path, "rb") as file:
+        magic = file.read(6)
+
+    if magic.startswith(b"\x1f\x8b"):
+        stream = gzip.open(path, "rb")
+    elif magic.startswith(b"BZh"):
+        stream = bz2.open(path, "rb")
+    elif magic.startswith(b"\xfd7zXZ\x00"):
+        stream = lzma.open(path, "rb")
+    elif magic.startswith(b"PK\x03\x04"):
+        with zipfile.ZipFile(path) as archive:
+            members = [m for m in archive.infolist() if not m.is_dir()]
+            if not members:
+                raise ValueError(f"Zip file {path} is empty")
+            with archive.open(members[0]) as stream:
+                yield stream
+        return
+    else:
+        stream = open(path, "rb")
+
+    with stream:
+        yield stream
+
+
+def read_prefix(stream, sample_bytes=HEADER_SAMPLE_BYTES, max_bytes=MAX_HEADER_BYTES):
+    """
+    Read a bounded prefix of a stream. Reading continues past sample_bytes only
+    until the first line is complete, and never past max_bytes.
+    """
+    data = stream.read(sample_bytes)
+    while b"\n" not in data and len(data) < max_bytes:
+        chunk = stream.read(min(sample_bytes, max_bytes - len(data)))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def detect_encoding(data, encoding=None):
+    """
+    Detect the encoding of a file prefix from its byte order mark, falling back
+    to cp1252 for files that are not valid UTF-8.
+    """
+    if encoding:
+        return encoding
+    for bom, bom_encoding in BOMS:
+        if data.startswith(bom):
+            return bom_encoding
+    try:
+        # final=False tolerates a multi-byte character cut off by the prefix.
+        codecs.getincrementaldecoder("utf-8")().decode(data, final=False)
+    except UnicodeDecodeError:
+        return "cp1252"
+    return "utf-8"
+
+
+def decode_prefix(data, encoding=None):
+    """Decode a file prefix with the given or detected encoding."""
+    decoder = codecs.getincrementaldecoder(detect_encoding(data, encoding))(
+        errors="replace"
+    )
+    return decoder.decode(data, final=False)
+
+
+def sniff_dialect(sample):
+    """Detect the delimiter and quoting of a delimited text sample."""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS)
+    except csv.Error:
+        first_line = sample.split("\n", 1)[0]
+        counts = {d: first_line.count(d) for d in DELIMITERS}
+        delimiter = max(counts, key=counts.get)
+        return type(
+            "FallbackDialect",
+            (csv.excel,),
+            {"delimiter": delimiter if counts[delimiter] else ","},
+        )
+
+
+def complete_lines(text, line_count=SNIFF_LINES):
+    """Return at most line_count complete lines of a possibly truncated text."""
+    lines = text.splitlines(keepends=True)
+    if len(lines) > 1 and not lines[-1].endswith(("\n", "\r")):
+        lines.pop()
+    return "".join(lines[:line_count])
+
+
+def read_header_and_dialect(
+    path, delimiter=None, encoding=None, sample_bytes=HEADER_SAMPLE_BYTES
+):
+    """
+    Read the column names of a delimited text file, reading only a bounded
+    prefix of the (possibly compressed) file. Returns the columns, the csv
+    dialect and the encoding of the file.
+    """
+    with open_template_file(path) as stream:
+        data = read_prefix(stream, sample_bytes=sample_bytes)
+    profiler.count("bytes_read", len(data))
+
+    encoding = detect_encoding(data, encoding)
+    sample = complete_lines(decode_prefix(data, encoding))
+    if not sample.strip():
+        return [], csv.excel, encoding
+
+    if delimiter:
+        dialect = type("UserDialect", (csv.excel,), {"delimiter": delimiter})
+    else:
+        dialect = sniff_dialect(sample)
+    header = next(csv.reader(io.StringIO(sample), dialect), [])
+    return [column.strip() for column in header], dialect, encoding
+
+
+def read_header(path, delimiter=None, encoding=None, sample_bytes=HEADER_SAMPLE_BYTES):
+    """Read the column names of a delimited text file."""
+    return read_header_and_dialect(path, delimiter, encoding, sample_bytes)[0]
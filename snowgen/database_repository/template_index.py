@@ -0,0 +1,164 @@
+import json
+import os
+from pathlib import Path
+from snowgen.profiler import profiler
+
+
+class TemplateIndex:
+    """
+    Index of the template folders of a repository and the SQL templates inside them.
+
+    The index is built with a single walk of the working directory and can be
+    persisted to disk. A persisted index is reused as long as the modification
+    times of the indexed directories are unchanged.
+    """
+
+    INDEX_VERSION = 1
+    INDEXED_FOLDERS = ("sql_templates", "template_files")
+    TEMPLATES_FOLDER = "sql_templates"
+
+    def __init__(self, base_path, index_file=None, exclude=()):
+        self.base_path = Path(base_path)
+        self.index_file = Path(index_file) if index_file else None
+        self.exclude = {os.path.abspath(path) for path in exclude}
+        self.folders = {}
+        self.templates = {}
+        self.directories = {}
+
+    def load(self):
+        """Load the persisted index if it is still valid, otherwise rebuild it."""
+        if self._read():
+            profiler.count("cache_hits.template_index")
+        else:
+            self.rebuild()
+            self._write()
+        return self
+
+    def rebuild(self):
+        """Walk the working directory once and index all template folders."""
+        self.folders = {}
+        self.templates = {}
+        self.directories = {}
+
+        for dirpath, dirnames, _ in os.walk(self.base_path):
+            profiler.count("directory_walks")
+            dirnames[:] = sorted(
+                d
+                for d in dirnames
+                if not d.startswith(".")
+                and os.path.abspath(os.path.join(dirpath, d)) not in self.exclude
+            )
+            for dirname in dirnames:
+                if dirname in self.INDEXED_FOLDERS and dirname not in self.folders:
+                    self.folders[dirname] = self._relative(os.path.join(dirpath, dirname))
+            if len(self.folders) == len(self.INDEXED_FOLDERS):
+                break
+
+        for name, folder in self.folders.items():
+            folder_path = self.base_path / folder
+            self.directories[folder] = os.stat(folder_path).st_mtime_ns
+            if name == self.TEMPLATES_FOLDER:
+                self._index_templates(folder_path)
+
+    def _index_templates(self, templates_path):
+        for dirpath, dirnames, filenames in os.walk(templates_path):
+            profiler.count("directory_walks")
+            dirnames.sort()
+            self.directories[self._relative(dirpath)] = os.stat(dirpath).st_mtime_ns
+            for filename in filenames:
+                template_name = Path(
+                    os.path.relpath(os.path.join(dirpath, filename), templates_path)
+                ).as_posix()
+                self.templates[template_name] = self._relative(
+                    os.path.join(dirpath, filename)
+                )
+
+    def _relative(self, path):
+        return Path(os.path.relpath(path, self.base_path)).as_posix()
+
+    def is_valid(self):
+        """Check whether none of the indexed directories changed since indexing."""
+        if len(self.folders) != len(self.INDEXED_FOLDERS):
+            return False
+        for directory, mtime_ns in self.directories.items():
+            try:
+                if os.stat(self.base_path / directory).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _read(self):
+        if not self.index_file or not self.index_file.is_file():
+            return False
+        try:
+            with open(self.index_file, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        if data.get("version") != self.INDEX_VERSION or data.get(
+            "base_path"
+        ) != os.path.abspath(self.base_path):
+            return False
+
+        self.folders = data["folders"]
+        self.templates = data["templates"]
+        self.directories = data["directories"]
+        return self.is_valid()
+
+    def _write(self):
+        # Indexes with missing folders are never persisted, so a folder created
+        # later is always picked up by the next run.
+        if not self.index_file or len(self.folders) != len(self.INDEXED_FOLDERS):
+            return
+        data = {
+            "version": self.INDEX_VERSION,
+            "base_path": os.path.abspath(self.base_path),
+            "folders": self.folders,
+            "templates": self.templates,
+            "directories": self.directories,
+        }
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_name(
+                f"{self.index_file.name}.{os.getpid()}.tmp"
+            )
+            with open(tmp_file, "w") as file:
+                json.dump(data, file)
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            pass
+
+    def get_folder(self, folder_name):
+        """Return the path to an indexed folder, or None if it does not exist."""
+        folder = self.folders.get(folder_name)
+        return str(self.base_path / folder) if folder else None
+
+    def get_template_path(self, template_name):
+        """Return the path to a SQL template by name."""
+        template = self.templates.get(template_name)
+        if template:
+            return self.base_path / template
+        folder = self.get_folder(self.TEMPLATES_FOLDER)
+        return Path(folder) / template_name if folder else None
+
+
+_indexes = {}
+
+
+def get_template_index(base_path, index_file=None, exclude=()):
+    """Return the template index for a working directory, built once per process."""
+    key = os.path.abspath(base_path)
+    index = _indexes.get(key)
+    if index is None:
+        with profiler.phase("template_discovery"):
+            index = _indexes[key] = TemplateIndex(
+                base_path, index_file=index_file, exclude=exclude
+            ).load()
+    return index
+
+
+def clear_template_indexes():
+    """Forget all indexes built by this process."""
+    _indexes.clear()
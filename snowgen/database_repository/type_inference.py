@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import random
+import re
+from itertools import zip_longest
+from snowgen.database_objects.column_validation import deduplicate_columns
+from snowgen.database_repository.template_file_reader import (
+    open_template_file,
+    read_header_and_dialect,
+)
+from snowgen.profiler import profiler
+
+DEFAULT_SAMPLE_ROWS = 1000
+DEFAULT_SAMPLE_BYTES = 4 * 1024 * 1024
+MAX_NUMBER_PRECISION = 38
+
+# Each pattern matches a whole column at once: the sampled values of a column
+# are joined with newlines and matched in a single regex call.
+BOOLEAN_COLUMN = re.compile(r"(?:(?i:true|false|yes|no|t|f|y|n)\n)+")
+# Numbers with leading zeros are kept as text, they are usually identifiers.
+NUMBER_COLUMN = re.compile(r"(?:[+-]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)\n)+")
+FLOAT_COLUMN = re.compile(
+    r"(?:[+-]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?\n)+"
+)
+DATE_COLUMN = re.compile(r"(?:\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])\n)+")
+TIMESTAMP_COLUMN = re.compile(
+    r"(?:\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])[ T]"
+    r"(?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d{1,9})?)?"
+    r"(?:Z|[+-]\d{2}:?\d{2})?\n)+"
+)
+TIMESTAMP_OFFSET = re.compile(r"(?:Z|[+-]\d{2}:?\d{2})\n")
+
+
+def sample_rows(rows, sample_rows=DEFAULT_SAMPLE_ROWS, seed=0):
+    """Reservoir sample a fixed number of rows from a stream of rows."""
+    generator = random.Random(seed)
+    sample = []
+    for i, row in enumerate(rows):
+        if i < sample_rows:
+            sample.append(row)
+        else:
+            j = generator.randint(0, i)
+            if j < sample_rows:
+                sample[j] = row
+    return sample
+
+
+def _bounded_rows(reader, stream, sample_bytes):
+    """Yield rows until sample_bytes of the (decompressed) stream were read."""
+    for i, row in enumerate(reader):
+        yield row
+        if i % 64 == 0 and stream.tell() >= sample_bytes:
+            return
+
+
+def _number_type(values):
+    integer_digits = 0
+    scale = 0
+    for value in values:
+        whole, _, fraction = value.lstrip("+-").partition(".")
+        integer_digits = max(integer_digits, len(whole.lstrip("0")))
+        scale = max(scale, len(fraction))
+    precision = integer_digits + scale
+    if precision > MAX_NUMBER_PRECISION:
+        return "FLOAT"
+    return f"NUMBER({max(precision, 1)},{scale})"
+
+
+def _is_variant(values):
+    if not all(value[:1] in "{[" for value in values):
+        return False
+    try:
+        for value in values:
+            json.loads(value)
+    except ValueError:
+        return False
+    return True
+
+
+def infer_column_type(values):
+    """Infer the Snowflake data type of a column from its sampled values."""
+    values = [value.strip() for value in values if value and value.strip()]
+    if not values:
+        return "VARCHAR"
+
+    joined = "\n".join(values) + "\n"
+    if joined.count("\n") != len(values):
+        return "VARIANT" if _is_variant(values) else "VARCHAR"
+
+    if BOOLEAN_COLUMN.fullmatch(joined):
+        return "BOOLEAN"
+    if NUMBER_COLUMN.fullmatch(joined):
+        return _number_type(values)
+    if FLOAT_COLUMN.fullmatch(joined):
+        return "FLOAT"
+    if DATE_COLUMN.fullmatch(joined):
+        return "DATE"
+    if TIMESTAMP_COLUMN.fullmatch(joined):
+        if len(TIMESTAMP_OFFSET.findall(joined)) == len(values):
+            return "TIMESTAMP_TZ"
+        return "TIMESTAMP_NTZ"
+    if _is_variant(values):
+        return "VARIANT"
+    return "VARCHAR"
+
+
+def infer_column_types(
+    path,
+    delimiter=None,
+    encoding=None,
+    sample_rows_budget=DEFAULT_SAMPLE_ROWS,
+    sample_bytes_budget=DEFAULT_SAMPLE_BYTES,
+):
+    """
+    Infer the columns and their data types of a delimited text file from a
+    reservoir sample of its rows. At most sample_bytes_budget bytes of the file
+    are read and at most sample_rows_budget rows are kept in memory. Repeated
+    header names get a suffix, see deduplicate_columns.
+    """
+    columns, dialect, encoding = read_header_and_dialect(path, delimiter, encoding)
+    if not columns:
+        return {}
+
+    with open_template_file(path) as stream:
+        text = io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline="")
+        reader = csv.reader(text, dialect)
+        next(reader, None)
+        rows = sample_rows(
+            _bounded_rows(reader, stream, sample_bytes_budget), sample_rows_budget
+        )
+        profiler.count("bytes_read", stream.tell())
+
+    column_values = list(zip_longest(*rows, fillvalue=""))
+    column_values += [()] * (len(columns) - len(column_values))
+
+    # A dict would merge columns with the same header name.
+    return {
+        column: infer_column_type(values)
+        for column, values in zip(deduplicate_columns(columns), column_values)
+    }
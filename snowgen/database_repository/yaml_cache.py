@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from snowgen.profiler import profiler
+
+
+def load_yaml(yaml_file):
+    """
+    Parse a YAML file with the libyaml loader when it is available. PyYAML is
+    imported on first use, so runs served from the parse cache never load it.
+    """
+    import yaml
+
+    SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(yaml_file, "rb") as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def is_plain_data(value):
+    """
+    Check whether a parsed YAML value survives a JSON round trip unchanged:
+    mappings with string keys, lists, strings, numbers, booleans and nulls.
+    """
+    if isinstance(value, dict):
+        return all(
+            isinstance(key, str) and is_plain_data(item) for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return all(is_plain_data(item) for item in value)
+    return value is None or isinstance(value, (str, int, float))
+
+
+class ParsedYaml:
+    """A parsed YAML file together with the stat signature it was parsed from."""
+
+    def __init__(self, path, mtime_ns, size, config):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.config = config
+        self.schema_templates = {}
+        for schema_template in (config or {}).get("schemas") or []:
+            self.schema_templates.setdefault(schema_template["name"], schema_template)
+
+    def matches(self, stat):
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+
+class YamlCache:
+    """
+    Parse-once cache for YAML files keyed by path, mtime and size.
+
+    Parsed files are kept in memory for the lifetime of the process and, when a
+    cache folder is given, written to disk as JSON so a cold start can skip
+    parsing. The cache folder is part of the working tree, so its artifacts
+    are only ever read as plain data, and files whose parsed content is not
+    plain data, such as dates, are not written to it.
+    """
+
+    CACHE_VERSION = 2
+
+    def __init__(self):
+        self._entries = {}
+
+    def load(self, yaml_file, cache_path=None):
+        path = os.path.abspath(yaml_file)
+        stat = os.stat(path)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.matches(stat):
+            profiler.count("cache_hits.yaml")
+            return entry
+
+        with profiler.phase("yaml"):
+            artifact = self._artifact_path(path, cache_path) if cache_path else None
+            entry = self._read_artifact(artifact, path, stat) if artifact else None
+            if entry is None:
+                profiler.count("files_scanned")
+                profiler.count("bytes_read", stat.st_size)
+                entry = ParsedYaml(
+                    path, stat.st_mtime_ns, stat.st_size, load_yaml(path)
+                )
+                if artifact:
+                    self._write_artifact(artifact, entry)
+            else:
+                profiler.count("cache_hits.yaml_artifact")
+
+        self._entries[path] = entry
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def _artifact_path(self, path, cache_path):
+        path_hash = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+        return Path(cache_path) / "yaml" / f"{Path(path).name}.{path_hash}.json"
+
+    def _read_artifact(self, artifact, path, stat):
+        try:
+            with open(artifact, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if data["version"] != self.CACHE_VERSION or data["path"] != path:
+                return None
+            entry = ParsedYaml(path, data["mtime_ns"], data["size"], data["config"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return entry if entry.matches(stat) else None
+
+    def _write_artifact(self, artifact, entry):
+        if not is_plain_data(entry.config):
+            return
+        try:
+            artifact.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = artifact.with_name(f"{artifact.name}.{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "version": self.CACHE_VERSION,
+                        "path": entry.path,
+                        "mtime_ns": entry.mtime_ns,
+                        "size": entry.size,
+                        "config": entry.config,
+                    },
+                    file,
+                )
+            os.replace(tmp_file, artifact)
+        except OSError:
+            pass
+
+yaml_cache = YamlCache()
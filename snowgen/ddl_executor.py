@@ -0,0 +1,164 @@
+import asyncio
+import json
+import random
+import time
+from snowgen.database_objects.environment_template import SLOT_PATTERN
+from snowgen.database_repository.ddl_parser import split_statements
+from snowgen.drivers import Driver
+from snowgen.profiler import profiler
+
+
+class ConnectionPool:
+    """
+    Pool of at most size connections of a driver, opened as they are first
+    needed. Tasks wait for a free connection once all are in use, which
+    bounds the number of statements running at once.
+    """
+
+    def __init__(self, driver: Driver, size):
+        self.driver = driver
+        self.size = size
+        self._idle = []
+        self._opened = 0
+        self._released = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._released:
+            while not self._idle and self._opened >= self.size:
+                await self._released.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._opened += 1
+        try:
+            return await self.driver.connect()
+        except BaseException:
+            await self._discard()
+            raise
+
+    async def release(self, connection, broken=False):
+        """Return a connection to the pool, closing it when it broke."""
+        if broken:
+            try:
+                await connection.close()
+            except Exception:
+                pass
+            await self._discard()
+            return
+        async with self._released:
+            self._idle.append(connection)
+            self._released.notify()
+
+    async def _discard(self):
+        async with self._released:
+            self._opened -= 1
+            self._released.notify()
+
+    async def close(self):
+        async with self._released:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for connection in idle:
+            await connection.close()
+
+
+class DdlExecutor:
+    """
+    Apply the objects of a deployment plan level by level.
+
+    The objects of a level run concurrently on a connection pool. Every
+    object runs its statements in order on one connection, so USE statements
+    hold for the statements after them. A failed object is retried with
+    exponential backoff when the driver reports the error as transient, and
+    the objects depending on an object that failed are skipped.
+    """
+
+    def __init__(
+        self, driver: Driver, concurrency=8, retries=3, backoff=0.5, log=None
+    ):
+        self.driver = driver
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.log = log
+
+    def apply(self, plan):
+        """Apply a plan and return the result of every object, keyed by path."""
+        return asyncio.run(self.apply_async(plan))
+
+    async def apply_async(self, plan):
+        pool = ConnectionPool(self.driver, self.concurrency)
+        results = {}
+        try:
+            for number, level in enumerate(plan.levels, start=1):
+                level_results = await asyncio.gather(
+                    *(
+                        self._apply_object(pool, plan, key, number, results)
+                        for key in level
+                    )
+                )
+                for result in level_results:
+                    results[result["path"]] = result
+                    if self.log is not None:
+                        self.log.write(json.dumps(result) + "\n")
+                if self.log is not None:
+                    self.log.flush()
+        finally:
+            await pool.close()
+        return results
+
+    async def _apply_object(self, pool, plan, key, level, results):
+        result = {
+            "path": key,
+            "level": level,
+            "status": "applied",
+            "attempts": 0,
+            "seconds": 0.0,
+            "error": None,
+        }
+        failed = sorted(
+            dependency
+            for dependency in plan.dependencies[key]
+            if results[dependency]["status"] != "applied"
+        )
+        if failed:
+            result["status"] = "skipped"
+            result["error"] = f"Depends on {', '.join(failed)}, which was not applied"
+            return result
+
+        try:
+            ddl = plan.read_ddl(key)
+        except (OSError, ValueError) as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+            return result
+        if SLOT_PATTERN.search(ddl):
+            # Unfilled slots would only fail, or act on the wrong objects.
+            result["status"] = "failed"
+            result["error"] = "DDL has environment slots, apply it with an environment"
+            return result
+
+        statements = split_statements(ddl)
+        start = time.perf_counter()
+        while True:
+            result["attempts"] += 1
+            connection = None
+            try:
+                connection = await pool.acquire()
+                for statement in statements:
+                    await connection.execute(statement)
+                    profiler.count("statements_executed")
+            except Exception as e:
+                transient = self.driver.is_transient(e)
+                if connection is not None:
+                    await pool.release(connection, broken=transient)
+                if not transient or result["attempts"] > self.retries:
+                    result["status"] = "failed"
+                    result["error"] = str(e)
+                    break
+                delay = self.backoff * 2 ** (result["attempts"] - 1)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            else:
+                await pool.release(connection)
+                break
+        result["seconds"] = round(time.perf_counter() - start, 6)
+        return result
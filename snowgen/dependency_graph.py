@@ -0,0 +1,278 @@
+from collections import defaultdict, deque
+from pathlib import PurePosixPath
+from snowgen.database_objects.sql_template import TemplateError
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.database_repository.object_catalog import object_key_parts
+from snowgen.main import SCHEMA_TEMPLATE_SECTIONS, hash_schema_section
+from snowgen.object_writers.generation_manifest import GenerationManifest
+
+OBJECT_TYPE_SECTIONS = {
+    object_type: section for section, object_type in SCHEMA_TEMPLATE_SECTIONS.items()
+}
+
+
+def object_key(database, schema, object_type, name, prefix="", suffix=""):
+    """Build the path of an object relative to the snowflake objects folder."""
+    filename = "_".join(part for part in (prefix, name, suffix) if part).lower()
+    return PurePosixPath(
+        "databases", database, "schemas", schema, object_type, f"{filename}.sql"
+    ).as_posix()
+
+
+class DependencyGraph:
+    """
+    Graph of the inputs every generated object depends on, built from the
+    generation manifests of all schemas.
+
+    Nodes are tuples: ("schema_template", database, schema, section) for a
+    section of the schema template a schema was generated from,
+    ("sql_template", name) for a SQL template, ("template_file", schema,
+    file name) for a template file and ("object", key) for an object. Edges
+    point from an input to the objects rendered from it, and from a table to
+    the dynamic tables derived from it, so the objects affected by a change
+    are the nodes reachable from it.
+    """
+
+    def __init__(self, database_repository: DatabaseRepository):
+        self.database_repository = database_repository
+        self.schemas = {}
+        self.objects = {}
+        self.errors = []
+        self._dependents = defaultdict(set)
+        self._template_hashes = {}
+        self._current_template_hashes = {}
+
+    @classmethod
+    def build(cls, database_repository: DatabaseRepository):
+        graph = cls(database_repository)
+        manifests_path = database_repository.cache_path / "manifests"
+        for manifest_file in sorted(manifests_path.glob("*/*.json")):
+            graph.add_schema(
+                GenerationManifest.for_schema(
+                    database_repository, manifest_file.parent.name, manifest_file.stem
+                ),
+                manifest_file.parent.name,
+                manifest_file.stem,
+            )
+        graph._link_sources()
+        return graph
+
+    def add_schema(self, manifest: GenerationManifest, database, schema):
+        """Add the objects of a schema and the inputs they were generated from."""
+        generation = manifest.generation
+        template = generation.get("schema_template") or next(
+            (
+                entry["schema_template"]
+                for entry in manifest.objects.values()
+                if entry.get("schema_template")
+            ),
+            None,
+        )
+        if template is None:
+            return
+        schema_config = self.database_repository.get_schema_template(template)
+        if schema_config is None:
+            self.errors.append(
+                f"{database}.{schema}: unknown schema template {template}"
+            )
+            return
+
+        entry = {
+            "schema": schema,
+            "template": template,
+            "delimiter": generation.get("delimiter"),
+            "source_database": generation.get("source_database"),
+            "source_schema": generation.get("source_schema"),
+        }
+        if not generation:
+            entry.update(self._catalog_sources(database, schema))
+        self.schemas[(database, schema)] = {
+            "entry": entry,
+            "config": schema_config,
+            "manifest": manifest,
+        }
+
+        for key, record in manifest.objects.items():
+            key_parts = object_key_parts(key)
+            if key_parts is None:
+                continue
+            object_type = key_parts[2]
+            self._add_object(key, database, schema, object_type)
+            if record.get("template_name"):
+                self._dependents[("sql_template", record["template_name"])].add(key)
+                self._template_hashes[key] = record.get("template_hash")
+
+        # Objects a schema template section adds are affected by its change.
+        for section, object_type in SCHEMA_TEMPLATE_SECTIONS.items():
+            for obj in schema_config.get(section) or []:
+                if "object_name" in obj:
+                    self._add_object(
+                        object_key(
+                            database,
+                            schema,
+                            object_type,
+                            obj["object_name"],
+                            obj.get("prefix", ""),
+                            obj.get("suffix", ""),
+                        ),
+                        database,
+                        schema,
+                        object_type,
+                    )
+
+        recorded_files = generation.get("template_files") or {}
+        current_files = self.database_repository.get_template_file_signatures(schema)
+        for obj in schema_config.get("tables") or []:
+            if not obj.get("generate_columns_from_template"):
+                continue
+            for file_name in set(recorded_files) | set(current_files):
+                parts = self.database_repository.extract_filename_parts(file_name)
+                if parts is None:
+                    continue
+                key = object_key(
+                    database,
+                    schema,
+                    "tables",
+                    parts["filename"],
+                    obj.get("prefix", ""),
+                    obj.get("suffix", ""),
+                )
+                self._add_object(key, database, schema, "tables")
+                self._dependents[("template_file", schema, file_name)].add(key)
+
+    def _catalog_sources(self, database, schema):
+        """Find the source schema of a schema generated without a record of it."""
+        for entry in self.database_repository.get_catalog().find(
+            database=database, schema=schema, object_type="dynamic_tables"
+        ):
+            if entry["source_database"] and entry["source_schema"]:
+                return {
+                    "source_database": entry["source_database"],
+                    "source_schema": entry["source_schema"],
+                }
+        return {}
+
+    def _add_object(self, key, database, schema, object_type):
+        self.objects[key] = (database, schema, object_type)
+        section = OBJECT_TYPE_SECTIONS.get(object_type)
+        if section is not None:
+            self._dependents[("schema_template", database, schema, section)].add(key)
+
+    def _link_sources(self):
+        """Link every table to the dynamic tables derived from it."""
+        tables = defaultdict(list)
+        for key, (database, schema, object_type) in self.objects.items():
+            if object_type == "tables":
+                tables[(database, schema)].append(key)
+
+        for (database, schema), info in self.schemas.items():
+            entry = info["entry"]
+            source = (entry["source_database"], entry["source_schema"])
+            for obj in info["config"].get("dynamic_tables") or []:
+                if not obj.get("generate_columns_from_table"):
+                    continue
+                for table_key in tables.get(source, ()):
+                    key = object_key(
+                        database,
+                        schema,
+                        "dynamic_tables",
+                        PurePosixPath(table_key).stem,
+                        obj.get("prefix", ""),
+                        obj.get("suffix", ""),
+                    )
+                    self._add_object(key, database, schema, "dynamic_tables")
+                    self._dependents[("object", table_key)].add(key)
+
+    def template_hash(self, template_name):
+        template_hash = self._current_template_hashes.get(template_name)
+        if template_hash is None:
+            try:
+                template_hash = self.database_repository.get_compiled_sql_template(
+                    template_name
+                ).source_hash
+            except (KeyError, OSError, ValueError, TemplateError):
+                template_hash = ""
+            self._current_template_hashes[template_name] = template_hash
+        return template_hash
+
+    def changes(self):
+        """
+        Return the inputs that changed since the objects depending on them were
+        generated, with a description of each change.
+        """
+        changes = {}
+        for node in self._dependents:
+            if node[0] == "sql_template" and any(
+                self._template_hashes.get(key) != self.template_hash(node[1])
+                for key in self._dependents[node]
+            ):
+                changes[node] = f"template {node[1]} changed"
+
+        for (database, schema), info in self.schemas.items():
+            generation = info["manifest"].generation
+            recorded_sections = generation.get("sections") or {}
+            for section in SCHEMA_TEMPLATE_SECTIONS:
+                if not info["config"].get(section) and section not in recorded_sections:
+                    continue
+                if recorded_sections.get(section) != hash_schema_section(
+                    info["config"], section
+                ):
+                    changes[("schema_template", database, schema, section)] = (
+                        f"{section} of schema template {info['entry']['template']} "
+                        "changed"
+                    )
+
+            if not info["config"].get("tables"):
+                continue
+            recorded_files = generation.get("template_files")
+            current_files = self.database_repository.get_template_file_signatures(
+                schema
+            )
+            for file_name in set(recorded_files or {}) | set(current_files):
+                if recorded_files is None:
+                    change = "not recorded"
+                elif file_name not in current_files:
+                    change = "removed"
+                elif file_name not in recorded_files:
+                    change = "added"
+                elif recorded_files[file_name] != current_files[file_name]:
+                    change = "changed"
+                else:
+                    continue
+                changes[("template_file", schema, file_name)] = (
+                    f"template file {schema}/{file_name} {change}"
+                )
+        return changes
+
+    def dependents(self, node):
+        """Return the objects that depend directly on a node."""
+        keys = self._dependents.get(node, ())
+        if node[0] == "sql_template":
+            # Objects generated from the current template are up to date.
+            template_hash = self.template_hash(node[1])
+            keys = [key for key in keys if self._template_hashes.get(key) != template_hash]
+        return sorted(keys)
+
+    def impact(self, changes, database=None, schema=None, object_types=None):
+        """
+        Return the objects affected by the changed nodes, each with the node it
+        depends on. Objects outside the database, schema or object types given
+        are not updated, so they do not affect the objects derived from them.
+        """
+        impacted = {}
+        queue = deque(changes)
+        while queue:
+            node = queue.popleft()
+            for key in self.dependents(node):
+                if key in impacted:
+                    continue
+                key_database, key_schema, object_type = self.objects[key]
+                if (
+                    (database is not None and key_database != database)
+                    or (schema is not None and key_schema != schema)
+                    or (object_types is not None and object_type not in object_types)
+                ):
+                    continue
+                impacted[key] = node
+                queue.append(("object", key))
+        return impacted
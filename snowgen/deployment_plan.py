@@ -0,0 +1,247 @@
+import json
+from collections import defaultdict
+from pathlib import Path, PurePosixPath
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.database_repository.ddl_parser import parse_object_references
+from snowgen.database_objects.environment_template import EnvironmentTemplate
+from snowgen.schema_drift import MIGRATIONS_FOLDER_NAME, migration_keys
+
+# The object types a reference of each kind can resolve to.
+REFERENCE_TYPES = {
+    "file_format": ("file_formats",),
+    "sequence": ("sequences",),
+    "object": ("tables", "dynamic_tables"),
+}
+
+
+class DependencyCycleError(ValueError):
+    pass
+
+
+class DeploymentPlan:
+    """
+    Order in which the objects of the generated tree can be deployed.
+
+    Every object depends on the schema definition of its schema and on the
+    objects its DDL refers to, such as the file format of a stage, the
+    sequence of a column default or the source of a dynamic table. Objects
+    are grouped into levels: every object only depends on objects of earlier
+    levels, so the objects of a level can be deployed concurrently and a
+    deployment takes as many rounds as the graph is deep. The migrations of
+    a table follow it, each in a level of its own.
+
+    Only the references are kept of the DDL, which is read again when it is
+    deployed, from the tree rendered for the environment where there is one
+    and otherwise from the objects folder. With an environment, the {env}
+    slots of the DDL are filled in with its name as it is read.
+    """
+
+    PLANNED_FIELDS = ("database", "schema", "object_type", "name")
+
+    def __init__(
+        self, objects, dependencies, objects_path, environment=None, rendered_path=None
+    ):
+        self.objects = objects
+        self.dependencies = dependencies
+        self.objects_path = Path(objects_path)
+        self.environment = environment
+        self.rendered_path = Path(rendered_path) if rendered_path else None
+        self.levels = self._levels()
+
+    @classmethod
+    def build(
+        cls,
+        database_repository: DatabaseRepository,
+        database=None,
+        schema=None,
+        environment=None,
+    ):
+        """
+        Plan the deployment of the objects in the catalog, optionally of one
+        schema. With an environment whose tree was written by a generation
+        with environments, the DDL is read from that tree.
+        """
+        objects_path = database_repository.snowflake_objects_path
+        objects = {}
+        references = {}
+        for entry in database_repository.get_catalog().find(
+            database=database, schema=schema
+        ):
+            key = entry["path"]
+            objects[key] = {field: entry[field] for field in cls.PLANNED_FIELDS}
+            objects[key]["path"] = key
+            with open(objects_path / key, "r", encoding="utf-8") as file:
+                references[key] = parse_object_references(file.read())
+
+        by_name = defaultdict(list)
+        schema_definitions = defaultdict(list)
+        for key, entry in objects.items():
+            by_name[entry["name"].lower()].append(entry)
+            if entry["object_type"] == "schema_definition":
+                schema_definitions[(entry["database"], entry["schema"])].append(key)
+
+        dependencies = {}
+        for key, entry in objects.items():
+            depends_on = set()
+            if entry["object_type"] != "schema_definition":
+                depends_on.update(
+                    schema_definitions[(entry["database"], entry["schema"])]
+                )
+            for reference in references[key]:
+                target = _resolve_reference(entry, reference, by_name)
+                if target is not None and target != key:
+                    depends_on.add(target)
+            dependencies[key] = depends_on
+
+        # The migrations of a table are deployed after it, one level each in
+        # the order they were written, and the objects depending on the table
+        # after its last migration.
+        last_migrations = {}
+        for key, entry in list(objects.items()):
+            if entry["object_type"] != "tables":
+                continue
+            previous = key
+            for migration_key in migration_keys(objects_path, key):
+                objects[migration_key] = {
+                    **entry,
+                    "object_type": MIGRATIONS_FOLDER_NAME,
+                    "name": PurePosixPath(migration_key).stem,
+                    "path": migration_key,
+                }
+                dependencies[migration_key] = {previous}
+                previous = migration_key
+            if previous != key:
+                last_migrations[key] = previous
+        for key, depends_on in dependencies.items():
+            if objects[key]["object_type"] != MIGRATIONS_FOLDER_NAME:
+                depends_on.update(
+                    last_migrations[dependency]
+                    for dependency in list(depends_on)
+                    if dependency in last_migrations
+                )
+
+        rendered_path = None
+        if environment is not None:
+            environment_path = database_repository.get_environment_objects_path(
+                environment
+            )
+            if environment_path.is_dir():
+                rendered_path = environment_path
+        return cls(
+            objects,
+            dependencies,
+            objects_path,
+            environment=environment,
+            rendered_path=rendered_path,
+        )
+
+    def read_ddl(self, key):
+        path = self.objects_path / key
+        # Migrations are only written to the objects folder, not to the trees
+        # rendered for environments.
+        if self.rendered_path is not None and (self.rendered_path / key).is_file():
+            path = self.rendered_path / key
+        with open(path, "r", encoding="utf-8") as file:
+            ddl = file.read()
+        if self.environment is not None:
+            ddl = EnvironmentTemplate(ddl).render({"env": self.environment})
+        return ddl
+
+    def _levels(self):
+        """Group the objects by the length of their longest dependency chain."""
+        dependents = defaultdict(list)
+        waiting = {}
+        for key, depends_on in self.dependencies.items():
+            waiting[key] = len(depends_on)
+            for dependency in depends_on:
+                dependents[dependency].append(key)
+
+        levels = []
+        level = sorted(key for key, count in waiting.items() if count == 0)
+        while level:
+            levels.append(level)
+            next_level = []
+            for key in level:
+                for dependent in dependents[key]:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        next_level.append(dependent)
+            level = sorted(next_level)
+
+        planned = sum(len(level) for level in levels)
+        if planned < len(self.dependencies):
+            cycle = sorted(key for key, count in waiting.items() if count > 0)
+            raise DependencyCycleError(
+                f"Dependency cycle between {', '.join(cycle)}"
+            )
+        return levels
+
+    def to_dict(self):
+        return {
+            "objects": len(self.objects),
+            "depth": len(self.levels),
+            "levels": [
+                [
+                    {
+                        "path": key,
+                        "database": self.objects[key]["database"],
+                        "schema": self.objects[key]["schema"],
+                        "object_type": self.objects[key]["object_type"],
+                        "name": self.objects[key]["name"],
+                        "depends_on": sorted(self.dependencies[key]),
+                    }
+                    for key in level
+                ]
+                for level in self.levels
+            ],
+        }
+
+    def write_json(self, stream):
+        json.dump(self.to_dict(), stream, indent=2)
+        stream.write("\n")
+
+    def write_scripts(self, folder):
+        """
+        Write the DDL of each level into a script of its own, named by level,
+        and return the script paths.
+        """
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        width = max(3, len(str(len(self.levels))))
+        paths = []
+        for number, level in enumerate(self.levels, start=1):
+            path = folder / f"level_{number:0{width}d}.sql"
+            with open(path, "w", encoding="utf-8") as file:
+                for key in level:
+                    ddl = self.read_ddl(key)
+                    file.write(f"-- {key}\n{ddl}")
+                    if not ddl.endswith("\n"):
+                        file.write("\n")
+                    file.write("\n")
+            paths.append(path)
+        return paths
+
+
+def _resolve_reference(entry, reference, by_name):
+    """
+    Find the object a reference points to. Missing parts default to the
+    database and schema of the referring object, and a qualified reference
+    whose database is not found matches on schema and name alone, since
+    rendered DDL usually names databases with an environment suffix.
+    """
+    kind, database, schema, name = reference
+    candidates = [
+        candidate
+        for candidate in by_name.get(name.lower(), ())
+        if candidate["object_type"] in REFERENCE_TYPES[kind]
+    ]
+    schema = (schema or entry["schema"]).lower()
+    candidates = [c for c in candidates if c["schema"].lower() == schema]
+
+    database = (database or entry["database"]).lower()
+    exact = [c for c in candidates if c["database"].lower() == database]
+    if exact:
+        return exact[0]["path"]
+    if len(candidates) == 1:
+        return candidates[0]["path"]
+    return None
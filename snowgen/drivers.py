@@ -0,0 +1,171 @@
+import asyncio
+import importlib
+import os
+
+
+class DriverError(Exception):
+    """Error of a driver. Transient errors, such as dropped connections, are retried."""
+
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient
+
+
+class Driver:
+    """
+    Interface of the database drivers.
+
+    connect() opens a connection. A connection runs one statement at a time
+    with execute(), which returns the rows of the statement as dicts, and is
+    closed with close(). Connections are only used by one task at a time.
+    """
+
+    async def connect(self):
+        raise NotImplementedError
+
+    def is_transient(self, error):
+        """Check whether running a statement again may succeed after an error."""
+        return isinstance(error, DriverError) and error.transient
+
+
+class FakeConnection:
+    def __init__(self, driver):
+        self.driver = driver
+        self.closed = False
+
+    async def execute(self, statement):
+        return await self.driver.run(statement)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeDriver(Driver):
+    """
+    In-process stand-in for a warehouse that records every statement instead
+    of running it.
+
+    latency is added to every statement in seconds. failures maps statement
+    fragments to how many times a statement containing them fails with a
+    transient error before it succeeds, and respond is called with every
+    statement to return its rows.
+    """
+
+    def __init__(self, latency=0.0, failures=None, respond=None):
+        self.latency = float(latency)
+        self.failures = dict(failures or {})
+        self.respond = respond
+        self.executed = []
+        self.connections = 0
+        self.running = 0
+        self.max_running = 0
+
+    async def connect(self):
+        self.connections += 1
+        return FakeConnection(self)
+
+    async def run(self, statement):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            for fragment, count in self.failures.items():
+                if count > 0 and fragment in statement:
+                    self.failures[fragment] = count - 1
+                    raise DriverError(f"Injected failure of {statement!r}", True)
+            self.executed.append(statement)
+            return self.respond(statement) if self.respond else []
+        finally:
+            self.running -= 1
+
+
+class SnowflakeConnection:
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def execute(self, statement):
+        return await asyncio.to_thread(self._execute, statement)
+
+    def _execute(self, statement):
+        from snowflake.connector import DictCursor
+
+        with self.connection.cursor(DictCursor) as cursor:
+            cursor.execute(statement)
+            return cursor.fetchall() if cursor.description else []
+
+    async def close(self):
+        await asyncio.to_thread(self.connection.close)
+
+
+class SnowflakeDriver(Driver):
+    """
+    Driver running statements with snowflake-connector-python, each on a
+    worker thread so the event loop stays free. Options are passed on to
+    snowflake.connector.connect() and default to the SNOWFLAKE_<OPTION>
+    environment variables.
+    """
+
+    ENVIRONMENT_OPTIONS = (
+        "account",
+        "user",
+        "password",
+        "authenticator",
+        "private_key_file",
+        "role",
+        "warehouse",
+    )
+
+    def __init__(self, **options):
+        self.options = options
+
+    async def connect(self):
+        try:
+            import snowflake.connector
+        except ImportError:
+            raise DriverError(
+                "The snowflake driver needs snowflake-connector-python, "
+                "install it with `pip install snowgen[snowflake]`"
+            )
+
+        options = {
+            option: os.environ[f"SNOWFLAKE_{option.upper()}"]
+            for option in self.ENVIRONMENT_OPTIONS
+            if f"SNOWFLAKE_{option.upper()}" in os.environ
+        }
+        options.update(self.options)
+        try:
+            connection = await asyncio.to_thread(snowflake.connector.connect, **options)
+        except snowflake.connector.errors.OperationalError as e:
+            raise DriverError(str(e), transient=True) from e
+        return SnowflakeConnection(connection)
+
+    def is_transient(self, error):
+        if super().is_transient(error):
+            return True
+        try:
+            from snowflake.connector import errors
+        except ImportError:
+            return False
+        return isinstance(error, (errors.OperationalError, errors.InterfaceError))
+
+
+DRIVERS = {"fake": FakeDriver, "snowflake": SnowflakeDriver}
+
+
+def load_driver(name, options=None):
+    """
+    Create a driver by name, or from a module:attribute import path for
+    drivers outside snowgen, with the given options as keyword arguments.
+    """
+    if name in DRIVERS:
+        driver_class = DRIVERS[name]
+    elif ":" in name:
+        module_name, attribute = name.split(":", 1)
+        driver_class = getattr(importlib.import_module(module_name), attribute)
+    else:
+        raise ValueError(
+            f"Unknown driver {name}, choose from {', '.join(DRIVERS)} "
+            "or pass module:attribute"
+        )
+    return driver_class(**(options or {}))
@@ -0,0 +1,203 @@
+import ctypes
+import os
+import select
+import struct
+import sys
+import time
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_ISDIR = 0x40000000
+IN_IGNORED = 0x8000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+# Editors save in several steps, so changes are collected until the watched
+# folders are quiet for this long.
+DEBOUNCE_SECONDS = 0.02
+
+
+def _walk_directories(path):
+    for dirpath, dirnames, _ in os.walk(path):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        yield dirpath
+
+
+class InotifyWatcher:
+    """
+    Watch folders recursively with inotify. Folders created later are watched
+    as soon as they show up.
+    """
+
+    def __init__(self, paths):
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = {}
+        for path in paths:
+            for directory in _walk_directories(path):
+                self._add_watch(directory)
+
+    @classmethod
+    def is_supported(cls):
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            return hasattr(ctypes.CDLL(None), "inotify_init1")
+        except (OSError, TypeError):
+            return False
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), WATCH_MASK
+        )
+        if wd >= 0:
+            self._directories[wd] = directory
+
+    def _read_events(self):
+        changes = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changes
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            directory = self._directories.get(wd)
+            if mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    for subdirectory in _walk_directories(path):
+                        self._add_watch(subdirectory)
+                    for dirpath, _, filenames in os.walk(path):
+                        changes.update(os.path.join(dirpath, f) for f in filenames)
+                continue
+            changes.add(path)
+        return changes
+
+    def wait(self, timeout=None):
+        """
+        Block until files change and return the changed paths, or an empty set
+        when the timeout passes first.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changes = set()
+        while ready:
+            changes |= self._read_events()
+            ready, _, _ = select.select([self._fd], [], [], DEBOUNCE_SECONDS)
+        return changes
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """
+    Watch folders by polling. The stat signature of every file is cached and
+    a folder is only listed again when its own mtime changes, so a poll costs
+    one stat per file and folder.
+    """
+
+    def __init__(self, paths, interval=0.2):
+        self.interval = interval
+        self._directories = {}
+        self._files = {}
+        for path in paths:
+            self._scan_directory(path, initial=True)
+
+    def _scan_directory(self, directory, initial=False):
+        """List a folder and its new subfolders, returning the new files."""
+        changes = set()
+        try:
+            self._directories[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                entries = list(entries)
+        except OSError:
+            self._directories.pop(directory, None)
+            return changes
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                if entry.path not in self._directories:
+                    changes |= self._scan_directory(entry.path, initial)
+            elif entry.is_file() and entry.path not in self._files:
+                stat = entry.stat()
+                self._files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                if not initial:
+                    changes.add(entry.path)
+        return changes
+
+    def poll(self):
+        """Return the paths that changed since the last poll."""
+        changes = set()
+        for path, signature in list(self._files.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._files[path]
+                changes.add(path)
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != signature:
+                self._files[path] = (stat.st_mtime_ns, stat.st_size)
+                changes.add(path)
+        for directory, mtime_ns in list(self._directories.items()):
+            try:
+                changed = os.stat(directory).st_mtime_ns != mtime_ns
+            except OSError:
+                del self._directories[directory]
+                continue
+            if changed:
+                changes |= self._scan_directory(directory)
+        return changes
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changes = self.poll()
+            if changes:
+                return changes
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+def open_file_watcher(paths, poll_interval=None):
+    """
+    Watch folders with inotify where available, otherwise by polling. Polling
+    is forced by passing a poll interval.
+    """
+    if poll_interval is None and InotifyWatcher.is_supported():
+        return InotifyWatcher(paths)
+    return PollingWatcher(paths, interval=poll_interval or 0.2)
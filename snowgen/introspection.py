@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from snowgen.drivers import Driver
+from snowgen.profiler import profiler
+
+# Length of VARCHAR columns declared without a length.
+MAX_VARCHAR_LENGTH = 16777216
+
+TABLES_QUERY = """\
+SELECT CURRENT_TIMESTAMP()::VARCHAR AS SNAPSHOT_AT, TABLE_NAME, TABLE_TYPE,
+    COMMENT, LAST_ALTERED::VARCHAR AS LAST_ALTERED
+FROM {database}.INFORMATION_SCHEMA.TABLES
+WHERE TABLE_SCHEMA = {schema}"""
+
+COLUMNS_QUERY = """\
+SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.CHARACTER_MAXIMUM_LENGTH,
+    c.NUMERIC_PRECISION, c.NUMERIC_SCALE
+FROM {database}.INFORMATION_SCHEMA.COLUMNS c
+JOIN {database}.INFORMATION_SCHEMA.TABLES t
+    ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+WHERE c.TABLE_SCHEMA = {schema}{since}
+ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION"""
+
+STAGES_QUERY = """\
+SELECT STAGE_NAME, STAGE_TYPE, STAGE_URL, COMMENT,
+    LAST_ALTERED::VARCHAR AS LAST_ALTERED
+FROM {database}.INFORMATION_SCHEMA.STAGES
+WHERE STAGE_SCHEMA = {schema}"""
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _identifier(value):
+    return '"' + value.upper().replace('"', '""') + '"'
+
+
+def format_data_type(column):
+    """Turn a row of INFORMATION_SCHEMA.COLUMNS into the data type of a column."""
+    data_type = column["DATA_TYPE"]
+    if data_type == "TEXT":
+        length = column.get("CHARACTER_MAXIMUM_LENGTH")
+        if not length or int(length) == MAX_VARCHAR_LENGTH:
+            return "VARCHAR"
+        return f"VARCHAR({length})"
+    if data_type == "NUMBER" and column.get("NUMERIC_PRECISION") is not None:
+        return f"NUMBER({column['NUMERIC_PRECISION']},{column['NUMERIC_SCALE'] or 0})"
+    return data_type
+
+
+class MetadataSnapshot:
+    """
+    Local copy of the warehouse metadata of a schema: its tables with their
+    columns and data types, and its stages, as of the warehouse time the
+    snapshot was taken.
+
+    One snapshot file is kept per schema in the cache folder. Snapshots of an
+    older version are discarded, so the next refresh queries everything.
+    """
+
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, snapshot_file, database, schema):
+        self.snapshot_file = Path(snapshot_file)
+        self.database = database
+        self.schema = schema
+        self.taken_at = None
+        self.tables = {}
+        self.stages = {}
+
+    @classmethod
+    def for_schema(cls, database_repository, database, schema):
+        snapshot = cls(
+            database_repository.cache_path / "snapshots" / database / f"{schema}.json",
+            database,
+            schema,
+        )
+        snapshot.load()
+        return snapshot
+
+    def load(self):
+        try:
+            with open(self.snapshot_file, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return self
+        if data.get("version") == self.SNAPSHOT_VERSION:
+            self.taken_at = data.get("taken_at")
+            self.tables = data.get("tables", {})
+            self.stages = data.get("stages", {})
+        return self
+
+    def save(self):
+        self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.snapshot_file.with_name(
+            f"{self.snapshot_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_file, "w") as file:
+            json.dump(
+                {
+                    "version": self.SNAPSHOT_VERSION,
+                    "database": self.database,
+                    "schema": self.schema,
+                    "taken_at": self.taken_at,
+                    "tables": self.tables,
+                    "stages": self.stages,
+                },
+                file,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(tmp_file, self.snapshot_file)
+
+
+class SchemaIntrospector:
+    """
+    Refresh metadata snapshots from the INFORMATION_SCHEMA of the warehouse.
+
+    A schema takes three bulk queries, one each for its tables, columns and
+    stages, instead of a query per object. The tables and stages are always
+    listed, which is one row per object and catches dropped objects, while
+    the columns are only queried for tables altered since the snapshot was
+    taken.
+    """
+
+    def __init__(self, driver: Driver):
+        self.driver = driver
+
+    def refresh(self, snapshot, remote_database=None, remote_schema=None, full=False):
+        """
+        Bring a snapshot up to date and return the names of the tables whose
+        columns were queried. The snapshot is read from remote_database and
+        remote_schema, which default to its own database and schema.
+        """
+        return asyncio.run(
+            self.refresh_async(snapshot, remote_database, remote_schema, full)
+        )
+
+    async def refresh_async(
+        self, snapshot, remote_database=None, remote_schema=None, full=False
+    ):
+        database = _identifier(remote_database or snapshot.database)
+        schema = _literal((remote_schema or snapshot.schema).upper())
+        since = ""
+        if snapshot.taken_at and not full:
+            since = f"\n    AND t.LAST_ALTERED > {_literal(snapshot.taken_at)}"
+
+        connection = await self.driver.connect()
+        try:
+            tables = await self._query(
+                connection, TABLES_QUERY.format(database=database, schema=schema)
+            )
+            columns = await self._query(
+                connection,
+                COLUMNS_QUERY.format(database=database, schema=schema, since=since),
+            )
+            stages = await self._query(
+                connection, STAGES_QUERY.format(database=database, schema=schema)
+            )
+        finally:
+            await connection.close()
+
+        queried = {}
+        for column in columns:
+            queried.setdefault(column["TABLE_NAME"], {})[column["COLUMN_NAME"]] = (
+                format_data_type(column)
+            )
+
+        previous = snapshot.tables
+        snapshot.tables = {}
+        for table in tables:
+            name = table["TABLE_NAME"]
+            if name in queried:
+                table_columns = queried[name]
+            elif name in previous and not full:
+                table_columns = previous[name]["columns"]
+            else:
+                # Tables without any column, or altered as the query ran.
+                table_columns = {}
+            snapshot.tables[name] = {
+                "type": table["TABLE_TYPE"],
+                "comment": table.get("COMMENT"),
+                "last_altered": table.get("LAST_ALTERED"),
+                "columns": table_columns,
+            }
+        snapshot.stages = {
+            stage["STAGE_NAME"]: {
+                "type": stage.get("STAGE_TYPE"),
+                "url": stage.get("STAGE_URL"),
+                "comment": stage.get("COMMENT"),
+                "last_altered": stage.get("LAST_ALTERED"),
+            }
+            for stage in stages
+        }
+        if tables:
+            snapshot.taken_at = tables[0]["SNAPSHOT_AT"]
+        return sorted(set(queried) & set(snapshot.tables))
+
+    async def _query(self, connection, statement):
+        rows = await connection.execute(statement)
+        profiler.count("statements_executed")
+        profiler.count("introspection.rows", len(rows))
+        return rows
@@ -1,5 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor
+import copy
+from itertools import repeat
+import os
+from pathlib import Path, PurePosixPath
+import tempfile
+from snowgen.database_objects.column_validation import ColumnValidator
+from snowgen.database_objects.environment_template import environment_slot
 from snowgen.database_objects.snowflake_database_object import SnowflakeDatabaseObject
+from snowgen.database_objects.sql_template import TemplateError
 from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.database_repository.ddl_parser import (
+    parse_column_definitions,
+    parse_table_name,
+)
+from snowgen.object_writers.generation_manifest import (
+    GenerationManifest,
+    GenerationReport,
+    hash_columns,
+    hash_inputs,
+)
+from snowgen.object_writers.object_writer import ObjectWriter
+from snowgen.object_writers.schema_staging import SchemaStaging
+from snowgen.object_writers.stream_writer import (
+    NdjsonObjectWriter,
+    read_ndjson_records,
+    read_object_records,
+)
+from snowgen.profiler import profiler
+from snowgen.schema_drift import (
+    MIGRATIONS_FOLDER_NAME,
+    diff_columns,
+    next_migration_key,
+    render_migration,
+)
 
 
 def save_objects(
@@ -9,7 +42,41 @@ def save_objects(
     object_type: str,
     objects,
     replace,
+    writer: ObjectWriter = None,
 ):
+    if writer is None:
+        with ObjectWriter(database_repository) as writer:
+            return save_objects(
+                database_repository,
+                schema_config,
+                schema,
+                object_type,
+                objects,
+                replace,
+                writer,
+            )
+
+    manifest = writer.manifest
+    sql_templates = {}
+    render_phase = f"render.{object_type}"
+
+    # With environments, the placeholders the schema template overrides for
+    # some environment are rendered as slots, filled in per environment by
+    # the writer.
+    environments = writer.environments
+    if environments:
+        overrides = schema_config.get("environments") or {}
+        slots = {
+            key: environment_slot(key)
+            for environment in environments
+            for key in overrides.get(environment) or {}
+            if key != "env"
+        }
+        environment_values = {
+            environment: {"env": environment, **(overrides.get(environment) or {})}
+            for environment in environments
+        }
+
     for obj in objects:
         snowflake_object = SnowflakeDatabaseObject(
             role=schema_config["role"],
@@ -19,18 +86,178 @@ def save_objects(
             **obj,
         )
 
-        ddl = snowflake_object.get_ddl(
-            sql_template=database_repository.get_sql_template(
-                template_name=obj["template_name"]
-            ),
-            **obj,
+        key = snowflake_object.generate_object_path(Path("")).as_posix()
+
+        sql_template = sql_templates.get(obj["template_name"])
+        if sql_template is None:
+            sql_template = sql_templates[obj["template_name"]] = (
+                database_repository.get_compiled_sql_template(obj["template_name"])
+            )
+
+        if manifest is not None:
+            input_hash = hash_inputs(
+                template_hash=sql_template.source_hash,
+                role=schema_config["role"],
+                database=schema_config["database"],
+                schema=schema,
+                object_type=object_type,
+                env=snowflake_object.env,
+                object=obj,
+            )
+            if manifest.is_unchanged(key, input_hash):
+                profiler.count("cache_hits.manifest")
+                writer.skip()
+                continue
+
+        with profiler.phase(render_phase):
+            if environments:
+                ddl = snowflake_object.get_ddl(
+                    sql_template=sql_template, **{**obj, **slots}
+                )
+            else:
+                ddl = snowflake_object.get_ddl(sql_template=sql_template, **obj)
+        profiler.count(f"objects.{object_type}")
+
+        if environments:
+            replacements = {**snowflake_object.to_dict(), **obj}
+            writer.write(
+                ddl,
+                key,
+                replace=replace,
+                snowflake_object=snowflake_object,
+                environments=environment_values,
+                defaults={
+                    name: replacements[name]
+                    for name in slots
+                    if replacements.get(name) is not None
+                },
+            )
+        elif manifest is None:
+            writer.write(ddl, key, replace=replace, snowflake_object=snowflake_object)
+        else:
+            entry = {}
+            if object_type == "tables" and "columns" in obj:
+                entry["columns_hash"] = hash_columns(obj["columns"])
+            writer.write(
+                ddl,
+                key,
+                replace=replace,
+                snowflake_object=snowflake_object,
+                schema_template=schema_config.get("name"),
+                object_type=object_type,
+                template_name=obj["template_name"],
+                template_hash=sql_template.source_hash,
+                input_hash=input_hash,
+                **entry,
+            )
+
+
+SCHEMA_TEMPLATE_SECTIONS = {
+    "schema_definition": "schema_definition",
+    "file_formats": "file_formats",
+    "stages": "internal_stages",
+    "sequences": "sequences",
+    "tables": "tables",
+    "dynamic_tables": "dynamic_tables",
+    "procedures": "procedures",
+}
+
+SHARED_OBJECT_KEYS = {"database", "schema", "role", "object_type"}
+
+GENERATED_OBJECT_KEYS = {
+    "tables": {"columns", "object_name", "comment"},
+    "dynamic_tables": {
+        "columns",
+        "object_name",
+        "source_database",
+        "source_schema",
+        "source_object",
+    },
+}
+
+
+def validate_schema_template(database_repository: DatabaseRepository, schema_config):
+    """
+    Compile every SQL template a schema template uses and check that each
+    object provides all placeholders of its template, before anything is
+    generated.
+    """
+    errors = []
+    for section, object_type in SCHEMA_TEMPLATE_SECTIONS.items():
+        for obj in schema_config.get(section) or []:
+            try:
+                sql_template = database_repository.get_compiled_sql_template(
+                    obj["template_name"]
+                )
+            except (KeyError, OSError, ValueError) as e:
+                errors.append(f"{section}: {e}")
+                continue
+
+            keys = set(obj)
+            if obj.get("generate_columns_from_template") or obj.get(
+                "generate_columns_from_table"
+            ):
+                keys |= GENERATED_OBJECT_KEYS.get(object_type, set())
+            missing = sql_template.missing_keys(
+                SnowflakeDatabaseObject.get_replacement_keys(object_type, keys)
+            )
+            if missing:
+                errors.append(
+                    f"{section}: template {obj['template_name']} is missing "
+                    f"{', '.join(sorted(missing))}"
+                )
+
+    if errors:
+        raise TemplateError(
+            f"Schema template {schema_config.get('name')} is not valid:\n"
+            + "\n".join(errors)
         )
 
-        object_path = snowflake_object.generate_object_path(
-            database_repository.snowflake_objects_path
-        ).resolve()
 
-        database_repository.save_database_object(ddl, object_path, replace=replace)
+def hash_schema_section(schema_config, section):
+    """Hash a section of a schema template with the settings its objects share."""
+    return hash_inputs(
+        role=schema_config.get("role"),
+        database=schema_config.get("database"),
+        section=schema_config.get(section),
+    )
+
+
+def _record_generation(
+    manifest: GenerationManifest,
+    schema_config,
+    template_files,
+    delimiter=None,
+    source_database=None,
+    source_schema=None,
+    sections=None,
+):
+    """
+    Record the parameters a schema was generated with in its manifest. Only
+    the given sections, all of them by default, are marked as generated from
+    the current schema template.
+    """
+    if sections is None:
+        sections = list(SCHEMA_TEMPLATE_SECTIONS)
+
+    generation = manifest.generation
+    section_hashes = {}
+    if generation.get("schema_template") == schema_config.get("name"):
+        section_hashes = dict(generation.get("sections") or {})
+    for section in sections:
+        section_hashes[section] = hash_schema_section(schema_config, section)
+
+    if "tables" not in sections and "template_files" in generation:
+        template_files = generation["template_files"]
+
+    manifest.generation = {
+        "schema_template": schema_config.get("name"),
+        "delimiter": delimiter,
+        "source_database": source_database,
+        "source_schema": source_schema,
+        "sections": section_hashes,
+        "template_files": template_files,
+    }
 
 
 def create_schema_in(
@@ -38,18 +265,233 @@ def create_schema_in(
     schema: str,
     schema_template: str,
     replace=False,
+    delimiter=None,
+    source_database=None,
+    source_schema=None,
+    writers=8,
+    incremental=True,
+    writer=None,
 ):
+    """
+    Generate all objects of a schema from a schema template and return a
+    report of how many objects were created, updated, unchanged or stale.
+
+    With incremental generation, objects whose template and inputs did not
+    change since the last run are neither rendered nor written. When a writer
+    such as an NdjsonObjectWriter is given, objects are handed to it instead
+    of being written to the snowflake objects folder.
+    """
 
     schema_config = database_repository.get_schema_template(schema_template)
 
+    validate_schema_template(database_repository, schema_config)
+
+    if writer is not None:
+        _create_schema_objects(
+            database_repository,
+            schema_config,
+            schema,
+            replace,
+            writer,
+            delimiter=delimiter,
+            source_database=source_database,
+            source_schema=source_schema,
+        )
+        writer.flush()
+        return writer.report
+
+    manifest = None
+    if incremental:
+        manifest = GenerationManifest.for_schema(
+            database_repository, schema_config["database"], schema
+        )
+        template_files = database_repository.get_template_file_signatures(schema)
+
+    with ObjectWriter(
+        database_repository, workers=writers, manifest=manifest
+    ) as writer:
+        _create_schema_objects(
+            database_repository,
+            schema_config,
+            schema,
+            replace,
+            writer,
+            delimiter=delimiter,
+            source_database=source_database,
+            source_schema=source_schema,
+        )
+
+    report = writer.report
+    if manifest is not None:
+        report.stale_objects = manifest.stale()
+        report.add("stale", len(report.stale_objects))
+        _record_generation(
+            manifest,
+            schema_config,
+            template_files,
+            delimiter=delimiter,
+            source_database=source_database,
+            source_schema=source_schema,
+        )
+        manifest.save()
+
+    return report
+
+
+def regenerate_schema_in(
+    database_repository: DatabaseRepository,
+    schema: str,
+    schema_template: str,
+    delimiter=None,
+    source_database=None,
+    source_schema=None,
+    writers=8,
+):
+    """
+    Regenerate a schema from scratch. All objects are rendered into a staging
+    folder and the staged schema replaces the live one in a single swap, so
+    readers never see a partially written schema and an interrupted run
+    leaves the live schema untouched.
+    """
+
+    schema_config = database_repository.get_schema_template(schema_template)
+
+    validate_schema_template(database_repository, schema_config)
+
+    manifest = GenerationManifest.for_schema(
+        database_repository, schema_config["database"], schema
+    )
+    manifest.objects = {}
+    template_files = database_repository.get_template_file_signatures(schema)
+
+    with SchemaStaging(
+        database_repository.snowflake_objects_path, schema_config["database"], schema
+    ) as staging:
+        manifest.objects_path = staging.root
+
+        with ObjectWriter(
+            database_repository,
+            workers=writers,
+            manifest=manifest,
+            root=staging.root,
+            check_existing=False,
+        ) as writer:
+            writer.create_directories(
+                staging.schema_key / object_type
+                for section, object_type in SCHEMA_TEMPLATE_SECTIONS.items()
+                if schema_config.get(section)
+            )
+            _create_schema_objects(
+                database_repository,
+                schema_config,
+                schema,
+                True,
+                writer,
+                delimiter=delimiter,
+                source_database=source_database,
+                source_schema=source_schema,
+            )
+
+        # Migrations are written by migrate, not rendered from templates.
+        staging.carry_over(Path("tables") / MIGRATIONS_FOLDER_NAME)
+        staging.commit()
+
+    database_repository.get_catalog().remove_schema(
+        schema_config["database"], schema, keep=manifest.objects
+    )
+    manifest.objects_path = database_repository.snowflake_objects_path
+    _record_generation(
+        manifest,
+        schema_config,
+        template_files,
+        delimiter=delimiter,
+        source_database=source_database,
+        source_schema=source_schema,
+    )
+    manifest.save()
+
+    return writer.report
+
+
+class ChangeScope:
+    """
+    The inputs of a schema that changed since it was last generated: SQL
+    templates by name, template files by file name and source tables by
+    object name.
+    """
+
+    def __init__(self, templates=(), template_files=(), source_tables=()):
+        self.templates = set(templates)
+        self.template_files = set(template_files)
+        self.source_tables = set(source_tables)
+        self._changed = {}
+
+    def __bool__(self):
+        return bool(self.templates or self.template_files or self.source_tables)
+
+    def template_changed(self, database_repository, template_name):
+        """Check whether a template or a snippet it includes changed."""
+        changed = self._changed.get(template_name)
+        if changed is None:
+            changed = template_name in self.templates or any(
+                self.template_changed(database_repository, include)
+                for include in database_repository.get_compiled_sql_template(
+                    template_name
+                ).includes
+            )
+            self._changed[template_name] = changed
+        return changed
+
+
+def _with_settings(generated_objects, settings):
+    """
+    Add the settings of a schema template entry to the objects generated from
+    it, lazily. Values of the generated object win over the settings, and the
+    database, schema, role and object type are never taken from the entry.
+    """
+    for obj in generated_objects:
+        for key, value in settings.items():
+            if key not in obj and key not in SHARED_OBJECT_KEYS:
+                obj[key] = value
+        yield obj
+
+
+def _in_scope(database_repository, scope, objects):
+    if scope is None:
+        return objects
+    return [
+        obj
+        for obj in objects
+        if scope.template_changed(database_repository, obj["template_name"])
+    ]
+
+
+def _create_schema_objects(
+    database_repository: DatabaseRepository,
+    schema_config,
+    schema: str,
+    replace,
+    writer: ObjectWriter,
+    delimiter=None,
+    source_database=None,
+    source_schema=None,
+    scope=None,
+):
+    """
+    Render the objects of a schema. With a change scope, only the objects
+    depending on a changed template, template file or source table are
+    rendered.
+    """
+
     if "schema_definition" in schema_config:
         save_objects(
             database_repository,
             schema_config,
             schema,
             "schema_definition",
-            schema_config["schema_definition"],
+            _in_scope(database_repository, scope, schema_config["schema_definition"]),
             replace,
+            writer,
         )
 
     if "file_formats" in schema_config:
@@ -58,8 +500,9 @@ def create_schema_in(
             schema_config,
             schema,
             "file_formats",
-            schema_config["file_formats"],
+            _in_scope(database_repository, scope, schema_config["file_formats"]),
             replace,
+            writer,
         )
 
     if "stages" in schema_config:
@@ -68,8 +511,9 @@ def create_schema_in(
             schema_config,
             schema,
             "internal_stages",
-            schema_config["stages"],
+            _in_scope(database_repository, scope, schema_config["stages"]),
             replace,
+            writer,
         )
 
     if "sequences" in schema_config:
@@ -78,35 +522,39 @@ def create_schema_in(
             schema_config,
             schema,
             "sequences",
-            schema_config["sequences"],
+            _in_scope(database_repository, scope, schema_config["sequences"]),
             replace,
+            writer,
         )
 
     if "tables" in schema_config.keys():
 
         for object in schema_config["tables"]:
 
-            tables_to_generate = []
-
             if object["generate_columns_from_template"]:
 
-                tables_to_generate = (
-                    database_repository.get_table_columns_from_template_files(
-                        template_files_name=schema,
-                    )
-                )
-
-                for t in tables_to_generate:
+                file_names = None
+                if scope is not None and not scope.template_changed(
+                    database_repository, object["template_name"]
+                ):
+                    file_names = scope.template_files
+                    if not file_names:
+                        continue
 
-                    for key in object.keys():
-                        if key not in [
-                            t.keys(),
-                            "database",
-                            "schema",
-                            "role",
-                            "object_type",
-                        ]:
-                            t[key] = object[key]
+                validator = ColumnValidator(
+                    rename=object.get("rename_invalid_columns", False)
+                )
+                tables_to_generate = _with_settings(
+                    validator.validate(
+                        database_repository.iter_table_columns_from_template_files(
+                            template_files_name=schema,
+                            delimiter=delimiter,
+                            infer_types=object.get("infer_column_types"),
+                            file_names=file_names,
+                        )
+                    ),
+                    object,
+                )
 
                 save_objects(
                     database_repository,
@@ -115,44 +563,56 @@ def create_schema_in(
                     "tables",
                     tables_to_generate,
                     replace,
+                    writer,
                 )
+                writer.report.add_column_diagnostics(validator.diagnostics)
             else:
                 save_objects(
                     database_repository,
                     schema_config,
                     schema,
                     "tables",
-                    [object],
+                    _in_scope(database_repository, scope, [object]),
                     replace,
+                    writer,
                 )
 
     if "dynamic_tables" in schema_config.keys():
+        # Dynamic tables are derived from table files, which may have been
+        # queued by this run.
+        writer.flush()
         for object in schema_config["dynamic_tables"]:
             if object["generate_columns_from_table"]:
 
+                source_tables = None
+                if scope is not None and not scope.template_changed(
+                    database_repository, object["template_name"]
+                ):
+                    source_tables = scope.source_tables
+                    if not source_tables:
+                        continue
+
                 dynamic_tables_to_generate = (
-                    database_repository.get_dynamic_table_transformations_from_table()
+                    database_repository.iter_dynamic_table_transformations_from_table(
+                        source_database=source_database,
+                        source_schema=source_schema,
+                    )
                 )
-
-                for t in dynamic_tables_to_generate:
-
-                    for key in object.keys():
-                        if key not in [
-                            t.keys(),
-                            "database",
-                            "schema",
-                            "role",
-                            "object_type",
-                        ]:
-                            t[key] = object[key]
+                if source_tables is not None:
+                    dynamic_tables_to_generate = (
+                        t
+                        for t in dynamic_tables_to_generate
+                        if t["object_name"] in source_tables
+                    )
 
                 save_objects(
                     database_repository,
                     schema_config,
                     schema,
                     "dynamic_tables",
-                    dynamic_tables_to_generate,
+                    _with_settings(dynamic_tables_to_generate, object),
                     replace,
+                    writer,
                 )
             else:
                 save_objects(
@@ -160,20 +620,691 @@ def create_schema_in(
                     schema_config,
                     schema,
                     "dynamic_tables",
-                    [object],
+                    _in_scope(database_repository, scope, [object]),
                     replace,
+                    writer,
                 )
 
     if "procedures" in schema_config.keys():
-        for object in schema_config["procedures"]:
+        save_objects(
+            database_repository,
+            schema_config,
+            schema,
+            "procedures",
+            _in_scope(database_repository, scope, schema_config["procedures"]),
+            replace,
+            writer,
+        )
+
+
+def read_batch_manifest(database_repository: DatabaseRepository, manifest_path):
+    """
+    Read a batch manifest, a YAML file with a `schemas` list of entries with the
+    keys schema, template and optionally delimiter, source_database,
+    source_schema and replace.
+    """
+    manifest = database_repository.load_yaml_file(manifest_path) or {}
+    if isinstance(manifest, dict):
+        manifest = manifest.get("schemas") or []
+    if not isinstance(manifest, list):
+        raise ValueError("Batch manifest should contain a list of schemas")
+    return manifest
+
+
+def validate_batch_entry(database_repository: DatabaseRepository, entry):
+    """
+    Return why a batch entry cannot be generated, or None when it can. Batch
+    runs never prompt, so a schema template with dynamic tables generated
+    from tables needs the source_database and source_schema in the entry.
+    """
+    if not isinstance(entry, dict):
+        return "Batch entries should be mappings"
+    if not entry.get("schema") or not entry.get("template"):
+        return "Batch entries need both a schema and a template"
+    schema_config = database_repository.get_schema_template(entry["template"])
+    if schema_config is None:
+        return f"Unknown schema template {entry['template']}"
+    if any(
+        obj.get("generate_columns_from_table")
+        for obj in schema_config.get("dynamic_tables") or []
+    ) and not (entry.get("source_database") and entry.get("source_schema")):
+        return (
+            f"Schema template {entry['template']} generates dynamic tables from "
+            "tables, the entry needs a source_database and a source_schema"
+        )
+    return None
+
+
+def _failed_batch_entry(entry, error):
+    if not isinstance(entry, dict):
+        entry = {}
+    return {
+        "schema": entry.get("schema"),
+        "template": entry.get("template"),
+        "error": error,
+    }
+
+
+def _generate_batch_entry(
+    snowflake_path, entry, replace, spool_path=None, profile=False, environments=None
+):
+    schema = entry.get("schema")
+    if profile:
+        # Runs in a worker process, whose profile is merged by the parent.
+        profiler.enable()
+    try:
+        database_repository = DatabaseRepository(snowflake_path=snowflake_path)
+        error = validate_batch_entry(database_repository, entry)
+        if error:
+            raise ValueError(error)
+
+        writer = None
+        if spool_path is not None:
+            writer = NdjsonObjectWriter(
+                open(spool_path, "w", encoding="utf-8"),
+                close_stream=True,
+                environments=environments,
+            )
+
+        try:
+            report = create_schema_in(
+                database_repository,
+                schema,
+                entry["template"],
+                replace=entry.get("replace", replace),
+                delimiter=entry.get("delimiter"),
+                source_database=entry.get("source_database"),
+                source_schema=entry.get("source_schema"),
+                writer=writer,
+            )
+        finally:
+            if writer is not None:
+                writer.close()
+    except Exception as e:
+        result = _failed_batch_entry(entry, str(e))
+    else:
+        result = {
+            "schema": schema,
+            "template": entry.get("template"),
+            "error": None,
+            "report": str(report),
+        }
+    if profile:
+        result["profile"] = profiler.snapshot()
+    return result
+
+
+def _batch_waves(database_repository: DatabaseRepository, entries, indexes):
+    """
+    Order valid batch entries into waves. An entry that reads its source tables
+    from a schema generated by another entry runs in a later wave than that
+    entry.
+    """
+    produced = {}
+    for i in indexes:
+        schema_config = database_repository.get_schema_template(entries[i]["template"])
+        produced[(schema_config["database"], entries[i]["schema"])] = i
+
+    waves = {}
+    for i in indexes:
+        wave, source = 0, i
+        seen = {i}
+        while True:
+            entry = entries[source]
+            source = produced.get(
+                (entry.get("source_database"), entry.get("source_schema"))
+            )
+            if source is None or source in seen:
+                break
+            seen.add(source)
+            wave += 1
+        waves[i] = wave
+
+    return [
+        [i for i in indexes if waves[i] == wave]
+        for wave in range(max(waves.values(), default=-1) + 1)
+    ]
+
+
+def create_schemas_in(
+    database_repository: DatabaseRepository,
+    entries,
+    replace=False,
+    jobs=None,
+    writer=None,
+):
+    """
+    Generate every schema in a batch without prompting. Schemas are generated
+    on a process pool and the results are returned in the order of the entries.
+
+    When a writer is given, each schema is spooled to a temporary NDJSON file
+    and the spooled objects are handed to the writer in the order of the
+    entries, so the output does not depend on the order schemas finish in.
+    Writers with environments get the objects rendered with environment slots.
+    """
+    environments = getattr(writer, "environments", None)
+    seen = set()
+    results = [None] * len(entries)
+    pending = []
+
+    # Warm the per-process caches so forked workers inherit them.
+    database_repository.get_template_index()
+    database_repository.get_schema_templates_yaml()
+
+    # Invalid entries fail before any schema is planned or generated. Entries
+    # writing the same schema of a database would write over each other, even
+    # with different schema templates, so only the first of them runs.
+    for i, entry in enumerate(entries):
+        error = validate_batch_entry(database_repository, entry)
+        if error is None:
+            schema_config = database_repository.get_schema_template(entry["template"])
+            key = (schema_config["database"], entry["schema"])
+            if key in seen:
+                error = "Duplicate batch entry"
+            seen.add(key)
+        if error:
+            results[i] = _failed_batch_entry(entry, error)
+        else:
+            pending.append(i)
+
+    waves = _batch_waves(database_repository, entries, pending)
+
+    with tempfile.TemporaryDirectory(prefix="snowgen-") as spool_folder:
+        spool_paths = {
+            i: (Path(spool_folder) / f"{i}.ndjson" if writer is not None else None)
+            for i in pending
+        }
+
+        if jobs == 1 or len(pending) <= 1:
+            for wave in waves:
+                for i in wave:
+                    results[i] = _generate_batch_entry(
+                        database_repository.snowflake_path,
+                        entries[i],
+                        replace,
+                        spool_paths[i],
+                        environments=environments,
+                    )
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                for wave in waves:
+                    batch_results = executor.map(
+                        _generate_batch_entry,
+                        repeat(database_repository.snowflake_path),
+                        [entries[i] for i in wave],
+                        repeat(replace),
+                        [spool_paths[i] for i in wave],
+                        repeat(profiler.enabled),
+                        repeat(environments),
+                    )
+                    for i, result in zip(wave, batch_results):
+                        profiler.merge(result.pop("profile", None))
+                        results[i] = result
+
+        if writer is not None:
+            for i in pending:
+                if results[i]["error"] is None:
+                    with open(spool_paths[i], "r", encoding="utf-8") as file:
+                        for record in read_ndjson_records(file):
+                            writer.write_record(record)
+
+    return results
+
+
+def update_schema_in(
+    database_repository: DatabaseRepository,
+    schema_config,
+    entry,
+    scope,
+    manifest: GenerationManifest,
+    object_types=None,
+):
+    """
+    Render the objects of a schema in a change scope, replacing existing
+    files, and record the generation in the schema manifest. object_types
+    restricts the update to objects of those types. Returns the report and
+    the keys of the objects that were created or updated.
+    """
+    sections = [
+        section
+        for section, object_type in SCHEMA_TEMPLATE_SECTIONS.items()
+        if object_types is None or object_type in object_types
+    ]
+    if object_types is not None:
+        schema_config = {
+            key: value
+            for key, value in schema_config.items()
+            if key not in SCHEMA_TEMPLATE_SECTIONS or key in sections
+        }
+    template_files = database_repository.get_template_file_signatures(entry["schema"])
+
+    changed_keys = set()
+    with ObjectWriter(
+        database_repository, manifest=manifest, changed_keys=changed_keys
+    ) as writer:
+        _create_schema_objects(
+            database_repository,
+            schema_config,
+            entry["schema"],
+            True,
+            writer,
+            delimiter=entry.get("delimiter"),
+            source_database=entry.get("source_database"),
+            source_schema=entry.get("source_schema"),
+            scope=scope,
+        )
+
+    _record_generation(
+        manifest,
+        schema_config,
+        template_files,
+        delimiter=entry.get("delimiter"),
+        source_database=entry.get("source_database"),
+        source_schema=entry.get("source_schema"),
+        sections=sections,
+    )
+    manifest.save()
+    return writer.report, changed_keys
+
+
+def update_objects(
+    database_repository: DatabaseRepository, graph, impacted, object_types=None
+):
+    """
+    Render the objects in an impact set of a dependency graph, schema by
+    schema in dependency order, and return a report. Every schema only
+    renders the objects depending on the templates, template files and
+    source tables that caused its objects to be affected.
+    """
+    scopes = {}
+    for key, node in impacted.items():
+        database, schema, _ = graph.objects[key]
+        scope = scopes.setdefault((database, schema), ChangeScope())
+        if node[0] == "sql_template":
+            scope.templates.add(node[1])
+        elif node[0] == "schema_template":
+            schema_config = graph.schemas[(database, schema)]["config"]
+            scope.templates.update(
+                obj["template_name"] for obj in schema_config.get(node[3]) or []
+            )
+        elif node[0] == "template_file":
+            scope.template_files.add(node[2])
+        elif node[0] == "object":
+            scope.source_tables.add(PurePosixPath(node[1]).stem)
+
+    schemas = list(scopes)
+    entries = [graph.schemas[schema]["entry"] for schema in schemas]
+    for schema in schemas:
+        validate_schema_template(
+            database_repository, graph.schemas[schema]["config"]
+        )
+
+    report = GenerationReport()
+    for wave in _batch_waves(database_repository, entries, range(len(entries))):
+        for i in wave:
+            info = graph.schemas[schemas[i]]
+            schema_report, _ = update_schema_in(
+                database_repository,
+                info["config"],
+                info["entry"],
+                scopes[schemas[i]],
+                info["manifest"],
+                object_types=object_types,
+            )
+            for status, count in schema_report.counts.items():
+                report.add(status, count)
+    return report
+
+
+def migrate_schema_in(
+    database_repository: DatabaseRepository,
+    schema: str,
+    schema_template: str,
+    delimiter=None,
+):
+    """
+    Bring the tables generated from the template files of a schema in line
+    with files that gained, lost or renamed columns, writing ALTER TABLE
+    migrations instead of replacing the tables.
+
+    Only template files whose stat signature changed since the last
+    generation are read, and only tables whose column-set hash differs from
+    the one in the manifest are compared with their table file. For each of
+    those a numbered migration is written next to the table, and the table
+    file is rendered again with the new columns. Returns the report and the
+    keys of the migrations written.
+    """
+    schema_config = database_repository.get_schema_template(schema_template)
+    manifest = GenerationManifest.for_schema(
+        database_repository, schema_config["database"], schema
+    )
+    template_files = database_repository.get_template_file_signatures(schema)
+    recorded_files = manifest.generation.get("template_files") or {}
+    changed_files = {
+        name
+        for name, signature in template_files.items()
+        if recorded_files.get(name) != signature
+    }
+
+    migrations = []
+    objects_path = database_repository.snowflake_objects_path
+    with ObjectWriter(database_repository, manifest=manifest) as writer:
+        for table_config in schema_config.get("tables") or []:
+            if not changed_files or not table_config.get(
+                "generate_columns_from_template"
+            ):
+                continue
+
+            validator = ColumnValidator(
+                rename=table_config.get("rename_invalid_columns", False)
+            )
+            tables = _with_settings(
+                validator.validate(
+                    database_repository.iter_table_columns_from_template_files(
+                        template_files_name=schema,
+                        delimiter=delimiter,
+                        infer_types=table_config.get("infer_column_types"),
+                        file_names=changed_files,
+                    )
+                ),
+                table_config,
+            )
+
+            drifted = []
+            for table in tables:
+                snowflake_object = SnowflakeDatabaseObject(
+                    role=schema_config["role"],
+                    database=schema_config["database"],
+                    schema=schema,
+                    object_type="tables",
+                    **table,
+                )
+                key = snowflake_object.generate_object_path("").as_posix()
+                columns_hash = hash_columns(table["columns"])
+                recorded = manifest.objects.get(key) or {}
+                if recorded.get("columns_hash") == columns_hash:
+                    writer.skip()
+                    continue
+
+                drifted.append(table)
+                try:
+                    with open(objects_path / key, "r") as file:
+                        table_definition = file.read()
+                except FileNotFoundError:
+                    continue
+                existing = parse_column_definitions(table_definition)
+                if hash_columns(existing) == columns_hash:
+                    continue
+
+                # The migration alters the table the table file creates, which
+                # is in the database of the environment unless the file says.
+                database, target_schema, name = parse_table_name(table_definition)
+                if database is None:
+                    database = (
+                        f"{schema_config['database']}_{SnowflakeDatabaseObject.env}"
+                    )
+                migration = render_migration(
+                    ".".join(
+                        [
+                            database,
+                            target_schema or schema,
+                            name or snowflake_object.name,
+                        ]
+                    ),
+                    diff_columns(existing, table["columns"]),
+                    role=schema_config["role"],
+                    comment=table["comment"],
+                )
+                migration_key = next_migration_key(objects_path, key)
+                database_repository.save_database_object(
+                    migration, objects_path / migration_key
+                )
+                migrations.append(migration_key)
+
             save_objects(
                 database_repository,
                 schema_config,
                 schema,
-                "procedures",
-                schema_config["procedures"],
-                replace,
+                "tables",
+                drifted,
+                True,
+                writer,
+            )
+            writer.report.add_column_diagnostics(validator.diagnostics)
+
+    if manifest.generation:
+        manifest.generation["template_files"] = template_files
+    manifest.save()
+    return writer.report, migrations
+
+
+class SchemaWatch:
+    """
+    Keep the schemas of a batch manifest in sync with their inputs.
+
+    Templates, schema templates and generation manifests stay in memory
+    between rounds. Each change is mapped to the objects depending on it: a
+    SQL template to the objects rendered from it, a template file to its
+    table and a changed table to the dynamic tables derived from it. Only
+    those objects are rendered again, and existing files are replaced.
+    """
+
+    def __init__(self, database_repository: DatabaseRepository, entries):
+        self.database_repository = database_repository
+        self.entries = entries
+        self.configs = {}
+        self.manifests = {}
+
+        for i, entry in enumerate(entries):
+            error = validate_batch_entry(database_repository, entry)
+            if error:
+                raise ValueError(f"Batch entry {i + 1}: {error}")
+            schema_config = database_repository.get_schema_template(entry["template"])
+            validate_schema_template(database_repository, schema_config)
+            self.configs[i] = copy.deepcopy(schema_config)
+
+        self.waves = _batch_waves(database_repository, entries, list(self.configs))
+
+    def _schema_templates_file(self):
+        return os.path.abspath(
+            self.database_repository.base_path
+            / "templates"
+            / "schema_templates"
+            / "schemas.yaml"
+        )
+
+    def watched_paths(self):
+        template_index = self.database_repository.get_template_index()
+        folders = [
+            os.path.dirname(self._schema_templates_file()),
+            template_index.get_folder("sql_templates"),
+            template_index.get_folder("template_files"),
+        ]
+        return [os.path.abspath(f) for f in folders if f and os.path.isdir(f)]
+
+    def generate_all(self):
+        """Bring every schema up to date, rendering only objects with new inputs."""
+        return self.generate({i: None for i in self.configs})
+
+    def scopes_for(self, paths):
+        """
+        Map changed paths to the change scope of every affected schema. A
+        schema whose schema template changed gets None, it is generated in
+        full.
+        """
+        template_index = self.database_repository.get_template_index()
+        templates_folder = template_index.get_folder("sql_templates")
+        files_folder = template_index.get_folder("template_files")
+
+        scopes = {}
+        templates = set()
+        template_files = {}
+        for path in map(os.path.abspath, paths):
+            if path == self._schema_templates_file():
+                for i, entry in enumerate(self.entries):
+                    schema_config = self.database_repository.get_schema_template(
+                        entry["template"]
+                    )
+                    if schema_config != self.configs[i]:
+                        validate_schema_template(
+                            self.database_repository, schema_config
+                        )
+                        self.configs[i] = copy.deepcopy(schema_config)
+                        scopes[i] = None
+                self.waves = _batch_waves(
+                    self.database_repository, self.entries, list(self.configs)
+                )
+            elif templates_folder and _is_relative_to(path, templates_folder):
+                templates.add(Path(os.path.relpath(path, templates_folder)).as_posix())
+            elif files_folder and _is_relative_to(path, files_folder):
+                parts = Path(os.path.relpath(path, files_folder)).parts
+                if len(parts) == 2:
+                    template_files.setdefault(parts[0], set()).add(parts[1])
+
+        for i, entry in enumerate(self.entries):
+            if i in scopes:
+                continue
+            scope = ChangeScope(
+                templates=templates,
+                template_files=template_files.get(entry["schema"], ()),
             )
+            if scope:
+                scopes[i] = scope
+        return scopes
+
+    def generate(self, scopes):
+        """
+        Render the objects in the change scope of each schema, in dependency
+        order, and return a report and the number of schemas touched. Tables
+        that changed extend the scope of the schemas derived from them.
+        """
+        report = GenerationReport()
+        changed_tables = {}
+        touched = 0
+
+        for wave in self.waves:
+            for i in wave:
+                entry = self.entries[i]
+                schema_config = self.configs[i]
+                upstream = changed_tables.get(
+                    (entry.get("source_database"), entry.get("source_schema"))
+                )
+
+                if i in scopes and scopes[i] is None:
+                    scope = None
+                else:
+                    scope = scopes.get(i) or ChangeScope()
+                    scope.source_tables |= upstream or set()
+                    if not scope:
+                        continue
+
+                schema_report, changed_keys = update_schema_in(
+                    self.database_repository,
+                    schema_config,
+                    entry,
+                    scope,
+                    self._manifest(schema_config["database"], entry["schema"]),
+                )
+                if any(schema_report.counts.values()):
+                    touched += 1
+
+                for status, count in schema_report.counts.items():
+                    report.add(status, count)
+                tables = {
+                    PurePosixPath(key).stem
+                    for key in changed_keys
+                    if PurePosixPath(key).parts[4] == "tables"
+                }
+                if tables:
+                    changed_tables.setdefault(
+                        (schema_config["database"], entry["schema"]), set()
+                    ).update(tables)
+
+        return report, touched
+
+    def _manifest(self, database, schema):
+        manifest = self.manifests.get((database, schema))
+        if manifest is None:
+            manifest = self.manifests[(database, schema)] = (
+                GenerationManifest.for_schema(self.database_repository, database, schema)
+            )
+        return manifest
+
+
+def _is_relative_to(path, folder):
+    folder = os.path.abspath(folder)
+    return path.startswith(folder + os.sep)
+
+
+def materialize_objects(database_repository: DatabaseRepository, source, replace=False):
+    """
+    Write the objects of an NDJSON stream, a tar or a zip archive into the
+    snowflake objects folder in one pass.
+    """
+    with ObjectWriter(database_repository) as writer:
+        for key, ddl in read_object_records(source):
+            writer.write(ddl, key, replace=replace)
+    return writer.report
+
+
+def regenerate_tables_from_snapshot(
+    database_repository: DatabaseRepository, schema_config, snapshot, table_names=None
+):
+    """
+    Write the tables of a metadata snapshot with the columns and data types
+    found in the warehouse. Tables are rendered like the tables generated
+    from template files, with the first such entry of the schema template,
+    under their warehouse names, and are recorded in the schema's manifest.
+    table_names restricts the files written to those tables.
+    """
+    table_config = next(
+        (
+            obj
+            for obj in schema_config.get("tables") or []
+            if obj.get("generate_columns_from_template")
+        ),
+        None,
+    )
+    if table_config is None:
+        raise ValueError(
+            f"Schema template {schema_config.get('name')} does not generate tables"
+        )
+
+    tables = (
+        {
+            "columns": dict(table["columns"]),
+            "object_name": name,
+            "comment": table["comment"]
+            or f"SQL generated from the warehouse metadata of {snapshot.schema}",
+        }
+        for name, table in sorted(snapshot.tables.items())
+        if table["type"] == "BASE TABLE"
+        and table["columns"]
+        and (table_names is None or name in table_names)
+    )
+
+    # Warehouse table names already carry the prefix and suffix of the entry.
+    settings = {
+        key: value
+        for key, value in table_config.items()
+        if key not in ("prefix", "suffix")
+    }
+    manifest = GenerationManifest.for_schema(
+        database_repository, schema_config["database"], snapshot.schema
+    )
+
+    with ObjectWriter(database_repository, manifest=manifest) as writer:
+        save_objects(
+            database_repository,
+            schema_config,
+            snapshot.schema,
+            "tables",
+            _with_settings(tables, settings),
+            True,
+            writer,
+        )
+    manifest.save()
+    return writer.report
 
 
 def init(database_repository: DatabaseRepository):
@@ -0,0 +1,93 @@
+from snowgen.database_objects.environment_template import EnvironmentTemplate
+from snowgen.object_writers.generation_manifest import GenerationReport
+
+
+class EnvironmentObjectWriter:
+    """
+    Write every rendered object once per environment.
+
+    Objects are rendered once with environment slots, and each is split into
+    an EnvironmentTemplate whose slots are filled in for every environment
+    and handed to the writer of that environment. The primary writer, when
+    given, receives the objects as they are generated without environments,
+    with `{env}` left in place.
+    """
+
+    manifest = None
+
+    def __init__(self, writers, primary=None, replace=False):
+        self.writers = writers
+        self.environments = list(writers)
+        self.primary = primary
+        self.replace = replace
+        self._report = GenerationReport()
+
+    @property
+    def report(self):
+        return self.primary.report if self.primary is not None else self._report
+
+    def skip(self):
+        self.report.add("unchanged")
+
+    def write(
+        self,
+        ddl,
+        key,
+        replace=False,
+        snowflake_object=None,
+        environments=None,
+        defaults=None,
+        **entry,
+    ):
+        template = EnvironmentTemplate(ddl)
+        defaults = defaults or {}
+        environments = environments or {}
+        for environment, writer in self.writers.items():
+            values = environments.get(environment) or {"env": environment}
+            if defaults:
+                values = {**defaults, **values}
+            writer.write(template.render(values), key, replace=replace)
+
+        if self.primary is not None:
+            self.primary.write(
+                template.render({**defaults, "env": "{env}"}),
+                key,
+                replace=replace,
+                snowflake_object=snowflake_object,
+            )
+        else:
+            self._report.add("created")
+
+    def write_record(self, record):
+        self.write(
+            record["ddl"],
+            record["path"],
+            replace=self.replace,
+            environments=record.get("environments"),
+            defaults=record.get("defaults"),
+        )
+
+    def flush(self):
+        if self.primary is not None:
+            self.primary.flush()
+        for writer in self.writers.values():
+            writer.flush()
+
+    def close(self):
+        writers = list(self.writers.values())
+        if self.primary is not None:
+            writers.append(self.primary)
+        error = None
+        for writer in writers:
+            try:
+                writer.close()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
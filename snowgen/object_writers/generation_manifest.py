@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_inputs(**inputs):
+    """Hash the inputs of a render, independent of dict ordering."""
+    return hash_text(json.dumps(inputs, sort_keys=True, default=str))
+
+
+def column_types(columns):
+    """Return table columns as {column: data_type}, with VARCHAR for lists."""
+    if isinstance(columns, dict):
+        return columns
+    return dict.fromkeys(columns, "VARCHAR")
+
+
+def hash_columns(columns):
+    """Hash the columns of a table with their data types, in column order."""
+    return hash_text(json.dumps(list(column_types(columns).items())))
+
+
+class GenerationReport:
+    """Counts of what happened to the objects of a generation run."""
+
+    STATUSES = ("created", "updated", "unchanged", "skipped", "stale")
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.STATUSES, 0)
+        self.stale_objects = []
+        self.column_diagnostics = []
+        self._lock = threading.Lock()
+
+    def add(self, status, count=1):
+        with self._lock:
+            self.counts[status] += count
+
+    def add_column_diagnostics(self, diagnostics):
+        with self._lock:
+            self.column_diagnostics.extend(diagnostics)
+
+    def __str__(self):
+        text = ", ".join(f"{self.counts[status]} {status}" for status in self.STATUSES)
+        if self.column_diagnostics:
+            text += f", {len(self.column_diagnostics)} column issues"
+        return text
+
+
+class GenerationManifest:
+    """
+    Record of the inputs and outputs of every object generated in a schema.
+
+    Each entry is keyed by the object path relative to the snowflake objects
+    folder and stores hashes of the template, the render inputs and the
+    output, together with the stat signature of the written file. One
+    manifest file is kept per schema so parallel runs never share a file.
+
+    The generation record holds the parameters the schema was generated with:
+    its schema template, delimiter and source schema, a hash of each schema
+    template section and the stat signatures of the template files read.
+    """
+
+    MANIFEST_VERSION = 1
+
+    def __init__(self, manifest_file, objects_path):
+        self.manifest_file = Path(manifest_file)
+        self.objects_path = Path(objects_path)
+        self.objects = {}
+        self.generation = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_schema(cls, database_repository, database, schema):
+        manifest = cls(
+            database_repository.cache_path / "manifests" / database / f"{schema}.json",
+            database_repository.snowflake_objects_path,
+        )
+        manifest.load()
+        return manifest
+
+    def load(self):
+        try:
+            with open(self.manifest_file, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return self
+        if data.get("version") == self.MANIFEST_VERSION:
+            self.objects = data.get("objects", {})
+            self.generation = data.get("generation", {})
+        return self
+
+    def save(self):
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_name(
+            f"{self.manifest_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_file, "w") as file:
+            json.dump(
+                {
+                    "version": self.MANIFEST_VERSION,
+                    "generation": self.generation,
+                    "objects": self.objects,
+                },
+                file,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(tmp_file, self.manifest_file)
+
+    def is_unchanged(self, key, input_hash):
+        """
+        Check whether an object was generated from the same inputs and its file
+        has not been touched since.
+        """
+        with self._lock:
+            self._seen.add(key)
+            entry = self.objects.get(key)
+        if entry is None or entry["input_hash"] != input_hash:
+            return False
+        try:
+            stat = os.stat(self.objects_path / key)
+        except OSError:
+            return False
+        return stat.st_mtime_ns == entry["mtime_ns"] and stat.st_size == entry["size"]
+
+    def record(self, key, object_path, output_hash, **entry):
+        stat = os.stat(object_path)
+        entry.update(
+            output_hash=output_hash, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+        )
+        with self._lock:
+            self._seen.add(key)
+            self.objects[key] = entry
+
+    def stale(self):
+        """
+        Return the objects that were generated before but not by this run and
+        forget the ones whose files no longer exist.
+        """
+        stale = []
+        for key in sorted(set(self.objects) - self._seen):
+            if (self.objects_path / key).exists():
+                stale.append(key)
+            else:
+                del self.objects[key]
+        return stale
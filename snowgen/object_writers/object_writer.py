@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+import threading
+from snowgen.object_writers.generation_manifest import GenerationReport, hash_text
+
+
+class ObjectWriter:
+    """
+    Write rendered database objects on a bounded pool of writer threads.
+
+    Rendering stays in the calling thread while files are written in the
+    background. At most `max_pending` objects are queued at any time, so
+    memory stays bounded no matter how many objects a schema holds.
+
+    Objects are identified by their path relative to root, which defaults to
+    the snowflake objects folder. When a generation manifest is given, every
+    written object is recorded in it, and the outcome of each object is
+    counted in the report. Keys of objects whose file was created or changed
+    are added to changed_keys when it is given.
+    """
+
+    environments = None
+
+    def __init__(
+        self,
+        database_repository,
+        workers=8,
+        max_pending=256,
+        manifest=None,
+        root=None,
+        check_existing=True,
+        changed_keys=None,
+    ):
+        self.database_repository = database_repository
+        self.root = Path(
+            root if root is not None else database_repository.snowflake_objects_path
+        )
+        self.manifest = manifest
+        self.check_existing = check_existing
+        self.changed_keys = changed_keys
+        self.report = GenerationReport()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="snowgen-writer"
+        )
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._created_directories = set()
+        self._outstanding = set()
+        self._lock = threading.Lock()
+        self._error = None
+
+    def skip(self):
+        """Count an object whose inputs and file are unchanged since the last run."""
+        self.report.add("unchanged")
+
+    def create_directories(self, directories):
+        """Create directories up front, so objects written to them skip mkdir."""
+        for directory in directories:
+            directory = self.root / directory
+            directory.mkdir(parents=True, exist_ok=True)
+            self._created_directories.add(directory)
+
+    def write(self, ddl, key, replace=False, snowflake_object=None, **entry):
+        """Queue a database object to be saved, blocking while the queue is full."""
+        if self._error is not None:
+            raise self._error
+
+        object_path = self.root / key
+        directory = object_path.parent
+        if directory not in self._created_directories:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._created_directories.add(directory)
+
+        self._pending.acquire()
+        try:
+            future = self._executor.submit(
+                self._save, ddl, object_path, replace, key, snowflake_object, entry
+            )
+        except BaseException:
+            self._pending.release()
+            raise
+        with self._lock:
+            self._outstanding.add(future)
+        future.add_done_callback(self._done)
+
+    def _save(self, ddl, object_path, replace, key, snowflake_object, entry):
+        status = self.database_repository.save_database_object(
+            ddl,
+            object_path,
+            replace=replace,
+            create_parent=False,
+            check_existing=self.check_existing,
+            snowflake_object=snowflake_object,
+        )
+        self.report.add(status)
+        if self.changed_keys is not None and status in ("created", "updated"):
+            self.changed_keys.add(key)
+        if self.manifest is not None and status != "skipped":
+            self.manifest.record(key, object_path, hash_text(ddl), **entry)
+
+    def _done(self, future):
+        with self._lock:
+            self._outstanding.discard(future)
+        self._pending.release()
+        if future.cancelled():
+            return
+        if future.exception() is not None and self._error is None:
+            self._error = future.exception()
+
+    def flush(self):
+        """Wait until every object queued so far has been written."""
+        with self._lock:
+            outstanding = list(self._outstanding)
+        wait(outstanding)
+        if self._error is not None:
+            raise self._error
+        self.database_repository.commit_catalog()
+
+    def close(self):
+        """Wait for all queued objects to be written."""
+        self._executor.shutdown(wait=True)
+        if self._error is not None:
+            raise self._error
+        self.database_repository.commit_catalog()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._executor.shutdown(wait=True, cancel_futures=True)
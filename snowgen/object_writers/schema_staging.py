@@ -0,0 +1,163 @@
+import ctypes
+import os
+import shutil
+from pathlib import Path
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def _libc_function(name):
+    try:
+        return getattr(ctypes.CDLL(None, use_errno=True), name, None)
+    except (OSError, TypeError):
+        return None
+
+
+def sync_tree(path):
+    """
+    Flush everything written under path to disk in one batch: a single
+    syncfs of the filesystem where available, otherwise a global sync, and
+    only as a last resort an fsync per file.
+    """
+    syncfs = _libc_function("syncfs")
+    if syncfs is not None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if syncfs(fd) == 0:
+                return
+        finally:
+            os.close(fd)
+
+    if hasattr(os, "sync"):
+        os.sync()
+        return
+
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            with open(os.path.join(dirpath, filename), "rb+") as file:
+                os.fsync(file.fileno())
+
+
+def fsync_directory(path):
+    """Persist renames in a directory. Not supported on all platforms."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def exchange_paths(source, target):
+    """
+    Swap two directories. Uses an atomic renameat2(RENAME_EXCHANGE) where the
+    platform supports it and falls back to two renames that are rolled back on
+    failure. Afterwards source holds the previous content of target.
+    """
+    renameat2 = _libc_function("renameat2")
+    if renameat2 is not None:
+        result = renameat2(
+            AT_FDCWD,
+            os.fsencode(source),
+            AT_FDCWD,
+            os.fsencode(target),
+            RENAME_EXCHANGE,
+        )
+        if result == 0:
+            return
+
+    previous = Path(f"{source}.previous")
+    os.rename(target, previous)
+    try:
+        os.rename(source, target)
+    except BaseException:
+        os.rename(previous, target)
+        raise
+    os.rename(previous, source)
+
+
+def _process_exists(pid):
+    """Check whether a process is running. Assumed so where it cannot be checked."""
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class SchemaStaging:
+    """
+    Staging area for regenerating a schema without touching the live tree.
+
+    Objects are written below a hidden staging folder inside the snowflake
+    objects folder, so the staged schema is on the same filesystem as the live
+    one. commit() flushes the staged files and swaps the staged schema in.
+    Leaving the context removes the staging folder, together with the
+    previous schema after a commit or the partial schema after a failure, so
+    an interrupted run leaves the live schema as it was. Staging folders of
+    the schema left by killed runs are removed when a staged write starts.
+    """
+
+    def __init__(self, objects_path, database, schema):
+        self.objects_path = Path(objects_path)
+        self.schema_key = Path("databases") / database / "schemas" / schema
+        self.live_path = self.objects_path / self.schema_key
+        self.prefix = f".staging-{database}-{schema}-"
+        self.root = self.objects_path / f"{self.prefix}{os.getpid()}"
+        self.staged_path = self.root / self.schema_key
+
+    def sweep(self):
+        """
+        Remove the staging folders of this schema left by other runs whose
+        process is gone, such as runs that were killed before cleaning up.
+        """
+        if not self.objects_path.is_dir():
+            return
+        for path in self.objects_path.iterdir():
+            pid = path.name[len(self.prefix) :]
+            if (
+                path.name.startswith(self.prefix)
+                and pid.isdigit()
+                and int(pid) != os.getpid()
+                and not _process_exists(int(pid))
+            ):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def __enter__(self):
+        self.sweep()
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        self.staged_path.mkdir(parents=True)
+        return self
+
+    def carry_over(self, folder):
+        """
+        Copy a folder of the live schema into the staged one, for files that
+        are kept across regenerations rather than rendered again.
+        """
+        live_folder = self.live_path / folder
+        if live_folder.is_dir():
+            shutil.copytree(live_folder, self.staged_path / folder)
+
+    def commit(self):
+        """Flush the staged schema to disk and swap it in for the live schema."""
+        sync_tree(self.root)
+
+        self.live_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.live_path.exists():
+            exchange_paths(self.staged_path, self.live_path)
+        else:
+            os.rename(self.staged_path, self.live_path)
+        fsync_directory(self.live_path.parent)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        shutil.rmtree(self.root, ignore_errors=True)
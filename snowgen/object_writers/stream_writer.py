@@ -0,0 +1,182 @@
+import gzip
+import io
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from pathlib import PurePosixPath
+from snowgen.object_writers.generation_manifest import GenerationReport, hash_text
+
+
+def object_record(key, ddl):
+    """
+    Build the NDJSON record of a rendered object. The key is the object path
+    relative to the snowflake objects folder.
+    """
+    parts = PurePosixPath(key).parts
+    return {
+        "path": key,
+        "database": parts[1],
+        "schema": parts[3],
+        "object_type": parts[4],
+        "name": PurePosixPath(key).stem,
+        "ddl": ddl,
+        "hash": hash_text(ddl),
+    }
+
+
+def safe_object_key(key):
+    """Reject object paths that would escape the snowflake objects folder."""
+    path = PurePosixPath(key)
+    if path.is_absolute() or ".." in path.parts or not path.parts:
+        raise ValueError(f"Refusing to write object outside the object tree: {key}")
+    return path.as_posix()
+
+
+class NdjsonObjectWriter:
+    """Stream rendered objects as NDJSON records instead of writing files."""
+
+    manifest = None
+
+    def __init__(self, stream, close_stream=False, environments=None):
+        self.stream = stream
+        self.close_stream = close_stream
+        self.environments = environments
+        self.report = GenerationReport()
+
+    def skip(self):
+        self.report.add("unchanged")
+
+    def write(self, ddl, key, replace=False, **entry):
+        record = object_record(key, ddl)
+        if self.environments:
+            # Objects rendered with environment slots keep the values to
+            # fill them with, for an EnvironmentObjectWriter to read back.
+            record["environments"] = entry.get("environments")
+            record["defaults"] = entry.get("defaults")
+        self.write_record(record)
+
+    def write_record(self, record):
+        self.stream.write(json.dumps(record) + "\n")
+        self.report.add("created")
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        if self.close_stream:
+            self.stream.close()
+        else:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Zip archives cannot store times before 1980.
+ZIP_EPOCH = 315532800
+
+
+class ArchiveObjectWriter(NdjsonObjectWriter):
+    """
+    Write rendered objects into a single tar or zip archive. Entries are
+    stamped with SOURCE_DATE_EPOCH, or the epoch, instead of the time of the
+    run, so the same objects always give a byte-identical archive.
+    """
+
+    def __init__(self, archive_path, archive_format=None):
+        super().__init__(None)
+        archive_path = str(archive_path)
+        if archive_format is None:
+            archive_format = "zip" if archive_path.endswith(".zip") else "tar"
+        self.archive_format = archive_format
+        self.mtime = int(os.environ.get("SOURCE_DATE_EPOCH", 0))
+        self.compressed = None
+
+        if archive_format == "zip":
+            self.archive = zipfile.ZipFile(
+                archive_path, "w", compression=zipfile.ZIP_DEFLATED
+            )
+        elif archive_path.endswith((".tar.gz", ".tgz")):
+            self.compressed = gzip.GzipFile(archive_path, "wb", mtime=self.mtime)
+            self.archive = tarfile.open(fileobj=self.compressed, mode="w")
+        else:
+            self.archive = tarfile.open(archive_path, "w")
+
+    def write_record(self, record):
+        data = record["ddl"].encode("utf-8")
+        if self.archive_format == "zip":
+            info = zipfile.ZipInfo(
+                record["path"], time.gmtime(max(self.mtime, ZIP_EPOCH))[:6]
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(record["path"])
+            info.size = len(data)
+            info.mtime = self.mtime
+            self.archive.addfile(info, io.BytesIO(data))
+        self.report.add("created")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.archive.close()
+        if self.compressed is not None:
+            self.compressed.close()
+
+
+def open_object_writer(output_format, output_path=None):
+    """Open a stream writer for the ndjson, tar or zip output formats."""
+    if output_format == "ndjson":
+        if output_path in (None, "-"):
+            return NdjsonObjectWriter(sys.stdout)
+        return NdjsonObjectWriter(
+            open(output_path, "w", encoding="utf-8"), close_stream=True
+        )
+    if output_format in ("tar", "zip"):
+        if output_path in (None, "-"):
+            raise ValueError(f"The {output_format} output format needs an output path")
+        return ArchiveObjectWriter(output_path, output_format)
+    raise ValueError(f"Unknown output format {output_format}")
+
+
+def read_ndjson_records(lines):
+    """Read the object records of NDJSON lines."""
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            record["path"] = safe_object_key(record["path"])
+            yield record
+
+
+def read_object_records(source):
+    """
+    Read the objects of an NDJSON stream, a tar or a zip archive as
+    (path, ddl) pairs. source is a path or "-" for stdin.
+    """
+    if source == "-":
+        for record in read_ndjson_records(sys.stdin):
+            yield record["path"], record["ddl"]
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    ddl = archive.read(info).decode("utf-8")
+                    yield safe_object_key(info.filename), ddl
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            for info in archive:
+                if info.isfile():
+                    ddl = archive.extractfile(info).read().decode("utf-8")
+                    yield safe_object_key(info.name), ddl
+    else:
+        with open(source, "r", encoding="utf-8") as file:
+            for record in read_ndjson_records(file):
+                yield record["path"], record["ddl"]
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """
+    Wall time per phase and I/O counters of a snowgen run.
+
+    The profiler is disabled by default. While disabled, phase() returns a
+    shared no-op context manager and count() returns right away, so the
+    instrumentation costs an attribute lookup and a call per site.
+
+    Phases running on several threads, such as writes, add up, so the time of
+    a phase can exceed the wall time of the run.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.phases = defaultdict(lambda: [0.0, 0])
+        self.counters = defaultdict(int)
+
+    def enable(self):
+        self.enabled = True
+        self.reset()
+
+    def disable(self):
+        self.enabled = False
+
+    def phase(self, name):
+        """Time the enclosed block as part of the named phase."""
+        if not self.enabled:
+            return NULL_PHASE
+        return _Phase(self, name)
+
+    def add_time(self, name, seconds, calls=1):
+        with self._lock:
+            phase = self.phases[name]
+            phase[0] += seconds
+            phase[1] += calls
+
+    def count(self, name, amount=1):
+        """Add amount to the named counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        """Return the phases and counters recorded so far as a dict."""
+        with self._lock:
+            return {
+                "wall_seconds": round(time.perf_counter() - self.started, 6),
+                "phases": {
+                    name: {"seconds": round(seconds, 6), "calls": calls}
+                    for name, (seconds, calls) in sorted(self.phases.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def merge(self, snapshot):
+        """Add the phases and counters of a snapshot taken in another process."""
+        if not self.enabled or not snapshot:
+            return
+        for name, phase in snapshot["phases"].items():
+            self.add_time(name, phase["seconds"], phase["calls"])
+        for name, amount in snapshot["counters"].items():
+            self.count(name, amount)
+
+    def write_report(self, report_file):
+        with open(report_file, "w") as file:
+            json.dump(self.snapshot(), file, indent=2)
+            file.write("\n")
+
+
+profiler = Profiler()
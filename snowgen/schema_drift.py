@@ -0,0 +1,173 @@
+import re
+from pathlib import PurePosixPath
+from snowgen.object_writers.generation_manifest import column_types
+
+MIGRATIONS_FOLDER_NAME = "migrations"
+
+DATA_TYPE_PATTERN = re.compile(r"(\w+)(?:\((\d+)(?:,(\d+))?\))?")
+TEXT_TYPES = {"VARCHAR", "STRING", "TEXT"}
+NUMBER_TYPES = {"NUMBER", "DECIMAL", "NUMERIC"}
+MAX_VARCHAR_LENGTH = 16777216
+
+
+def _fold(column):
+    return re.sub(r"[^0-9A-Z]", "", column.upper())
+
+
+def _alters_in_place(data_type, new_data_type):
+    """
+    Check whether Snowflake can change a column from one data type to another
+    with ALTER COLUMN ... SET DATA TYPE: a longer text type, or a number with
+    the same scale and a larger precision.
+    """
+    match = DATA_TYPE_PATTERN.fullmatch(data_type.upper().replace(" ", ""))
+    new_match = DATA_TYPE_PATTERN.fullmatch(new_data_type.upper().replace(" ", ""))
+    if not match or not new_match:
+        return False
+    name, size, scale = match.groups()
+    new_name, new_size, new_scale = new_match.groups()
+    if name in TEXT_TYPES and new_name in TEXT_TYPES:
+        return int(new_size or MAX_VARCHAR_LENGTH) >= int(size or MAX_VARCHAR_LENGTH)
+    if name in NUMBER_TYPES and new_name in NUMBER_TYPES:
+        same_scale = int(new_scale or 0) == int(scale or 0)
+        return same_scale and int(new_size or 38) >= int(size or 38)
+    return False
+
+
+def diff_columns(existing, derived):
+    """
+    Return the changes that turn the existing columns of a table into the
+    derived ones, as (operation, column, value) tuples: ("rename", old, new),
+    ("drop", column, None), ("add", column, data_type) and ("alter", column,
+    data_type). Columns are lists of names or dicts of names to data types.
+    Data type changes Snowflake cannot make in place are returned as
+    ("manual_alter", column, data_type), to be migrated by hand.
+
+    A dropped and an added column are only taken for a rename when their
+    names differ in case or punctuation alone. A dropped and an added column
+    at the same position with the same data type may be a rename too, but
+    that is a guess, so it is returned as ("possible_rename", old, new) next
+    to the drop and add it would replace.
+    """
+    existing = column_types(existing)
+    derived = column_types(derived)
+    dropped = [column for column in existing if column not in derived]
+    added = [column for column in derived if column not in existing]
+
+    renames = {}
+    possible_renames = {}
+    if dropped and added:
+        unmatched = set(added)
+        by_fold = {}
+        for column in added:
+            by_fold.setdefault(_fold(column), column)
+        for column in dropped:
+            match = by_fold.get(_fold(column))
+            if match in unmatched:
+                renames[column] = match
+                unmatched.discard(match)
+
+        derived_names = list(derived)
+        for position, column in enumerate(existing):
+            if column in renames or column in derived:
+                continue
+            if position < len(derived_names):
+                match = derived_names[position]
+                if match in unmatched and derived[match] == existing[column]:
+                    possible_renames[column] = match
+                    unmatched.discard(match)
+
+    changes = [("possible_rename", old, new) for old, new in possible_renames.items()]
+    changes += [("rename", old, new) for old, new in renames.items()]
+    changes += [("drop", column, None) for column in dropped if column not in renames]
+    sources = {new: old for old, new in renames.items()}
+    for column, data_type in derived.items():
+        source = sources.get(column, column)
+        if source not in existing:
+            changes.append(("add", column, data_type))
+        elif existing[source] != data_type:
+            if _alters_in_place(existing[source], data_type):
+                changes.append(("alter", column, data_type))
+            else:
+                changes.append(("manual_alter", column, data_type))
+    return changes
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def render_migration(table, changes, role=None, comment=None):
+    """
+    Render the ALTER TABLE statements of a column diff. Renames come first,
+    then drops, then new columns and data type changes. Possible renames are
+    written as commented out statements, to be reviewed by hand, and so are
+    data type changes Snowflake cannot make in place. Columns are
+    added and dropped only if needed, so a migration deployed after its table
+    file also works where the table was just created with its new columns.
+    """
+    lines = []
+    if comment:
+        lines.append(f"-- {comment}")
+    if role:
+        lines.append(f"USE ROLE {role};")
+    for operation, column, value in changes:
+        if operation == "possible_rename":
+            lines.append(
+                f"-- If {_quote(column)} was renamed to {_quote(value)}, "
+                "use this instead of its DROP and ADD:"
+            )
+            lines.append(
+                f"-- ALTER TABLE {table} RENAME COLUMN {_quote(column)} "
+                f"TO {_quote(value)};"
+            )
+            continue
+        if operation == "manual_alter":
+            lines.append(
+                f"-- Snowflake cannot change {_quote(column)} to {value} in place, "
+                "migrate its data by hand:"
+            )
+            lines.append(
+                f"-- ALTER TABLE {table} ALTER COLUMN {_quote(column)} "
+                f"SET DATA TYPE {value};"
+            )
+            continue
+        if operation == "rename":
+            action = f"RENAME COLUMN {_quote(column)} TO {_quote(value)}"
+        elif operation == "drop":
+            action = f"DROP COLUMN IF EXISTS {_quote(column)}"
+        elif operation == "add":
+            action = f"ADD COLUMN IF NOT EXISTS {_quote(column)} {value}"
+        else:
+            action = f"ALTER COLUMN {_quote(column)} SET DATA TYPE {value}"
+        lines.append(f"ALTER TABLE {table} {action};")
+    return "\n".join(lines) + "\n"
+
+
+def _numbered_migrations(objects_path, key):
+    key = PurePosixPath(key)
+    folder = key.parent / MIGRATIONS_FOLDER_NAME
+    name = key.stem
+    return folder, sorted(
+        (int(path.stem[len(name) + 1 :]), (folder / path.name).as_posix())
+        for path in (objects_path / folder).glob(f"{name}_*.sql")
+        if path.stem[len(name) + 1 :].isdigit()
+    )
+
+
+def migration_keys(objects_path, key):
+    """
+    Return the keys of the migrations of the object with the given key, in
+    the order they were written. Migrations are numbered per object and kept
+    in a migrations folder next to it, which the object catalog does not
+    index.
+    """
+    _, migrations = _numbered_migrations(objects_path, key)
+    return [migration_key for _, migration_key in migrations]
+
+
+def next_migration_key(objects_path, key):
+    """Return the key of the next migration of the object with the given key."""
+    folder, migrations = _numbered_migrations(objects_path, key)
+    number = migrations[-1][0] if migrations else 0
+    return (folder / f"{PurePosixPath(key).stem}_{number + 1:04d}.sql").as_posix()
@@ -0,0 +1,68 @@
+import re
+import subprocess
+import sys
+import unittest
+
+# Import time of snowgen.cli in microseconds, without click, which accounts for
+# most of the total and is not ours to trim. About 5 ms on a laptop.
+IMPORT_TIME_BUDGET_US = 25_000
+
+# Modules that only the code paths using them may load.
+LAZY_MODULES = {"inquirer", "blessed", "readchar", "yaml", "snowgen.main", "tarfile"}
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_with_import_time(*args):
+    """Run the snowgen CLI with -X importtime and return the imported modules."""
+    code = (
+        "from snowgen.cli import cli\n"
+        f"cli({list(args)!r}, prog_name='snowgen', standalone_mode=False)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for match in IMPORT_TIME_LINE.finditer(result.stderr):
+        modules[match.group(4)] = int(match.group(2))
+    return result.stdout, modules
+
+
+def import_time(modules):
+    return modules["snowgen.cli"] - modules["click"]
+
+
+class TestCliStartup(unittest.TestCase):
+
+    def test_import_loads_no_lazy_modules(self):
+        code = (
+            "import sys\n"
+            "import snowgen.cli\n"
+            f"print(sorted(set({sorted(LAZY_MODULES)!r}) & set(sys.modules)))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_version(self):
+        output, modules = run_with_import_time("--version")
+
+        self.assertIn("snowgen, version", output)
+        self.assertFalse(LAZY_MODULES & set(modules))
+        self.assertLess(import_time(modules), IMPORT_TIME_BUDGET_US)
+
+    def test_help(self):
+        output, modules = run_with_import_time("--help")
+
+        self.assertIn("generate-schema", output)
+        self.assertFalse(LAZY_MODULES & set(modules))
+        self.assertLess(import_time(modules), IMPORT_TIME_BUDGET_US)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import time
+import unittest
+from snowgen.database_objects.column_validation import (
+    ColumnValidator,
+    normalize_column_name,
+    validate_columns,
+)
+from snowgen.database_objects.snowflake_database_object import SnowflakeDatabaseObject
+
+
+def codes(diagnostics):
+    return [(d.position, d.code) for d in diagnostics]
+
+
+class TestValidateColumns(unittest.TestCase):
+
+    def test_checks(self):
+        columns, diagnostics = validate_columns(
+            "orders", ["id", "select", "1st", "Order Date", "ID", "id", "", "x" * 129]
+        )
+
+        self.assertEqual(columns[0], "id")
+        self.assertEqual(
+            codes(diagnostics),
+            [
+                (2, "reserved_keyword"),
+                (3, "starts_with_digit"),
+                (4, "needs_quoting"),
+                (5, "duplicate_ignoring_case"),
+                (6, "duplicate"),
+                (7, "empty"),
+                (8, "too_long"),
+            ],
+        )
+        self.assertEqual(
+            [d.severity for d in diagnostics],
+            ["warning"] * 4 + ["error"] * 3,
+        )
+
+    def test_rename_resolves_collisions(self):
+        columns, diagnostics = validate_columns(
+            "orders", ["order_date", "Order Date", "order-date", "group"], rename=True
+        )
+
+        self.assertEqual(
+            columns, ["order_date", "Order_Date_2", "order_date_3", "group_"]
+        )
+        self.assertEqual(diagnostics[0].renamed_to, "Order_Date_2")
+        self.assertIn("renamed to 'Order_Date_2'", str(diagnostics[0]))
+
+    def test_rename_keeps_data_types(self):
+        columns, _ = validate_columns(
+            "orders", {"id": "NUMBER", "2nd value": "VARCHAR"}, rename=True
+        )
+
+        self.assertEqual(columns, {"id": "NUMBER", "_2nd_value": "VARCHAR"})
+
+    def test_normalize_column_name(self):
+        self.assertEqual(normalize_column_name(" ## ", 4), "column_4")
+        self.assertEqual(normalize_column_name("Table", 1), "Table_")
+        self.assertEqual(len(normalize_column_name("a" * 200, 1)), 128)
+
+    def test_validator_collects_all_tables(self):
+        validator = ColumnValidator(rename=True)
+        tables = [
+            {"object_name": "a", "columns": ["id", "id"]},
+            {"object_name": "b", "columns": ["where"]},
+        ]
+
+        validated = list(validator.validate(tables))
+
+        self.assertEqual(validated[1]["columns"], ["where_"])
+        self.assertEqual([d.table for d in validator.diagnostics], ["a", "b"])
+        self.assertEqual([d.code for d in validator.errors], ["duplicate"])
+
+    def test_wide_tables(self):
+        columns = [f"column {i}" for i in range(20000)]
+
+        start = time.perf_counter()
+        renamed, diagnostics = validate_columns("wide", columns, rename=True)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(set(renamed)), 20000)
+        self.assertEqual(len(diagnostics), 20000)
+        self.assertLess(elapsed, 1)
+
+
+class TestFormatTableColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.table = SnowflakeDatabaseObject(
+            "loader", "raw_db", "raw_sales", "orders", "tables"
+        )
+
+    def test_table_columns_stay_valid_ddl(self):
+        self.assertEqual(
+            self.table.format_table_columns(["id", "order", "1st"]),
+            '"id" VARCHAR,\n    "order" VARCHAR,\n    "1st" VARCHAR',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
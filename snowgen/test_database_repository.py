@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.database_repository.yaml_cache import YamlCache, load_yaml, yaml_cache
+
+
+SCHEMAS_YAML = """
+schemas:
+  - name: raw
+    database: raw_db
+    role: loader
+  - name: curated
+    database: curated_db
+    role: transformer
+"""
+
+
+class TestDatabaseRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        self.base_path = Path(self.tmp.name)
+        self.schemas_yaml = (
+            self.base_path / "templates" / "schema_templates" / "schemas.yaml"
+        )
+        self.schemas_yaml.parent.mkdir(parents=True)
+        self.schemas_yaml.write_text(SCHEMAS_YAML)
+        self.database_repository = DatabaseRepository()
+        self.database_repository.base_path = self.base_path
+        self.database_repository.cache_path = self.base_path / ".snowgen"
+        yaml_cache.clear()
+
+    def tearDown(self):
+        yaml_cache.clear()
+        self.tmp.cleanup()
+
+    def test_schema_templates_are_parsed_once(self):
+        with patch(
+            "snowgen.database_repository.yaml_cache.load_yaml", wraps=load_yaml
+        ) as mock_load_yaml:
+            self.assertEqual(
+                self.database_repository.get_available_schema_templates(),
+                ["raw", "curated"],
+            )
+            self.assertEqual(
+                self.database_repository.get_schema_template("curated")["database"],
+                "curated_db",
+            )
+            self.assertIsNone(self.database_repository.get_schema_template("missing"))
+
+        mock_load_yaml.assert_called_once()
+
+    def test_schema_templates_cache_is_invalidated_by_mtime(self):
+        self.database_repository.get_schema_templates_yaml()
+
+        self.schemas_yaml.write_text(SCHEMAS_YAML.replace("curated", "modelled"))
+        stat = os.stat(self.schemas_yaml)
+        os.utime(self.schemas_yaml, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        self.assertEqual(
+            self.database_repository.get_available_schema_templates(),
+            ["raw", "modelled"],
+        )
+
+    def test_cold_start_reads_cache_artifact(self):
+        self.database_repository.get_schema_templates_yaml()
+
+        with patch("snowgen.database_repository.yaml_cache.load_yaml") as mock_load_yaml:
+            entry = YamlCache().load(
+                self.schemas_yaml, cache_path=self.database_repository.cache_path
+            )
+
+        mock_load_yaml.assert_not_called()
+        self.assertIn("raw", entry.schema_templates)
+
+    def test_cache_artifacts_hold_plain_data(self):
+        self.database_repository.get_schema_templates_yaml()
+        [artifact] = (self.database_repository.cache_path / "yaml").iterdir()
+
+        self.assertEqual(artifact.suffix, ".json")
+        self.assertEqual(
+            json.loads(artifact.read_text())["config"]["schemas"][0]["name"], "raw"
+        )
+
+        dated = self.base_path / "dated.yaml"
+        dated.write_text("released: 2024-01-01\n")
+        YamlCache().load(dated, cache_path=self.database_repository.cache_path)
+        self.assertEqual(
+            len(list((self.database_repository.cache_path / "yaml").iterdir())), 1
+        )
+
+    def test_template_files_are_read_as_they_are_consumed(self):
+        files = self.base_path / "templates" / "template_files" / "raw_sales"
+        files.mkdir(parents=True)
+        for i in range(40):
+            (files / f"table_{i:02}_20240101.csv").write_text("id,name\n1,a\n")
+
+        os.chdir(self.base_path)
+        try:
+            with patch(
+                "snowgen.database_repository.database_repository.read_header",
+                side_effect=lambda file, **options: ["id", "name"],
+            ) as mock_read_header:
+                tables = self.database_repository.iter_table_columns_from_template_files(
+                    "raw_sales"
+                )
+                first = next(tables)
+                read_ahead = mock_read_header.call_count
+                self.assertEqual(len(list(tables)), 39)
+        finally:
+            os.chdir(self.cwd)
+
+        self.assertEqual(first["object_name"], "table_00")
+        self.assertLessEqual(
+            read_ahead, DatabaseRepository.HEADER_READER_WORKERS * 2 + 1
+        )
+        self.assertEqual(mock_read_header.call_count, 40)
+
+    def test_template_files_are_dispatched_by_extension(self):
+        files = self.base_path / "templates" / "template_files" / "raw_sales"
+        files.mkdir(parents=True)
+        (files / "orders_20240101.csv").write_text("id,name\n1,a\n")
+        (files / "events_20240101.ndjson").write_text('{"id": 1, "kind": "x"}\n')
+
+        os.chdir(self.base_path)
+        try:
+            tables = self.database_repository.get_table_columns_from_template_files(
+                "raw_sales"
+            )
+        finally:
+            os.chdir(self.cwd)
+
+        self.assertEqual(
+            [(table["object_name"], table["columns"]) for table in tables],
+            [
+                ("events", {"id": "NUMBER(1,0)", "kind": "VARCHAR"}),
+                ("orders", ["id", "name"]),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from snowgen.ddl_executor import DdlExecutor
+from snowgen.deployment_plan import DeploymentPlan
+from snowgen.drivers import FakeDriver, SnowflakeDriver, load_driver
+
+
+class TestDdlExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_plan(self, objects, dependencies=None, environment=None):
+        dependencies = dependencies or {}
+        for key, ddl in objects.items():
+            (Path(self.tmp.name) / key).write_text(ddl)
+        return DeploymentPlan(
+            {key: {} for key in objects},
+            {key: set(dependencies.get(key, ())) for key in objects},
+            self.tmp.name,
+            environment=environment,
+        )
+
+    def test_levels_run_in_order_with_bounded_concurrency(self):
+        objects = {f"table_{i}": f"USE SCHEMA s;\nCREATE TABLE t{i} (id INT);" for i in range(10)}
+        objects["schema"] = "CREATE SCHEMA s;"
+        plan = self.make_plan(objects, {key: ["schema"] for key in objects if key != "schema"})
+        driver = FakeDriver(latency=0.01)
+        log = io.StringIO()
+
+        results = DdlExecutor(driver, concurrency=3, log=log).apply(plan)
+
+        self.assertEqual(driver.executed[0], "CREATE SCHEMA s")
+        self.assertEqual(len(driver.executed), 21)
+        self.assertEqual(driver.max_running, 3)
+        self.assertLessEqual(driver.connections, 3)
+        self.assertTrue(all(r["status"] == "applied" for r in results.values()))
+        self.assertEqual(len(log.getvalue().splitlines()), 11)
+        self.assertEqual(json.loads(log.getvalue().splitlines()[0])["path"], "schema")
+
+    def test_transient_errors_are_retried(self):
+        plan = self.make_plan({"table": "CREATE TABLE t (id INT);"})
+        driver = FakeDriver(failures={"CREATE TABLE": 2})
+
+        results = DdlExecutor(driver, retries=3, backoff=0).apply(plan)
+
+        self.assertEqual(results["table"]["status"], "applied")
+        self.assertEqual(results["table"]["attempts"], 3)
+
+    def test_failures_skip_dependents(self):
+        plan = self.make_plan(
+            {
+                "format": "CREATE FILE FORMAT f;",
+                "stage": "CREATE STAGE s FILE_FORMAT = (FORMAT_NAME = f);",
+                "table": "CREATE TABLE t (id INT);",
+            },
+            {"stage": ["format"]},
+        )
+        driver = FakeDriver(failures={"FILE FORMAT": 5})
+
+        results = DdlExecutor(driver, retries=1, backoff=0).apply(plan)
+
+        self.assertEqual(results["format"]["status"], "failed")
+        self.assertEqual(results["format"]["attempts"], 2)
+        self.assertEqual(results["stage"]["status"], "skipped")
+        self.assertEqual(results["table"]["status"], "applied")
+
+    def test_environment_slots_never_reach_the_driver(self):
+        objects = {
+            "schema": "CREATE SCHEMA cur_db_{env}.cur;",
+            "dynamic_table": (
+                "USE DATABASE cur_db_{env};\n"
+                "CREATE DYNAMIC TABLE t AS SELECT id FROM raw_db_{env}.raw.t;"
+            ),
+        }
+        driver = FakeDriver()
+
+        results = DdlExecutor(driver).apply(
+            self.make_plan(objects, {"dynamic_table": ["schema"]}, environment="dev")
+        )
+
+        self.assertEqual(
+            [result["status"] for result in results.values()], ["applied"] * 2
+        )
+        self.assertIn("USE DATABASE cur_db_dev", driver.executed)
+        self.assertFalse(any("{" in statement for statement in driver.executed))
+
+        driver = FakeDriver()
+        results = DdlExecutor(driver).apply(
+            self.make_plan(objects, {"dynamic_table": ["schema"]})
+        )
+
+        self.assertEqual(results["schema"]["status"], "failed")
+        self.assertIn("environment slots", results["schema"]["error"])
+        self.assertEqual(results["dynamic_table"]["status"], "skipped")
+        self.assertEqual(driver.executed, [])
+
+    def test_load_driver(self):
+        self.assertIsInstance(load_driver("fake", {"latency": "0.5"}), FakeDriver)
+        self.assertIsInstance(
+            load_driver("snowgen.drivers:SnowflakeDriver", {"account": "x"}),
+            SnowflakeDriver,
+        )
+        with self.assertRaises(ValueError):
+            load_driver("nope")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.database_repository import ddl_parser
+from snowgen.database_repository.ddl_parser import (
+    DdlParseCache,
+    parse_dynamic_table_lineage,
+    parse_object_references,
+    parse_table_definition,
+    parse_table_name,
+    split_statements,
+)
+
+
+class TestDdlParser(unittest.TestCase):
+
+    def test_generated_table(self):
+        table_definition = """USE DATABASE raw_db_{env};
+USE SCHEMA raw_sales;
+-- SQL generated using file "orders_20240101.csv"
+CREATE OR REPLACE TABLE orders (
+    "id" NUMBER(10,2) DEFAULT "seq".nextval,
+    "ALL" VARCHAR -- This column name is not allowed,
+    "name" VARCHAR COMMENT 'the "name"',
+    /* "ignored" */ "amount" VARCHAR
+);"""
+
+        self.assertEqual(
+            parse_table_definition(table_definition),
+            {
+                "columns": ["id", "ALL", "name", "amount"],
+                "source_database": "raw_db_{env}",
+                "source_schema": "raw_sales",
+                "source_object": "orders",
+            },
+        )
+
+    def test_create_variants_and_qualified_names(self):
+        for statement in [
+            'CREATE OR ALTER TABLE db.sch."Orders" (id INT, CONSTRAINT pk PRIMARY KEY (id))',
+            'create transient table if not exists "Orders"(id int)',
+            "CREATE TABLE Orders (id INT)",
+        ]:
+            definition = parse_table_definition(statement)
+            self.assertEqual(definition["source_object"].lower(), "orders", statement)
+            self.assertEqual(definition["columns"], ["id"], statement)
+
+        self.assertIsNone(
+            parse_table_definition("CREATE DYNAMIC TABLE d AS SELECT 1")["source_object"]
+        )
+
+    def test_table_name(self):
+        self.assertEqual(
+            parse_table_name(
+                "USE DATABASE raw_db_{env};\n"
+                'USE SCHEMA "Raw";\n'
+                "-- CREATE TABLE commented (\n"
+                "CREATE OR REPLACE TABLE orders (id INT);"
+            ),
+            ("raw_db_{env}", '"Raw"', "orders"),
+        )
+        self.assertEqual(
+            parse_table_name(
+                'USE SCHEMA raw; create table if not exists db."Or""ders"(id int)'
+            ),
+            (None, "db", '"Or""ders"'),
+        )
+        self.assertEqual(
+            parse_table_name("CREATE TABLE s.t AS SELECT 1"), (None, "s", "t")
+        )
+        self.assertEqual(parse_table_name("USE DATABASE d;"), ("d", None, None))
+
+    def test_dynamic_table_lineage(self):
+        lineage = parse_dynamic_table_lineage(
+            "CREATE OR REPLACE DYNAMIC TABLE orders\n"
+            "TARGET_LAG = '1 hour'\n"
+            "AS SELECT\n"
+            '    TRIM("id") AS "id", -- first, column\n'
+            "    COALESCE(amount, ',') AS amount,\n"
+            "    o.status\n"
+            "FROM raw_db.raw_sales.orders o;"
+        )
+
+        self.assertEqual(lineage["columns"], ["id", "amount", "status"])
+        self.assertEqual(
+            (
+                lineage["source_database"],
+                lineage["source_schema"],
+                lineage["source_object"],
+            ),
+            ("raw_db", "raw_sales", "orders"),
+        )
+
+    def test_object_references(self):
+        self.assertEqual(
+            parse_object_references(
+                "CREATE STAGE landing FILE_FORMAT = (FORMAT_NAME = 'db.s.csv');"
+            ),
+            [("file_format", "db", "s", "csv")],
+        )
+        self.assertEqual(
+            parse_object_references(
+                "CREATE TABLE t (id NUMBER DEFAULT s.id_seq.NEXTVAL)\n"
+                "AS SELECT id FROM \"Raw\".orders o -- FROM ignored\n"
+                "JOIN customers c ON o.id = c.id;"
+            ),
+            [
+                ("sequence", None, "s", "id_seq"),
+                ("object", None, "Raw", "orders"),
+                ("object", None, None, "customers"),
+            ],
+        )
+
+    def test_split_statements(self):
+        self.assertEqual(
+            split_statements(
+                "USE SCHEMA s; -- done;\n"
+                "CREATE PROCEDURE p() RETURNS INT LANGUAGE SQL\n"
+                "AS $$ BEGIN RETURN 1; END $$;\n"
+                "SELECT ';', \"a;b\" /* ; */;\n"
+                "-- trailing comment;\n"
+            ),
+            [
+                "USE SCHEMA s",
+                "-- done;\nCREATE PROCEDURE p() RETURNS INT LANGUAGE SQL\n"
+                "AS $$ BEGIN RETURN 1; END $$",
+                "SELECT ';', \"a;b\" /* ; */",
+            ],
+        )
+
+    def test_parse_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for name in ["a", "b"]:
+                file = Path(tmp) / f"{name}.sql"
+                file.write_text(f'CREATE TABLE {name} ("x" VARCHAR);')
+                files.append(file)
+            cache_file = Path(tmp) / "cache.json"
+
+            cache = DdlParseCache(cache_file)
+            definitions = cache.parse_files(files)
+            cache.save()
+            self.assertEqual([d["source_object"] for d in definitions], ["a", "b"])
+
+            with patch.object(ddl_parser, "parse_table_definition") as mock_parse:
+                self.assertEqual(DdlParseCache(cache_file).parse_files(files), definitions)
+            mock_parse.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.dependency_graph import DependencyGraph, object_key
+from snowgen.main import create_schemas_in, update_objects
+from snowgen.test_main import SCHEMA_TEMPLATES, SQL_TEMPLATES
+
+BATCH = [
+    {"schema": "raw_sales", "template": "raw", "delimiter": ","},
+    {
+        "schema": "cur_sales",
+        "template": "curated",
+        "source_database": "raw_db",
+        "source_schema": "raw_sales",
+    },
+]
+
+ORDERS = "databases/raw_db/schemas/raw_sales/tables/orders.sql"
+CURATED_ORDERS = "databases/curated_db/schemas/cur_sales/dynamic_tables/orders.sql"
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+        templates = Path("templates")
+        self.schema_templates = templates / "schema_templates" / "schemas.yaml"
+        self.schema_templates.parent.mkdir(parents=True)
+        self.schema_templates.write_text(textwrap.dedent(SCHEMA_TEMPLATES))
+        self.sql_templates = templates / "sql_templates"
+        self.sql_templates.mkdir()
+        for name, template in SQL_TEMPLATES.items():
+            (self.sql_templates / name).write_text(template)
+        self.files = templates / "template_files" / "raw_sales"
+        self.files.mkdir(parents=True)
+        (self.files / "orders_20240101.csv").write_text("id,amount\n1,2.5\n")
+        (self.files / "customers_20240101.csv").write_text("id,name\n1,a\n")
+
+        create_schemas_in(DatabaseRepository(), BATCH, jobs=1)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def build_graph(self):
+        return DependencyGraph.build(DatabaseRepository())
+
+    def test_object_key(self):
+        self.assertEqual(
+            object_key("db", "s", "tables", "Orders", prefix="stg"),
+            "databases/db/schemas/s/tables/stg_orders.sql",
+        )
+
+    def test_freshly_generated_objects_are_up_to_date(self):
+        graph = self.build_graph()
+
+        self.assertEqual(graph.changes(), {})
+        self.assertIn(CURATED_ORDERS, graph.objects)
+
+    def test_template_file_change_reaches_dynamic_tables(self):
+        (self.files / "orders_20240101.csv").write_text("id,amount,note\n1,2.5,x\n")
+        graph = self.build_graph()
+
+        impacted = graph.impact(graph.changes())
+
+        self.assertEqual(set(impacted), {ORDERS, CURATED_ORDERS})
+        self.assertEqual(impacted[CURATED_ORDERS], ("object", ORDERS))
+
+    def test_selection_stops_propagation(self):
+        (self.files / "orders_20240101.csv").write_text("id,amount,note\n1,2.5,x\n")
+        graph = self.build_graph()
+
+        impacted = graph.impact(graph.changes(), object_types={"dynamic_tables"})
+
+        self.assertEqual(impacted, {})
+
+    def test_update_objects_renders_the_impact_set(self):
+        (self.sql_templates / "stage.sql").write_text(
+            "CREATE STAGE {database}.{schema}.{name};\n"
+        )
+        (self.files / "items_20240101.csv").write_text("id\n1\n")
+        database_repository = DatabaseRepository()
+        graph = DependencyGraph.build(database_repository)
+        impacted = graph.impact(graph.changes())
+
+        report = update_objects(database_repository, graph, impacted)
+
+        self.assertEqual(len(impacted), 3)
+        self.assertEqual(report.counts["created"], 2)
+        self.assertEqual(report.counts["updated"], 1)
+        self.assertEqual(self.build_graph().changes(), {})
+
+    def test_schema_template_change(self):
+        self.schema_templates.write_text(
+            textwrap.dedent(SCHEMA_TEMPLATES).replace(
+                'pattern: "{column_name}"', 'pattern: "UPPER({column_name})"'
+            )
+        )
+        graph = self.build_graph()
+
+        impacted = graph.impact(graph.changes())
+
+        self.assertEqual(
+            {key.split("/")[-2] for key in impacted}, {"dynamic_tables"}
+        )
+        self.assertEqual(len(impacted), 2)
+
+    def test_new_schema_template_entry_is_affected(self):
+        self.schema_templates.write_text(
+            textwrap.dedent(SCHEMA_TEMPLATES).replace(
+                "      - object_name: landing\n",
+                "      - object_name: landing\n"
+                "        template_name: stage.sql\n"
+                "      - object_name: archive\n",
+            )
+        )
+        graph = self.build_graph()
+
+        impacted = graph.impact(graph.changes())
+
+        self.assertIn(
+            "databases/raw_db/schemas/raw_sales/internal_stages/archive.sql", impacted
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
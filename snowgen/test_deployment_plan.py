@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.deployment_plan import DependencyCycleError, DeploymentPlan
+
+OBJECTS = {
+    "raw_db/schemas/raw/schema_definition/schema.sql": "CREATE SCHEMA raw;",
+    "raw_db/schemas/raw/file_formats/csv.sql": "CREATE FILE FORMAT csv TYPE = CSV;",
+    "raw_db/schemas/raw/internal_stages/landing.sql": (
+        "CREATE STAGE landing FILE_FORMAT = (FORMAT_NAME = csv);"
+    ),
+    "raw_db/schemas/raw/tables/orders.sql": 'CREATE TABLE orders ("id" VARCHAR);',
+    "cur_db/schemas/cur/dynamic_tables/orders.sql": (
+        "CREATE DYNAMIC TABLE orders AS SELECT id FROM raw_db_dev.raw.orders;"
+    ),
+}
+
+
+class TestDeploymentPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+        databases = Path("snowflake") / "snowflake_objects" / "databases"
+        for path, ddl in OBJECTS.items():
+            (databases / path).parent.mkdir(parents=True, exist_ok=True)
+            (databases / path).write_text(ddl)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_levels_follow_references(self):
+        plan = DeploymentPlan.build(DatabaseRepository())
+
+        self.assertEqual(
+            [[key.split("/", 3)[-1] for key in level] for level in plan.levels],
+            [
+                ["raw/schema_definition/schema.sql"],
+                ["raw/file_formats/csv.sql", "raw/tables/orders.sql"],
+                ["cur/dynamic_tables/orders.sql", "raw/internal_stages/landing.sql"],
+            ],
+        )
+
+    def test_migrations_follow_their_table(self):
+        migrations = Path(
+            "snowflake/snowflake_objects/databases/raw_db/schemas/raw/tables/migrations"
+        )
+        migrations.mkdir()
+        (migrations / "orders_0002.sql").write_text(
+            'ALTER TABLE raw_db_{env}.raw.orders ADD COLUMN IF NOT EXISTS "b" DATE;'
+        )
+        (migrations / "orders_0001.sql").write_text(
+            'ALTER TABLE raw_db_{env}.raw.orders ADD COLUMN IF NOT EXISTS "a" DATE;'
+        )
+        rendered = DatabaseRepository().get_environment_objects_path("dev")
+        (rendered / "databases/raw_db/schemas/raw/tables").mkdir(parents=True)
+
+        plan = DeploymentPlan.build(DatabaseRepository(), environment="dev")
+
+        self.assertEqual(
+            [[key.split("/", 3)[-1] for key in level] for level in plan.levels],
+            [
+                ["raw/schema_definition/schema.sql"],
+                ["raw/file_formats/csv.sql", "raw/tables/orders.sql"],
+                [
+                    "raw/internal_stages/landing.sql",
+                    "raw/tables/migrations/orders_0001.sql",
+                ],
+                ["raw/tables/migrations/orders_0002.sql"],
+                ["cur/dynamic_tables/orders.sql"],
+            ],
+        )
+        self.assertEqual(
+            plan.read_ddl(plan.levels[2][1]),
+            'ALTER TABLE raw_db_dev.raw.orders ADD COLUMN IF NOT EXISTS "a" DATE;',
+        )
+
+    def test_source_resolves_despite_env_suffix(self):
+        plan = DeploymentPlan.build(DatabaseRepository())
+
+        self.assertEqual(
+            plan.dependencies["databases/cur_db/schemas/cur/dynamic_tables/orders.sql"],
+            {"databases/raw_db/schemas/raw/tables/orders.sql"},
+        )
+
+    def test_source_resolves_with_env_slot(self):
+        dynamic_table = (
+            Path("snowflake/snowflake_objects/databases")
+            / "cur_db/schemas/cur/dynamic_tables/orders.sql"
+        )
+        dynamic_table.write_text(
+            "USE DATABASE cur_db_{env};\n"
+            "CREATE DYNAMIC TABLE orders AS SELECT id FROM raw_db_{env}.raw.orders;\n"
+        )
+
+        plan = DeploymentPlan.build(DatabaseRepository())
+
+        level_of = {
+            key: number
+            for number, level in enumerate(plan.levels)
+            for key in level
+        }
+        source = "databases/raw_db/schemas/raw/tables/orders.sql"
+        dependent = "databases/cur_db/schemas/cur/dynamic_tables/orders.sql"
+        self.assertEqual(plan.dependencies[dependent], {source})
+        self.assertLess(level_of[source], level_of[dependent])
+
+    def test_write_json_and_scripts(self):
+        plan = DeploymentPlan.build(DatabaseRepository(), schema="raw")
+
+        with open("plan.json", "w") as file:
+            plan.write_json(file)
+        paths = plan.write_scripts("scripts")
+
+        with open("plan.json") as file:
+            self.assertEqual(json.load(file)["depth"], 3)
+        self.assertEqual([p.name for p in paths], [f"level_00{i}.sql" for i in (1, 2, 3)])
+        self.assertIn("CREATE STAGE landing", paths[2].read_text())
+
+    def test_cycle_is_reported(self):
+        with self.assertRaises(DependencyCycleError):
+            DeploymentPlan({"a": {}, "b": {}}, {"a": {"b"}, "b": {"a"}}, ".")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import io
+import json
+import os
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from snowgen.database_objects.environment_template import EnvironmentTemplate
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.main import create_schema_in, create_schemas_in
+from snowgen.object_writers.environment_writer import EnvironmentObjectWriter
+from snowgen.object_writers.object_writer import ObjectWriter
+from snowgen.object_writers.stream_writer import NdjsonObjectWriter
+
+SCHEMA_TEMPLATES = """
+schemas:
+  - name: raw
+    database: raw_db
+    role: loader
+    environments:
+      prod:
+        env: prd
+        role: loader_prod
+    stages:
+      - object_name: landing
+        template_name: stage.sql
+"""
+
+STAGE_TEMPLATE = (
+    "USE ROLE {role};\nCREATE STAGE IF NOT EXISTS {database}_{env}.{schema}.{name};\n"
+)
+
+
+class TestEnvironmentTemplate(unittest.TestCase):
+
+    def test_render(self):
+        template = EnvironmentTemplate("USE ROLE {env:role};\nUSE DATABASE db_{env};")
+
+        self.assertEqual(template.slots, {"env", "role"})
+        self.assertEqual(
+            template.render({"env": "dev", "role": "loader"}),
+            "USE ROLE loader;\nUSE DATABASE db_dev;",
+        )
+        with self.assertRaisesRegex(ValueError, "dev has no value for role"):
+            template.render({"env": "dev"})
+
+
+class TestEnvironmentObjectWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+        templates = Path("templates")
+        (templates / "schema_templates").mkdir(parents=True)
+        (templates / "schema_templates" / "schemas.yaml").write_text(
+            textwrap.dedent(SCHEMA_TEMPLATES)
+        )
+        (templates / "sql_templates").mkdir()
+        (templates / "sql_templates" / "stage.sql").write_text(STAGE_TEMPLATE)
+        self.database_repository = DatabaseRepository()
+        self.stage = "databases/raw_db/schemas/raw_sales/internal_stages/landing.sql"
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_environment_trees_use_overrides(self):
+        writer = EnvironmentObjectWriter(
+            {
+                environment: ObjectWriter(
+                    self.database_repository,
+                    root=self.database_repository.get_environment_objects_path(
+                        environment
+                    ),
+                )
+                for environment in ("dev", "prod")
+            },
+            primary=ObjectWriter(self.database_repository),
+        )
+        with writer:
+            report = create_schema_in(
+                self.database_repository, "raw_sales", "raw", writer=writer
+            )
+
+        self.assertEqual(report.counts["created"], 1)
+        self.assertEqual(
+            (self.database_repository.snowflake_objects_path / self.stage).read_text(),
+            "USE ROLE loader;\n"
+            "CREATE STAGE IF NOT EXISTS raw_db_{env}.raw_sales.landing;\n",
+        )
+        self.assertEqual(
+            (
+                self.database_repository.get_environment_objects_path("dev")
+                / self.stage
+            ).read_text(),
+            "USE ROLE loader;\n"
+            "CREATE STAGE IF NOT EXISTS raw_db_dev.raw_sales.landing;\n",
+        )
+        self.assertEqual(
+            (
+                self.database_repository.get_environment_objects_path("prod")
+                / self.stage
+            ).read_text(),
+            "USE ROLE loader_prod;\n"
+            "CREATE STAGE IF NOT EXISTS raw_db_prd.raw_sales.landing;\n",
+        )
+        self.assertEqual(
+            [entry["path"] for entry in self.database_repository.get_catalog().find()],
+            [self.stage],
+        )
+
+    def test_existing_files_are_kept_in_every_tree_without_replace(self):
+        trees = [
+            self.database_repository.snowflake_objects_path,
+            self.database_repository.get_environment_objects_path("dev"),
+        ]
+        for tree in trees:
+            (tree / self.stage).parent.mkdir(parents=True)
+            (tree / self.stage).write_text("CREATE STAGE old;\n")
+        writer = EnvironmentObjectWriter(
+            {"dev": ObjectWriter(self.database_repository, root=trees[1])},
+            primary=ObjectWriter(self.database_repository),
+        )
+        with writer:
+            create_schema_in(
+                self.database_repository, "raw_sales", "raw", writer=writer
+            )
+
+        for tree in trees:
+            self.assertEqual((tree / self.stage).read_text(), "CREATE STAGE old;\n")
+
+    def test_batch_bundles_per_environment(self):
+        streams = {"dev": io.StringIO(), "prod": io.StringIO()}
+        writer = EnvironmentObjectWriter(
+            {
+                environment: NdjsonObjectWriter(stream)
+                for environment, stream in streams.items()
+            }
+        )
+
+        results = create_schemas_in(
+            self.database_repository,
+            [{"schema": "raw_sales", "template": "raw"}],
+            writer=writer,
+        )
+
+        self.assertIsNone(results[0]["error"])
+        records = {
+            environment: [json.loads(line) for line in stream.getvalue().splitlines()]
+            for environment, stream in streams.items()
+        }
+        self.assertEqual(records["dev"][0]["path"], self.stage)
+        self.assertIn("raw_db_dev.raw_sales.landing", records["dev"][0]["ddl"])
+        self.assertIn("USE ROLE loader_prod;", records["prod"][0]["ddl"])
+        self.assertNotIn("environments", records["prod"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+import gzip
+import json
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.database_repository import file_metadata
+from snowgen.database_repository.file_metadata import (
+    metadata_reader,
+    read_avro_columns,
+    read_ndjson_columns,
+    read_parquet_columns,
+)
+from snowgen.profiler import Profiler
+
+
+def varint(value):
+    data = bytearray()
+    while value > 0x7F:
+        data.append(value & 0x7F | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def zigzag(value):
+    return varint((value << 1) ^ (value >> 63))
+
+
+def thrift_struct(*fields):
+    """Encode (field_id, type, payload) fields with the Thrift compact protocol."""
+    data = bytearray()
+    last = 0
+    for field_id, kind, payload in fields:
+        data.append((field_id - last) << 4 | kind)
+        data += payload
+        last = field_id
+    return bytes(data) + b"\x00"
+
+
+def thrift_i32(field_id, value):
+    return (field_id, 5, zigzag(value))
+
+
+def thrift_string(field_id, value):
+    value = value.encode("utf-8")
+    return (field_id, 8, varint(len(value)) + value)
+
+
+def thrift_structs(field_id, structs):
+    if len(structs) < 15:
+        header = bytes([len(structs) << 4 | 12])
+    else:
+        header = b"\xfc" + varint(len(structs))
+    return (field_id, 9, header + b"".join(structs))
+
+
+def schema_element(name, kind=None, children=None, converted=None, logical=None):
+    fields = []
+    if kind is not None:
+        fields.append(thrift_i32(1, kind))
+    fields.append(thrift_string(4, name))
+    if children is not None:
+        fields.append(thrift_i32(5, children))
+    if converted is not None:
+        fields.append(thrift_i32(6, converted))
+    if logical is not None:
+        fields.append((10, 12, logical))
+    return thrift_struct(*fields)
+
+
+def write_parquet(path, elements, data=b""):
+    footer = thrift_struct(
+        thrift_i32(1, 1),
+        thrift_structs(
+            2, [schema_element("schema", children=len(elements))] + elements
+        ),
+        (3, 6, zigzag(0)),
+        thrift_structs(4, [thrift_struct(thrift_i32(1, 0))]),
+    )
+    path.write_bytes(
+        b"PAR1" + data + footer + struct.pack("<I", len(footer)) + b"PAR1"
+    )
+
+
+def write_avro(path, schema):
+    def avro_bytes(value):
+        return zigzag(len(value)) + value
+
+    schema = json.dumps(schema).encode("utf-8")
+    path.write_bytes(
+        b"Obj\x01"
+        + zigzag(2)
+        + avro_bytes(b"avro.codec")
+        + avro_bytes(b"null")
+        + avro_bytes(b"avro.schema")
+        + avro_bytes(schema)
+        + zigzag(0)
+        + b"\x00" * 16
+        + b"\xff" * 1024
+    )
+
+
+class TestFileMetadata(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parquet_columns_come_from_the_footer(self):
+        file = self.path / "orders_20240101.parquet"
+        decimal = thrift_struct(
+            (5, 12, thrift_struct(thrift_i32(1, 2), thrift_i32(2, 10)))
+        )
+        timestamp = thrift_struct((8, 12, thrift_struct((1, 1, b""))))
+        write_parquet(
+            file,
+            [
+                schema_element("id", kind=2),
+                schema_element("name", kind=6, converted=0),
+                schema_element("amount", kind=7, logical=decimal),
+                schema_element("address", children=2),
+                schema_element("street", kind=6),
+                schema_element("zip", kind=1),
+                schema_element("created_at", kind=2, logical=timestamp),
+                schema_element("active", kind=0),
+            ],
+            data=b"\x00" * (1024 * 1024),
+        )
+
+        profiler = Profiler()
+        profiler.enable()
+        with patch.object(file_metadata, "profiler", profiler):
+            columns = read_parquet_columns(file)
+
+        self.assertEqual(
+            columns,
+            {
+                "id": "NUMBER(38,0)",
+                "name": "VARCHAR",
+                "amount": "NUMBER(10,2)",
+                "address": "VARIANT",
+                "created_at": "TIMESTAMP_TZ",
+                "active": "BOOLEAN",
+            },
+        )
+        self.assertLess(profiler.snapshot()["counters"]["bytes_read"], 1024)
+
+    def test_not_a_parquet_file(self):
+        file = self.path / "orders_20240101.parquet"
+        file.write_bytes(b"id,name\n1,a\n")
+        with self.assertRaisesRegex(ValueError, "not a Parquet file"):
+            read_parquet_columns(file)
+
+    def test_avro_columns_come_from_the_header_schema(self):
+        file = self.path / "orders_20240101.avro"
+        write_avro(
+            file,
+            {
+                "type": "record",
+                "name": "Order",
+                "fields": [
+                    {"name": "id", "type": "long"},
+                    {"name": "note", "type": ["null", "string"]},
+                    {
+                        "name": "amount",
+                        "type": {
+                            "type": "bytes",
+                            "logicalType": "decimal",
+                            "precision": 12,
+                            "scale": 2,
+                        },
+                    },
+                    {
+                        "name": "day",
+                        "type": {"type": "int", "logicalType": "date"},
+                    },
+                    {"name": "tags", "type": {"type": "array", "items": "string"}},
+                ],
+            },
+        )
+
+        self.assertEqual(
+            read_avro_columns(file),
+            {
+                "id": "NUMBER(38,0)",
+                "note": "VARCHAR",
+                "amount": "NUMBER(12,2)",
+                "day": "DATE",
+                "tags": "VARIANT",
+            },
+        )
+
+    def test_ndjson_keys_are_merged_from_a_bounded_sample(self):
+        file = self.path / "orders_20240101.ndjson.gz"
+        lines = [
+            {"id": 1, "created": "2024-01-01", "payload": {"a": 1}},
+            {"id": 2, "note": None, "active": True},
+            {"id": 3, "late": "x"},
+        ]
+        with gzip.open(file, "wt") as stream:
+            for line in lines:
+                stream.write(json.dumps(line) + "\n")
+
+        self.assertIs(metadata_reader(file), read_ndjson_columns)
+        self.assertEqual(
+            read_ndjson_columns(file, sample_rows=2),
+            {
+                "id": "NUMBER(1,0)",
+                "created": "DATE",
+                "payload": "VARIANT",
+                "note": "VARCHAR",
+                "active": "BOOLEAN",
+            },
+        )
+
+    def test_metadata_reader_dispatches_by_extension(self):
+        self.assertIs(metadata_reader("a_20240101.PARQUET"), read_parquet_columns)
+        self.assertIs(metadata_reader("a_20240101.avro"), read_avro_columns)
+        self.assertIs(metadata_reader("a_20240101.jsonl"), read_ndjson_columns)
+        self.assertIsNone(metadata_reader("a_20240101.csv.gz"))
+        self.assertIsNone(metadata_reader("a_20240101.parquet.gz"))
+        self.assertIsNone(metadata_reader("a_20240101.avro.gz"))
+        self.assertIs(metadata_reader("a_20240101.JSONL.bz2"), read_ndjson_columns)
+        self.assertIsNone(metadata_reader("a_20240101"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from snowgen.file_watcher import InotifyWatcher, PollingWatcher
+
+
+class TestFileWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+        (self.path / "sql_templates").mkdir()
+        self.template = self.path / "sql_templates" / "table.sql"
+        self.template.write_text("CREATE TABLE {name}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_watcher(self, watcher):
+        try:
+            self.assertEqual(watcher.wait(timeout=0.05), set())
+
+            self.template.write_text("CREATE OR REPLACE TABLE {name}")
+            os.utime(self.template, ns=(1, 1))
+            self.assertEqual(watcher.wait(timeout=2), {str(self.template)})
+
+            new_folder = self.path / "sql_templates" / "snippets"
+            new_folder.mkdir()
+            snippet = new_folder / "grants.sql"
+            snippet.write_text("GRANT SELECT ON {name} TO {role};")
+            self.assertIn(str(snippet), watcher.wait(timeout=2))
+
+            snippet.write_text("GRANT ALL ON {name} TO {role};")
+            os.utime(snippet, ns=(1, 1))
+            self.assertIn(str(snippet), watcher.wait(timeout=2))
+        finally:
+            watcher.close()
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher([str(self.path)], interval=0.01))
+
+    @unittest.skipUnless(InotifyWatcher.is_supported(), "inotify is not available")
+    def test_inotify_watcher(self):
+        self.check_watcher(InotifyWatcher([str(self.path)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.drivers import FakeDriver
+from snowgen.introspection import MetadataSnapshot, SchemaIntrospector, format_data_type
+from snowgen.main import regenerate_tables_from_snapshot
+from snowgen.object_writers.generation_manifest import GenerationManifest
+from snowgen.test_main import SCHEMA_TEMPLATES, SQL_TEMPLATES
+
+
+class Warehouse:
+    """INFORMATION_SCHEMA stand-in answering the introspection queries."""
+
+    def __init__(self):
+        self.now = "2024-01-01 00:00:00"
+        self.tables = {}
+        self.stages = [{"STAGE_NAME": "LANDING", "STAGE_TYPE": "Internal Named"}]
+        self.statements = []
+
+    def alter(self, name, columns):
+        self.tables[name] = {"last_altered": self.now, "columns": columns}
+
+    def respond(self, statement):
+        self.statements.append(statement)
+        if "INFORMATION_SCHEMA.STAGES" in statement:
+            return self.stages
+        if "INFORMATION_SCHEMA.COLUMNS" in statement:
+            since = None
+            if "LAST_ALTERED >" in statement:
+                since = statement.split("LAST_ALTERED > '")[1].split("'")[0]
+            return [
+                {"TABLE_NAME": name, "COLUMN_NAME": column, **data_type}
+                for name, table in sorted(self.tables.items())
+                if since is None or table["last_altered"] > since
+                for column, data_type in table["columns"].items()
+            ]
+        return [
+            {
+                "SNAPSHOT_AT": self.now,
+                "TABLE_NAME": name,
+                "TABLE_TYPE": "BASE TABLE",
+                "COMMENT": None,
+                "LAST_ALTERED": table["last_altered"],
+            }
+            for name, table in sorted(self.tables.items())
+        ]
+
+
+ID = {"DATA_TYPE": "NUMBER", "NUMERIC_PRECISION": 38, "NUMERIC_SCALE": 0}
+TEXT = {"DATA_TYPE": "TEXT", "CHARACTER_MAXIMUM_LENGTH": 16777216}
+
+
+class TestIntrospection(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+        templates = Path("templates")
+        (templates / "schema_templates").mkdir(parents=True)
+        (templates / "schema_templates" / "schemas.yaml").write_text(
+            textwrap.dedent(SCHEMA_TEMPLATES)
+        )
+        (templates / "sql_templates").mkdir()
+        for name, template in SQL_TEMPLATES.items():
+            (templates / "sql_templates" / name).write_text(template)
+
+        self.database_repository = DatabaseRepository()
+        self.warehouse = Warehouse()
+        self.warehouse.alter("ORDERS", {"ID": ID, "NOTE": TEXT})
+        self.warehouse.alter("CUSTOMERS", {"ID": ID})
+        self.introspector = SchemaIntrospector(
+            FakeDriver(respond=self.warehouse.respond)
+        )
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def snapshot(self):
+        return MetadataSnapshot.for_schema(
+            self.database_repository, "raw_db", "raw_sales"
+        )
+
+    def test_refresh_only_queries_columns_of_altered_tables(self):
+        snapshot = self.snapshot()
+        self.assertEqual(
+            self.introspector.refresh(snapshot), ["CUSTOMERS", "ORDERS"]
+        )
+        snapshot.save()
+        self.assertEqual(len(self.warehouse.statements), 3)
+
+        self.warehouse.now = "2024-01-02 00:00:00"
+        self.warehouse.alter("ORDERS", {"ID": ID})
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot.taken_at, "2024-01-01 00:00:00")
+
+        self.assertEqual(self.introspector.refresh(snapshot), ["ORDERS"])
+        self.assertIn(
+            "LAST_ALTERED > '2024-01-01 00:00:00'", self.warehouse.statements[-2]
+        )
+        self.assertEqual(snapshot.tables["ORDERS"]["columns"], {"ID": "NUMBER(38,0)"})
+        self.assertEqual(
+            snapshot.tables["CUSTOMERS"]["columns"], {"ID": "NUMBER(38,0)"}
+        )
+        self.assertEqual(list(snapshot.stages), ["LANDING"])
+
+    def test_dropped_tables_leave_the_snapshot(self):
+        snapshot = self.snapshot()
+        self.introspector.refresh(snapshot)
+        del self.warehouse.tables["CUSTOMERS"]
+
+        self.introspector.refresh(snapshot)
+
+        self.assertEqual(list(snapshot.tables), ["ORDERS"])
+
+    def test_regenerate_tables_from_snapshot(self):
+        snapshot = self.snapshot()
+        self.introspector.refresh(snapshot)
+        schema_config = self.database_repository.get_schema_template("raw")
+
+        report = regenerate_tables_from_snapshot(
+            self.database_repository, schema_config, snapshot, ["ORDERS"]
+        )
+
+        self.assertEqual(report.counts["created"], 1)
+        table = (
+            Path("snowflake/snowflake_objects/databases/raw_db/schemas/raw_sales")
+            / "tables"
+            / "orders.sql"
+        )
+        self.assertEqual(
+            table.read_text(),
+            'CREATE OR REPLACE TABLE orders (\n    "ID" NUMBER(38,0),\n'
+            '    "NOTE" VARCHAR\n);\n',
+        )
+
+    def test_regenerated_tables_keep_their_warehouse_names(self):
+        self.warehouse.alter("RAW_ORDERS", {"ID": ID})
+        snapshot = self.snapshot()
+        self.introspector.refresh(snapshot)
+        schema_config = self.database_repository.get_schema_template("raw")
+        schema_config["tables"][0]["prefix"] = "raw"
+
+        regenerate_tables_from_snapshot(
+            self.database_repository, schema_config, snapshot, ["RAW_ORDERS"]
+        )
+
+        tables = Path(
+            "snowflake/snowflake_objects/databases/raw_db/schemas/raw_sales/tables"
+        )
+        self.assertEqual(sorted(os.listdir(tables)), ["raw_orders.sql"])
+        manifest = GenerationManifest.for_schema(
+            self.database_repository, "raw_db", "raw_sales"
+        )
+        self.assertIn(
+            "databases/raw_db/schemas/raw_sales/tables/raw_orders.sql",
+            manifest.objects,
+        )
+
+    def test_format_data_type(self):
+        self.assertEqual(
+            format_data_type({"DATA_TYPE": "TEXT", "CHARACTER_MAXIMUM_LENGTH": 10}),
+            "VARCHAR(10)",
+        )
+        self.assertEqual(
+            format_data_type({"DATA_TYPE": "TIMESTAMP_NTZ"}), "TIMESTAMP_NTZ"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
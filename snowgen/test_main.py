@@ -1,24 +1,33 @@
+import os
+import tempfile
+import textwrap
 import unittest
+from pathlib import Path
 from unittest.mock import MagicMock, patch
-from snowgen.main import create_new_schema_in, init
-from snowgen.database_objects.snowflake_database_object import SnowflakeDatabaseObject
+from snowgen.main import SchemaWatch, create_schema_in, create_schemas_in, init
+from snowgen.database_objects.sql_template import SqlTemplate
 from snowgen.database_repository.database_repository import DatabaseRepository
 
 
 class TestMain(unittest.TestCase):
 
-    @patch("snowgen.main.inquirer.prompt")
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
     @patch.object(DatabaseRepository, "get_schema_template")
-    @patch.object(DatabaseRepository, "get_snowflake_objects_path")
-    @patch.object(DatabaseRepository, "get_sql_template")
-    @patch.object(SnowflakeDatabaseObject, "save_object")
-    def test_create_new_schema_in(
+    @patch.object(DatabaseRepository, "get_compiled_sql_template")
+    @patch.object(DatabaseRepository, "save_database_object")
+    def test_create_schema_in(
         self,
-        mock_save_object,
-        mock_get_sql_template,
-        mock_get_snowflake_objects_path,
+        mock_save_database_object,
+        mock_get_compiled_sql_template,
         mock_get_schema_template,
-        mock_inquirer_prompt,
     ):
         mock_get_schema_template.return_value = {
             "database": "test_db",
@@ -47,18 +56,54 @@ class TestMain(unittest.TestCase):
                     "object_name": "test_dynamic_table",
                     "template_name": "dynamic_table_template",
                     "generate_columns_from_table": False,
+                    "pattern": "{column_name}",
+                    "columns": ["id"],
+                    "source_database": "test_db",
+                    "source_schema": "test_source",
+                    "source_object": "test_table",
                 }
             ],
             "procedures": [
                 {"object_name": "test_procedure", "template_name": "procedure_template"}
             ],
         }
-        mock_inquirer_prompt.return_value = {"field_delimiter": ","}
+        mock_get_compiled_sql_template.return_value = SqlTemplate("CREATE {name}")
+        mock_save_database_object.return_value = "created"
         database_repository = DatabaseRepository()
 
-        create_new_schema_in(database_repository, "test_schema", "test_template")
+        report = create_schema_in(
+            database_repository, "test_schema", "test_template", incremental=False
+        )
 
-        self.assertEqual(mock_save_object.call_count, 6)
+        self.assertEqual(mock_save_database_object.call_count, 6)
+        self.assertEqual(report.counts["created"], 6)
+
+    @patch.object(DatabaseRepository, "get_schema_template")
+    @patch.object(DatabaseRepository, "get_compiled_sql_template")
+    @patch.object(DatabaseRepository, "save_database_object")
+    def test_procedures_are_saved_once(
+        self,
+        mock_save_database_object,
+        mock_get_compiled_sql_template,
+        mock_get_schema_template,
+    ):
+        mock_get_schema_template.return_value = {
+            "database": "test_db",
+            "role": "test_role",
+            "procedures": [
+                {"object_name": f"procedure_{i}", "template_name": "procedure"}
+                for i in range(3)
+            ],
+        }
+        mock_get_compiled_sql_template.return_value = SqlTemplate("CREATE {name}")
+        mock_save_database_object.return_value = "created"
+
+        report = create_schema_in(
+            DatabaseRepository(), "test_schema", "test_template", incremental=False
+        )
+
+        self.assertEqual(mock_save_database_object.call_count, 3)
+        self.assertEqual(report.counts["created"], 3)
 
     @patch.object(DatabaseRepository, "setup")
     def test_init(self, mock_setup):
@@ -67,5 +112,177 @@ class TestMain(unittest.TestCase):
         mock_setup.assert_called_once()
 
 
+SCHEMA_TEMPLATES = """
+schemas:
+  - name: raw
+    database: raw_db
+    role: loader
+    stages:
+      - object_name: landing
+        template_name: stage.sql
+    tables:
+      - template_name: table.sql
+        generate_columns_from_template: true
+  - name: curated
+    database: curated_db
+    role: transformer
+    dynamic_tables:
+      - template_name: dynamic_table.sql
+        generate_columns_from_table: true
+        pattern: "{column_name}"
+"""
+
+SQL_TEMPLATES = {
+    "stage.sql": "CREATE STAGE IF NOT EXISTS {database}.{schema}.{name};\n",
+    "table.sql": "CREATE OR REPLACE TABLE {name} (\n    {table_columns}\n);\n",
+    "dynamic_table.sql": (
+        "CREATE OR REPLACE DYNAMIC TABLE {name}\n"
+        "AS SELECT\n    {formatted_transformations}\n"
+        "FROM {source_database}.{source_schema}.{source_object};\n"
+    ),
+}
+
+
+class TestSchemaWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+        templates = Path("templates")
+        (templates / "schema_templates").mkdir(parents=True)
+        (templates / "schema_templates" / "schemas.yaml").write_text(
+            textwrap.dedent(SCHEMA_TEMPLATES)
+        )
+        (templates / "sql_templates").mkdir()
+        for name, template in SQL_TEMPLATES.items():
+            (templates / "sql_templates" / name).write_text(template)
+        self.files = templates / "template_files" / "raw_sales"
+        self.files.mkdir(parents=True)
+        (self.files / "orders_20240101.csv").write_text("id,amount\n1,2.5\n")
+        (self.files / "customers_20240101.csv").write_text("id,name\n1,a\n")
+
+        self.objects = Path("snowflake") / "snowflake_objects" / "databases"
+        self.watch = SchemaWatch(
+            DatabaseRepository(),
+            [
+                {"schema": "raw_sales", "template": "raw", "delimiter": ","},
+                {
+                    "schema": "cur_sales",
+                    "template": "curated",
+                    "source_database": "raw_db",
+                    "source_schema": "raw_sales",
+                },
+            ],
+        )
+        self.watch.generate_all()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_template_file_change_regenerates_table_and_dynamic_table(self):
+        (self.files / "orders_20240101.csv").write_text("id,amount,note\n1,2.5,x\n")
+
+        scopes = self.watch.scopes_for([str(self.files / "orders_20240101.csv")])
+        report, touched = self.watch.generate(scopes)
+
+        self.assertEqual(report.counts.get("updated"), 2)
+        self.assertEqual(touched, 2)
+        dynamic_table = (
+            self.objects / "curated_db" / "schemas" / "cur_sales"
+        ) / "dynamic_tables" / "orders.sql"
+        self.assertIn("note", dynamic_table.read_text().lower())
+
+    def test_sql_template_change_only_regenerates_its_objects(self):
+        stage_template = Path("templates") / "sql_templates" / "stage.sql"
+        stage_template.write_text("CREATE STAGE {database}.{schema}.{name};\n")
+
+        scopes = self.watch.scopes_for([str(stage_template)])
+        report, touched = self.watch.generate(scopes)
+
+        self.assertEqual(report.counts.get("updated"), 1)
+        self.assertEqual(touched, 1)
+
+    def test_unrelated_change_has_no_scope(self):
+        self.assertEqual(self.watch.scopes_for([str(Path("README.md"))]), {})
+
+
+class TestCreateSchemasIn(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+        templates = Path("templates")
+        (templates / "schema_templates").mkdir(parents=True)
+        (templates / "schema_templates" / "schemas.yaml").write_text(
+            textwrap.dedent(SCHEMA_TEMPLATES)
+        )
+        (templates / "sql_templates").mkdir()
+        for name, template in SQL_TEMPLATES.items():
+            (templates / "sql_templates" / name).write_text(template)
+        files = templates / "template_files" / "raw_sales"
+        files.mkdir(parents=True)
+        (files / "orders_20240101.csv").write_text("id,amount\n1,2.5\n")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    @patch.object(DatabaseRepository, "prompt_user_for_source")
+    def test_invalid_entries_fail_without_prompting(self, prompt_user_for_source):
+        entries = [
+            {"template": "raw"},
+            {"schema": "raw_sales", "template": "missing"},
+            {"schema": "cur_sales", "template": "curated"},
+            {"schema": "raw_sales", "template": "raw"},
+            {"schema": "raw_sales", "template": "raw"},
+        ]
+
+        results = create_schemas_in(DatabaseRepository(), entries, jobs=1)
+
+        prompt_user_for_source.assert_not_called()
+        self.assertEqual(
+            [result["schema"] for result in results],
+            [None, "raw_sales", "cur_sales", "raw_sales", "raw_sales"],
+        )
+        self.assertIn("need both a schema and a template", results[0]["error"])
+        self.assertIn("Unknown schema template missing", results[1]["error"])
+        self.assertIn(
+            "needs a source_database and a source_schema", results[2]["error"]
+        )
+        self.assertIsNone(results[3]["error"])
+        self.assertEqual(results[4]["error"], "Duplicate batch entry")
+
+    def test_entries_writing_the_same_schema_are_duplicates(self):
+        schemas = Path("templates/schema_templates/schemas.yaml")
+        schemas.write_text(
+            schemas.read_text()
+            + "  - name: raw_copy\n    database: raw_db\n    role: loader\n"
+        )
+        entries = [
+            {"schema": "raw_sales", "template": "raw"},
+            {"schema": "raw_sales", "template": "raw_copy"},
+            {"schema": "raw_other", "template": "raw_copy"},
+        ]
+
+        results = create_schemas_in(DatabaseRepository(), entries, jobs=1)
+
+        self.assertEqual(
+            [result["error"] for result in results],
+            [None, "Duplicate batch entry", None],
+        )
+
+    def test_schema_watch_rejects_invalid_entries(self):
+        with self.assertRaisesRegex(ValueError, "Batch entry 1: .*source_schema"):
+            SchemaWatch(
+                DatabaseRepository(),
+                [{"schema": "cur_sales", "template": "curated"}],
+            )
+
+
 if __name__ == "__main__":
     unittest.main()
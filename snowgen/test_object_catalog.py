@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.database_objects.snowflake_database_object import SnowflakeDatabaseObject
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.database_repository import object_catalog
+from snowgen.database_repository.object_catalog import ObjectCatalog
+
+TABLE_KEY = "databases/raw_db/schemas/raw/tables/orders.sql"
+DYNAMIC_TABLE_KEY = "databases/cur_db/schemas/cur/dynamic_tables/orders.sql"
+
+
+class TestObjectCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.database_repository = DatabaseRepository()
+
+    def tearDown(self):
+        if self.database_repository._catalog is not None:
+            self.database_repository._catalog.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def save(self, key, ddl, snowflake_object=None):
+        return self.database_repository.save_database_object(
+            ddl,
+            self.database_repository.snowflake_objects_path / key,
+            replace=True,
+            snowflake_object=snowflake_object,
+        )
+
+    def test_saved_objects_are_cataloged(self):
+        self.save(TABLE_KEY, 'CREATE TABLE orders ("id" VARCHAR, "Amount" VARCHAR);')
+        dynamic_table = SnowflakeDatabaseObject(
+            role="transformer",
+            database="cur_db",
+            schema="cur",
+            object_name="orders",
+            object_type="dynamic_tables",
+            columns=["id"],
+            pattern="{column_name}",
+            source_database="raw_db",
+            source_schema="raw",
+            source_object="orders",
+        )
+        self.save(DYNAMIC_TABLE_KEY, "CREATE DYNAMIC TABLE orders", dynamic_table)
+
+        catalog = self.database_repository.get_catalog()
+        self.assertEqual(
+            self.database_repository.get_all_databases(), ["cur_db", "raw_db"]
+        )
+        self.assertEqual(self.database_repository.get_all_schemas("raw_db"), ["raw"])
+        self.assertEqual(
+            [entry["path"] for entry in catalog.find(column="AMOUNT")], [TABLE_KEY]
+        )
+        self.assertEqual(
+            [entry["path"] for entry in catalog.find(column="id")],
+            [DYNAMIC_TABLE_KEY, TABLE_KEY],
+        )
+        [entry] = catalog.find(source="raw.orders")
+        self.assertEqual(entry["path"], DYNAMIC_TABLE_KEY)
+        self.assertEqual(entry["columns"], ["id"])
+
+    def test_reindex_follows_the_files(self):
+        objects_path = self.database_repository.snowflake_objects_path
+        self.save(TABLE_KEY, 'CREATE TABLE orders ("id" VARCHAR);')
+        self.save(DYNAMIC_TABLE_KEY, "CREATE DYNAMIC TABLE d AS SELECT 1 AS x FROM a.b.c")
+        self.database_repository.commit_catalog()
+
+        (objects_path / TABLE_KEY).write_text('CREATE TABLE orders ("order_id" VARCHAR);')
+        (objects_path / DYNAMIC_TABLE_KEY).unlink()
+        added = objects_path / "databases/raw_db/schemas/raw/tables/customers.sql"
+        added.write_text('CREATE TABLE customers ("id" VARCHAR);')
+
+        counts = self.database_repository.reindex_catalog(jobs=1)
+
+        self.assertEqual(
+            counts, {"added": 1, "updated": 1, "removed": 1, "unchanged": 0}
+        )
+        catalog = ObjectCatalog(Path(".snowgen") / "catalog.sqlite")
+        try:
+            self.assertEqual(
+                [entry["name"] for entry in catalog.find(column="order_id")], ["orders"]
+            )
+            self.assertEqual(catalog.find(object_type="dynamic_tables"), [])
+            self.assertEqual(catalog.reindex(objects_path)["unchanged"], 2)
+        finally:
+            catalog.close()
+
+    def test_saved_objects_keep_their_stat_signature(self):
+        self.save(TABLE_KEY, 'CREATE TABLE orders ("id" VARCHAR);')
+        self.database_repository.commit_catalog()
+
+        with patch.object(
+            object_catalog, "describe_file", wraps=object_catalog.describe_file
+        ) as describe_file:
+            counts = self.database_repository.reindex_catalog(jobs=1)
+
+        describe_file.assert_not_called()
+        self.assertEqual(counts["unchanged"], 1)
+
+    def test_folders_added_outside_the_catalog_are_listed(self):
+        objects_path = self.database_repository.snowflake_objects_path
+        self.save(TABLE_KEY, 'CREATE TABLE orders ("id" VARCHAR);')
+        self.assertEqual(self.database_repository.get_all_schemas("raw_db"), ["raw"])
+
+        added = objects_path / "databases/raw_db/schemas/landing/tables/files.sql"
+        added.parent.mkdir(parents=True)
+        added.write_text('CREATE TABLE files ("id" VARCHAR);')
+        (objects_path / "databases/cur_db/schemas/cur/tables").mkdir(parents=True)
+        (objects_path / "databases/cur_db/schemas/cur/tables/orders.sql").write_text(
+            "CREATE TABLE orders (id VARCHAR);"
+        )
+
+        self.assertEqual(
+            self.database_repository.get_all_schemas("raw_db"), ["landing", "raw"]
+        )
+        self.assertEqual(
+            self.database_repository.get_all_databases(), ["cur_db", "raw_db"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
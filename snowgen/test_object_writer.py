@@ -0,0 +1,89 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.object_writers.generation_manifest import GenerationManifest
+from snowgen.object_writers.object_writer import ObjectWriter
+
+
+class TestObjectWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_path = Path(self.tmp.name)
+        self.database_repository = DatabaseRepository()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_keeps_replace_semantics(self):
+        existing = self.base_path / "tables" / "existing.sql"
+        existing.parent.mkdir(parents=True)
+        existing.write_text("old")
+
+        with ObjectWriter(
+            self.database_repository, workers=2, max_pending=2, root=self.base_path
+        ) as writer:
+            writer.write("new", "tables/existing.sql", replace=False)
+            writer.write("new", "tables/created.sql")
+            writer.write("replaced", "views/replaced.sql")
+            writer.write("replaced", "views/replaced.sql", True)
+
+        self.assertEqual(existing.read_text(), "old")
+        self.assertEqual((self.base_path / "tables" / "created.sql").read_text(), "new")
+        self.assertEqual(
+            (self.base_path / "views" / "replaced.sql").read_text(), "replaced"
+        )
+
+    def test_directories_are_created_once(self):
+        with patch.object(Path, "mkdir") as mock_mkdir:
+            with ObjectWriter(self.database_repository, root=self.base_path) as writer:
+                with patch.object(
+                    self.database_repository,
+                    "save_database_object",
+                    return_value="created",
+                ):
+                    for i in range(10):
+                        writer.write("ddl", f"tables/t{i}.sql")
+
+        mock_mkdir.assert_called_once()
+
+    def test_write_errors_are_raised_on_close(self):
+        writer = ObjectWriter(self.database_repository, root=self.base_path)
+        with patch.object(
+            self.database_repository,
+            "save_database_object",
+            side_effect=PermissionError("read-only"),
+        ):
+            writer.write("ddl", "tables/t.sql")
+
+            with self.assertRaises(PermissionError):
+                writer.close()
+
+    def test_manifest_tracks_unchanged_and_stale_objects(self):
+        manifest = GenerationManifest(self.base_path / "manifest.json", self.base_path)
+        with ObjectWriter(
+            self.database_repository, manifest=manifest, root=self.base_path
+        ) as writer:
+            for name in ["a", "b"]:
+                writer.write(name, f"{name}.sql", replace=True, input_hash=name)
+        manifest.save()
+        self.assertEqual(writer.report.counts["created"], 2)
+
+        manifest = GenerationManifest(
+            self.base_path / "manifest.json", self.base_path
+        ).load()
+        self.assertTrue(manifest.is_unchanged("a.sql", "a"))
+        self.assertFalse(manifest.is_unchanged("a.sql", "changed"))
+
+        with ObjectWriter(
+            self.database_repository, manifest=manifest, root=self.base_path
+        ) as writer:
+            writer.write("a", "a.sql", replace=True, input_hash="x")
+        self.assertEqual(writer.report.counts["unchanged"], 1)
+        self.assertEqual(manifest.stale(), ["b.sql"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from snowgen.profiler import NULL_PHASE, Profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = Profiler()
+
+        self.assertIs(profiler.phase("yaml"), NULL_PHASE)
+        with profiler.phase("yaml"):
+            profiler.count("files_scanned")
+
+        snapshot = profiler.snapshot()
+        self.assertEqual(snapshot["phases"], {})
+        self.assertEqual(snapshot["counters"], {})
+
+    def test_phases_and_counters_add_up(self):
+        profiler = Profiler()
+        profiler.enable()
+
+        for _ in range(3):
+            with profiler.phase("render.tables"):
+                profiler.count("bytes_written", 10)
+        profiler.count("files_scanned")
+
+        snapshot = profiler.snapshot()
+        self.assertEqual(snapshot["phases"]["render.tables"]["calls"], 3)
+        self.assertEqual(
+            snapshot["counters"], {"bytes_written": 30, "files_scanned": 1}
+        )
+
+    def test_merge_and_write_report(self):
+        worker = Profiler()
+        worker.enable()
+        with worker.phase("write"):
+            worker.count("files_written", 2)
+
+        profiler = Profiler()
+        profiler.enable()
+        with profiler.phase("write"):
+            profiler.count("files_written")
+        profiler.merge(worker.snapshot())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            report_file = Path(tmp) / "profile.json"
+            profiler.write_report(report_file)
+            report = json.loads(report_file.read_text())
+
+        self.assertEqual(report["phases"]["write"]["calls"], 2)
+        self.assertEqual(report["counters"]["files_written"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import os
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.database_repository import database_repository as repository_module
+from snowgen.database_repository.database_repository import DatabaseRepository
+from snowgen.database_repository.ddl_parser import parse_column_definitions
+from snowgen.main import create_schema_in, migrate_schema_in, regenerate_schema_in
+from snowgen.schema_drift import diff_columns, render_migration
+from snowgen.test_main import SCHEMA_TEMPLATES, SQL_TEMPLATES
+
+
+class TestDiffColumns(unittest.TestCase):
+
+    def test_add_drop_and_rename(self):
+        self.assertEqual(
+            diff_columns(["id", "Order Date", "note"], ["id", "ORDER_DATE", "extra"]),
+            [
+                ("possible_rename", "note", "extra"),
+                ("rename", "Order Date", "ORDER_DATE"),
+                ("drop", "note", None),
+                ("add", "extra", "VARCHAR"),
+            ],
+        )
+
+    def test_positional_renames_are_only_suggested(self):
+        changes = diff_columns(["id", "email", "phone"], ["id", "email", "country"])
+
+        self.assertEqual(
+            render_migration("db.s.t", changes),
+            '-- If "phone" was renamed to "country", use this instead of its '
+            "DROP and ADD:\n"
+            '-- ALTER TABLE db.s.t RENAME COLUMN "phone" TO "country";\n'
+            'ALTER TABLE db.s.t DROP COLUMN IF EXISTS "phone";\n'
+            'ALTER TABLE db.s.t ADD COLUMN IF NOT EXISTS "country" VARCHAR;\n',
+        )
+
+    def test_data_types(self):
+        self.assertEqual(
+            diff_columns(
+                {"id": "NUMBER(38,0)", "a": "VARCHAR"}, {"id": "FLOAT", "b": "DATE"}
+            ),
+            [
+                ("drop", "a", None),
+                ("manual_alter", "id", "FLOAT"),
+                ("add", "b", "DATE"),
+            ],
+        )
+        self.assertEqual(diff_columns(["id"], {"id": "VARCHAR"}), [])
+        self.assertEqual(
+            diff_columns(
+                {"a": "VARCHAR(10)", "b": "NUMBER(10,2)", "c": "NUMBER(10,2)"},
+                {"a": "VARCHAR", "b": "NUMBER(12,2)", "c": "NUMBER(12,0)"},
+            ),
+            [
+                ("alter", "a", "VARCHAR"),
+                ("alter", "b", "NUMBER(12,2)"),
+                ("manual_alter", "c", "NUMBER(12,0)"),
+            ],
+        )
+
+    def test_incompatible_data_types_are_only_suggested(self):
+        self.assertEqual(
+            render_migration("db.s.t", diff_columns(["day"], {"day": "DATE"})),
+            '-- Snowflake cannot change "day" to DATE in place, migrate its data '
+            "by hand:\n"
+            '-- ALTER TABLE db.s.t ALTER COLUMN "day" SET DATA TYPE DATE;\n',
+        )
+
+    def test_render_migration(self):
+        self.assertEqual(
+            render_migration(
+                "db.s.t",
+                [("rename", "a", "b"), ("drop", 'c"d', None), ("add", "e", "DATE")],
+                role="loader",
+            ),
+            "USE ROLE loader;\n"
+            'ALTER TABLE db.s.t RENAME COLUMN "a" TO "b";\n'
+            'ALTER TABLE db.s.t DROP COLUMN IF EXISTS "c""d";\n'
+            'ALTER TABLE db.s.t ADD COLUMN IF NOT EXISTS "e" DATE;\n',
+        )
+
+    def test_parse_column_definitions(self):
+        self.assertEqual(
+            parse_column_definitions(
+                "USE ROLE loader;\n"
+                "CREATE OR REPLACE TABLE orders (\n"
+                '    "ID" NUMBER(38, 0) -- Column name cannot start with a number,\n'
+                '    "NOTE" VARCHAR NOT NULL,\n'
+                "    CONSTRAINT pk PRIMARY KEY (ID)\n"
+                ");\n"
+            ),
+            {"ID": "NUMBER(38,0)", "NOTE": "VARCHAR"},
+        )
+
+
+class TestMigrateSchemaIn(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+        templates = Path("templates")
+        (templates / "schema_templates").mkdir(parents=True)
+        (templates / "schema_templates" / "schemas.yaml").write_text(
+            textwrap.dedent(SCHEMA_TEMPLATES)
+        )
+        (templates / "sql_templates").mkdir()
+        for name, template in SQL_TEMPLATES.items():
+            (templates / "sql_templates" / name).write_text(template)
+        self.files = templates / "template_files" / "raw_sales"
+        self.files.mkdir(parents=True)
+        (self.files / "orders_20240101.csv").write_text("id,amount\n1,2.5\n")
+        (self.files / "customers_20240101.csv").write_text("id,name\n1,a\n")
+
+        self.database_repository = DatabaseRepository()
+        create_schema_in(self.database_repository, "raw_sales", "raw")
+        self.tables = (
+            self.database_repository.snowflake_objects_path
+            / "databases/raw_db/schemas/raw_sales/tables"
+        )
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def migrate(self):
+        return migrate_schema_in(self.database_repository, "raw_sales", "raw")
+
+    def test_only_changed_template_files_are_read(self):
+        (self.files / "orders_20240101.csv").write_text("id,amount,note\n1,2.5,x\n")
+
+        with patch.object(
+            repository_module, "read_header", wraps=repository_module.read_header
+        ) as read_header:
+            report, migrations = self.migrate()
+
+        self.assertEqual(
+            [call.args[0].name for call in read_header.call_args_list],
+            ["orders_20240101.csv"],
+        )
+        self.assertEqual(
+            migrations,
+            ["databases/raw_db/schemas/raw_sales/tables/migrations/orders_0001.sql"],
+        )
+        self.assertEqual(
+            (self.tables / "migrations" / "orders_0001.sql").read_text(),
+            "-- SQL generated using file orders_20240101.csv\n"
+            "USE ROLE loader;\n"
+            "ALTER TABLE raw_db_{env}.raw_sales.orders "
+            'ADD COLUMN IF NOT EXISTS "note" VARCHAR;\n',
+        )
+        self.assertIn('"note" VARCHAR', (self.tables / "orders.sql").read_text())
+        self.assertEqual(report.counts["updated"], 1)
+
+        with patch.object(repository_module, "read_header") as read_header:
+            report, migrations = self.migrate()
+        read_header.assert_not_called()
+        self.assertEqual(migrations, [])
+
+    def test_migrations_alter_the_table_of_the_table_file(self):
+        (self.tables / "orders.sql").write_text(
+            "USE DATABASE raw_db_{env};\n"
+            'USE SCHEMA "Raw_Sales";\n'
+            'CREATE OR REPLACE TABLE "Orders" (\n'
+            '    "id" VARCHAR,\n    "amount" VARCHAR\n);\n'
+        )
+        (self.files / "orders_20240101.csv").write_text("id,amount,note\n1,2.5,x\n")
+
+        _, migrations = self.migrate()
+
+        self.assertIn(
+            'ALTER TABLE raw_db_{env}."Raw_Sales"."Orders" '
+            'ADD COLUMN IF NOT EXISTS "note" VARCHAR;',
+            (self.database_repository.snowflake_objects_path / migrations[0])
+            .read_text()
+            .splitlines(),
+        )
+
+    def test_regenerated_schemas_keep_their_migrations(self):
+        (self.files / "orders_20240101.csv").write_text("id,amount,note\n1,2.5,x\n")
+        self.migrate()
+
+        regenerate_schema_in(self.database_repository, "raw_sales", "raw")
+
+        self.assertEqual(
+            [path.name for path in (self.tables / "migrations").iterdir()],
+            ["orders_0001.sql"],
+        )
+
+    def test_touched_files_with_the_same_columns_cost_nothing(self):
+        (self.files / "customers_20240101.csv").write_text("id,name\n1,abc\n2,d\n")
+
+        report, migrations = self.migrate()
+
+        self.assertEqual(migrations, [])
+        self.assertEqual(report.counts["unchanged"], 1)
+        self.assertEqual(report.counts["updated"], 0)
+
+    def test_migrations_are_numbered(self):
+        (self.files / "orders_20240101.csv").write_text("id\n1\n")
+        self.migrate()
+        (self.files / "orders_20240101.csv").write_text("id,amount\n1,2\n")
+
+        _, migrations = self.migrate()
+
+        self.assertEqual(
+            [Path(key).name for key in migrations], ["orders_0002.sql"]
+        )
+        self.assertIn(
+            'DROP COLUMN IF EXISTS "amount"',
+            (self.tables / "migrations" / "orders_0001.sql").read_text(),
+        )
+        self.assertEqual(
+            [entry["name"] for entry in self.database_repository.get_catalog().find()],
+            ["landing", "customers", "orders"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
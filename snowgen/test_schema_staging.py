@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.object_writers import schema_staging
+from snowgen.object_writers.schema_staging import SchemaStaging, exchange_paths
+
+
+class TestSchemaStaging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.objects_path = Path(self.tmp.name)
+        self.live_path = self.objects_path / "databases" / "db" / "schemas" / "s"
+        (self.live_path / "tables").mkdir(parents=True)
+        (self.live_path / "tables" / "old.sql").write_text("old")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_commit_swaps_in_the_staged_schema(self):
+        with SchemaStaging(self.objects_path, "db", "s") as staging:
+            (staging.staged_path / "tables").mkdir()
+            (staging.staged_path / "tables" / "new.sql").write_text("new")
+            staging.commit()
+
+        self.assertEqual(
+            [p.name for p in (self.live_path / "tables").iterdir()], ["new.sql"]
+        )
+        self.assertEqual(
+            [p.name for p in self.objects_path.iterdir()], ["databases"]
+        )
+
+    def test_interrupted_run_leaves_live_schema_untouched(self):
+        with self.assertRaises(KeyboardInterrupt):
+            with SchemaStaging(self.objects_path, "db", "s") as staging:
+                (staging.staged_path / "tables").mkdir()
+                raise KeyboardInterrupt
+
+        self.assertEqual((self.live_path / "tables" / "old.sql").read_text(), "old")
+        self.assertEqual(
+            [p.name for p in self.objects_path.iterdir()], ["databases"]
+        )
+
+    def test_exchange_falls_back_to_renames(self):
+        source = self.objects_path / "staged"
+        source.mkdir()
+        (source / "new.sql").write_text("new")
+
+        with patch.object(schema_staging, "_libc_function", return_value=None):
+            exchange_paths(source, self.live_path)
+
+        self.assertTrue((self.live_path / "new.sql").exists())
+        self.assertTrue((source / "tables" / "old.sql").exists())
+
+    def test_stale_staging_folders_are_swept(self):
+        stale = self.objects_path / ".staging-db-s-999999999"
+        running = self.objects_path / f".staging-db-s-{os.getppid()}"
+        other_schema = self.objects_path / ".staging-db-s-2-999999999"
+        for path in (stale, running, other_schema):
+            (path / "databases").mkdir(parents=True)
+
+        with SchemaStaging(self.objects_path, "db", "s") as staging:
+            self.assertTrue(staging.staged_path.is_dir())
+
+        self.assertEqual(
+            sorted(p.name for p in self.objects_path.iterdir()),
+            sorted(["databases", running.name, other_schema.name]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from snowgen.database_objects.sql_template import SqlTemplate, TemplateError
+
+
+class TestSqlTemplate(unittest.TestCase):
+
+    def test_render_matches_str_format(self):
+        text = "CREATE TABLE {name} ({{ {columns!r} }}) -- {comment:>5} {kwargs[prefix]}"
+        replacements = {
+            "name": "orders",
+            "columns": ["id"],
+            "comment": "x",
+            "kwargs": {"prefix": "raw"},
+        }
+
+        self.assertEqual(
+            SqlTemplate(text).render(replacements), text.format(**replacements)
+        )
+
+    def test_includes_are_inlined(self):
+        snippets = {
+            "grants.sql": SqlTemplate("GRANT SELECT ON {name} TO {role};\n", "grants.sql")
+        }
+        template = SqlTemplate(
+            "CREATE TABLE {name};\n-- @include grants.sql\nSELECT 1;",
+            name="table.sql",
+            loader=snippets.get,
+        )
+
+        self.assertEqual(template.required_keys, {"name", "role"})
+        self.assertEqual(template.includes, ["grants.sql"])
+        self.assertEqual(
+            template.render({"name": "t", "role": "r"}),
+            "CREATE TABLE t;\nGRANT SELECT ON t TO r;\nSELECT 1;",
+        )
+
+    def test_invalid_templates_fail_at_compile_time(self):
+        with self.assertRaises(TemplateError):
+            SqlTemplate("CREATE TABLE {name", name="table.sql")
+        with self.assertRaises(TemplateError):
+            SqlTemplate("CREATE TABLE {}", name="table.sql")
+
+    def test_missing_keys(self):
+        template = SqlTemplate("CREATE TABLE {name} COMMENT = '{comment}'")
+
+        self.assertEqual(template.missing_keys({"name"}), {"comment"})
+        with self.assertRaises(KeyError):
+            template.render({"name": "t"})
+
+
+if __name__ == "__main__":
+    unittest.main()
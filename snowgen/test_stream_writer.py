@@ -0,0 +1,65 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.object_writers.stream_writer import (
+    ArchiveObjectWriter,
+    NdjsonObjectWriter,
+    read_object_records,
+    safe_object_key,
+)
+
+KEY = "databases/raw_db/schemas/raw_sales/tables/orders.sql"
+
+
+class TestStreamWriter(unittest.TestCase):
+
+    def test_ndjson_round_trip(self):
+        stream = io.StringIO()
+        with NdjsonObjectWriter(stream) as writer:
+            writer.write("CREATE TABLE orders;", KEY)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "objects.ndjson"
+            source.write_text(stream.getvalue())
+            self.assertEqual(
+                list(read_object_records(str(source))), [(KEY, "CREATE TABLE orders;")]
+            )
+
+        self.assertIn('"object_type": "tables"', stream.getvalue())
+        self.assertIn('"name": "orders"', stream.getvalue())
+
+    def test_archive_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["objects.tar", "objects.tar.gz", "objects.zip"]:
+                archive = Path(tmp) / name
+                with ArchiveObjectWriter(archive) as writer:
+                    writer.write("CREATE TABLE orders;", KEY)
+
+                self.assertEqual(
+                    list(read_object_records(str(archive))),
+                    [(KEY, "CREATE TABLE orders;")],
+                )
+
+    def test_archives_do_not_depend_on_the_time_of_the_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["objects.tar", "objects.tar.gz", "objects.zip"]:
+                archive = Path(tmp) / name
+                contents = []
+                for now in [1700000000, 1800000000]:
+                    with patch("time.time", return_value=now):
+                        with ArchiveObjectWriter(archive) as writer:
+                            writer.write("CREATE TABLE orders;", KEY)
+                    contents.append(archive.read_bytes())
+
+                self.assertEqual(contents[0], contents[1], name)
+
+    def test_paths_outside_the_object_tree_are_rejected(self):
+        for key in ["/etc/passwd", "databases/../../x.sql"]:
+            with self.assertRaises(ValueError):
+                safe_object_key(key)
+
+
+if __name__ == "__main__":
+    unittest.main()
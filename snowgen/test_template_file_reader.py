@@ -0,0 +1,72 @@
+import bz2
+import gzip
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+from snowgen.database_repository.template_file_reader import (
+    open_template_file,
+    read_header,
+    read_prefix,
+)
+
+
+class TestTemplateFileReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_delimiter_and_quoting_are_detected(self):
+        file = self.path / "orders_20240101.csv"
+        file.write_text('"id";"customer; name";"amount"\n1;"a; b";2.5\n2;"c";3\n')
+
+        self.assertEqual(read_header(file), ["id", "customer; name", "amount"])
+
+    def test_bom_and_encoding(self):
+        file = self.path / "utf16.csv"
+        file.write_bytes("id\tnavn\tbeløp\n1\tå\t2\n".encode("utf-16"))
+        self.assertEqual(read_header(file), ["id", "navn", "beløp"])
+
+        file = self.path / "utf8_bom.csv"
+        file.write_bytes("id|navn\n1|x\n".encode("utf-8-sig"))
+        self.assertEqual(read_header(file), ["id", "navn"])
+
+        file = self.path / "cp1252.csv"
+        file.write_bytes("id,beløp\n".encode("cp1252"))
+        self.assertEqual(read_header(file), ["id", "beløp"])
+
+    def test_compressed_files(self):
+        content = b"id,name\n1,a\n"
+        (self.path / "a.csv.gz").write_bytes(gzip.compress(content))
+        (self.path / "b.csv.bz2").write_bytes(bz2.compress(content))
+        with zipfile.ZipFile(self.path / "c.zip", "w") as archive:
+            archive.writestr("c.csv", content)
+
+        for name in ["a.csv.gz", "b.csv.bz2", "c.zip"]:
+            self.assertEqual(read_header(self.path / name), ["id", "name"])
+
+    def test_only_a_prefix_is_decompressed(self):
+        rows = b"".join(b"%d,x\n" % i for i in range(200000))
+        file = self.path / "big.csv.gz"
+        file.write_bytes(gzip.compress(b"id,name\n" + rows))
+
+        with open_template_file(file) as stream:
+            with patch.object(stream, "read", wraps=stream.read) as mock_read:
+                data = read_prefix(stream, sample_bytes=1024)
+
+        mock_read.assert_called_once_with(1024)
+        self.assertEqual(len(data), 1024)
+
+    def test_explicit_delimiter(self):
+        file = self.path / "x.txt"
+        file.write_text("a,b;c,d\n")
+        self.assertEqual(read_header(file, delimiter=";"), ["a,b", "c,d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
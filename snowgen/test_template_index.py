@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from snowgen.database_repository.template_index import TemplateIndex
+
+
+class TestTemplateIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_path = Path(self.tmp.name)
+        (self.base_path / "templates" / "sql_templates" / "shared").mkdir(parents=True)
+        (self.base_path / "templates" / "template_files" / "raw").mkdir(parents=True)
+        (self.base_path / "templates" / "sql_templates" / "table.sql").write_text("x")
+        (self.base_path / "templates" / "sql_templates" / "shared" / "g.sql").write_text("y")
+        self.objects_path = self.base_path / "snowflake" / "snowflake_objects"
+        (self.objects_path / "sql_templates").mkdir(parents=True)
+        self.index_file = self.base_path / ".snowgen" / "template_index.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_index_finds_folders_and_templates(self):
+        index = TemplateIndex(
+            self.base_path, index_file=self.index_file, exclude=[self.objects_path]
+        ).load()
+
+        self.assertEqual(
+            index.get_folder("sql_templates"),
+            str(self.base_path / "templates" / "sql_templates"),
+        )
+        self.assertEqual(
+            index.get_template_path("shared/g.sql").read_text(), "y"
+        )
+        self.assertTrue(self.index_file.exists())
+
+    def test_persisted_index_is_invalidated_by_directory_mtime(self):
+        TemplateIndex(
+            self.base_path, index_file=self.index_file, exclude=[self.objects_path]
+        ).load()
+
+        reloaded = TemplateIndex(self.base_path, index_file=self.index_file)
+        self.assertTrue(reloaded._read())
+
+        templates_path = self.base_path / "templates" / "sql_templates"
+        (templates_path / "view.sql").write_text("z")
+        stat = os.stat(templates_path)
+        os.utime(templates_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        reloaded = TemplateIndex(
+            self.base_path, index_file=self.index_file, exclude=[self.objects_path]
+        )
+        self.assertFalse(reloaded._read())
+        self.assertIn("view.sql", reloaded.load().templates)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+from snowgen.database_repository.type_inference import (
+    infer_column_type,
+    infer_column_types,
+    sample_rows,
+)
+
+
+class TestTypeInference(unittest.TestCase):
+
+    def test_infer_column_type(self):
+        cases = [
+            (["1", "-20", "300"], "NUMBER(3,0)"),
+            (["1.5", "22.25", ""], "NUMBER(4,2)"),
+            (["007", "008"], "VARCHAR"),
+            (["1e5", "2.5"], "FLOAT"),
+            (["true", "False", "T"], "BOOLEAN"),
+            (["2024-01-31", "2023-12-01"], "DATE"),
+            (["2024-01-31 10:00:00", "2024-01-31T11:00"], "TIMESTAMP_NTZ"),
+            (["2024-01-31T10:00:00Z", "2024-01-31 10:00:00+01:00"], "TIMESTAMP_TZ"),
+            (['{"a": 1}', "[1, 2]"], "VARIANT"),
+            (["2024-13-01"], "VARCHAR"),
+            (["", " "], "VARCHAR"),
+        ]
+        for values, expected in cases:
+            self.assertEqual(infer_column_type(values), expected, values)
+
+    def test_sample_rows_is_bounded(self):
+        sample = sample_rows(iter(range(100000)), 10)
+
+        self.assertEqual(len(sample), 10)
+        self.assertEqual(sample, sample_rows(iter(range(100000)), 10))
+
+    def test_infer_column_types_from_compressed_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file = Path(tmp) / "orders_20240101.csv.gz"
+            rows = "".join(
+                f"{i};{i}.5;2024-01-01;x{i}\n" for i in range(1000, 9000)
+            )
+            file.write_bytes(gzip.compress(("id;amount;day;note\n" + rows).encode()))
+
+            columns = infer_column_types(
+                file, sample_rows_budget=100, sample_bytes_budget=64 * 1024
+            )
+
+        self.assertEqual(
+            columns,
+            {
+                "id": "NUMBER(4,0)",
+                "amount": "NUMBER(5,1)",
+                "day": "DATE",
+                "note": "VARCHAR",
+            },
+        )
+
+    def test_repeated_header_names_keep_their_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file = Path(tmp) / "orders_20240101.csv"
+            file.write_text("id,note,id,id_2,id\n1,x,2024-01-01,ab,1.5\n")
+
+            columns = infer_column_types(file)
+
+        self.assertEqual(
+            columns,
+            {
+                "id": "NUMBER(1,0)",
+                "note": "VARCHAR",
+                "id_3": "DATE",
+                "id_2": "VARCHAR",
+                "id_4": "NUMBER(2,1)",
+            },
+        )
+        self.assertEqual(list(columns), ["id", "note", "id_3", "id_2", "id_4"])
+
+
+if __name__ == "__main__":
+    unittest.main()